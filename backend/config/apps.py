@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class ConfigConfig(AppConfig):
+    name = 'config'
+    verbose_name = 'Project configuration'
+
+    def ready(self):
+        from . import checks  # noqa: F401
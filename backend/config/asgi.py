@@ -7,7 +7,14 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Serve the hot read endpoints with native async views (see config/async_views.py)
+os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
 
 application = get_asgi_application()
 
+# Optional in-process deadline sweeper (PROJECT_SWEEPER_INTERVAL)
+from projects.sweeper import start_scheduler  # noqa: E402
+
+start_scheduler()
+
 
@@ -0,0 +1,184 @@
+"""
+Native async read views for ASGI.
+
+Under ASGI a sync DRF view holds a thread for the whole request, including
+every cache and database wait. AsyncReadView serves the GET/HEAD action of
+a ViewSet route as a coroutine instead: authentication, cache lookups and
+queries use Django's async APIs, while permissions, content negotiation,
+serializers, pagination links and error responses are the ViewSet's own
+code, so responses match the sync view.
+
+Other methods, and reads that negotiate a renderer other than JSON (the
+browsable API), are handed to the ViewSet's sync view. Serializers run on
+the event loop, so querysets must load everything they render up front
+(select_related/prefetch_related); a lazy query raises
+SynchronousOnlyOperation instead of blocking the loop.
+
+The routes are only mounted when ASYNC_READ_VIEWS is set (config/asgi.py
+sets it): under WSGI an async view costs an event loop per request.
+"""
+from abc import ABC, abstractmethod
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .pagination import apaginate_queryset
+from .row_serializers import RowListMixin
+
+ASYNC_METHODS = ('GET', 'HEAD')
+
+
+async def _jwt_user(authenticator, token):
+    """Async version of JWTAuthentication.get_user."""
+    try:
+        user_id = token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken('Token contained no recognizable user identification')
+    user = await authenticator.user_model.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).afirst()
+    if user is None:
+        raise AuthenticationFailed('User not found', code='user_not_found')
+    if not user.is_active:
+        raise AuthenticationFailed('User is inactive', code='user_inactive')
+    if jwt_settings.CHECK_REVOKE_TOKEN:
+        if token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+    return user
+
+
+async def authenticate(request):
+    """Async version of DRF's Request._authenticate: sets request.user and request.auth."""
+    try:
+        for authenticator in request.authenticators:
+            if isinstance(authenticator, JWTAuthentication):
+                header = authenticator.get_header(request)
+                raw_token = authenticator.get_raw_token(header) if header is not None else None
+                if raw_token is None:
+                    continue
+                token = authenticator.get_validated_token(raw_token)
+                user_auth_tuple = (await _jwt_user(authenticator, token), token)
+            else:
+                user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+    except Exception:
+        request._not_authenticated()
+        raise
+    request._not_authenticated()
+
+
+class AsyncReadView(ABC):
+    """
+    Serve a ViewSet route's GET/HEAD as a coroutine and its other methods with the sync view.
+
+    Subclasses set `viewset` and `actions` (the route's method -> action
+    map, as passed to `ViewSet.as_view`) and implement `async get(request,
+    *args, **kwargs)` returning a DRF Response; `self.view` is an
+    initialised ViewSet instance for the request.
+    """
+    viewset = None
+    actions = None
+
+    @classmethod
+    def as_view(cls):
+        sync_view = sync_to_async(cls.viewset.as_view(dict(cls.actions)))
+
+        async def view(request, *args, **kwargs):
+            if request.method not in ASYNC_METHODS:
+                return await sync_view(request, *args, **kwargs)
+            return await cls(sync_view).dispatch(request, *args, **kwargs)
+
+        # Like APIView.as_view: CSRF is enforced by SessionAuthentication, not the middleware
+        view.csrf_exempt = True
+        view.__name__ = view.__qualname__ = cls.__name__
+        return view
+
+    def __init__(self, sync_view):
+        self.sync_view = sync_view
+        self.view = None
+
+    def initialize(self, request, *args, **kwargs):
+        """Build the ViewSet instance the way ViewSet.as_view does and wrap the request."""
+        view = self.viewset()
+        view.action_map = {**self.actions, 'head': self.actions['get']}
+        for method, action in view.action_map.items():
+            setattr(view, method, getattr(view, action))
+        view.args, view.kwargs = args, kwargs
+        view.request = view.initialize_request(request, *args, **kwargs)
+        view.headers = view.default_response_headers
+        self.view = view
+        return view.request
+
+    async def dispatch(self, request, *args, **kwargs):
+        drf_request = self.initialize(request, *args, **kwargs)
+        view = self.view
+        try:
+            view.format_kwarg = view.get_format_suffix(**kwargs)
+            renderer, _ = view.perform_content_negotiation(drf_request)
+            if not isinstance(renderer, JSONRenderer):
+                return await self.sync_view(request, *args, **kwargs)
+            await authenticate(drf_request)
+            # Negotiation, versioning, permissions and throttles; the user is already set.
+            # Throttles and permissions may hit the cache or database, so they run off the loop
+            await sync_to_async(view.initial)(drf_request, *args, **kwargs)
+            response = await self.get(drf_request, *args, **kwargs)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        return self.finalize(response)
+
+    def finalize(self, response):
+        """Render the response here, so the ASGI handler does not render it in a thread."""
+        view = self.view
+        response = view.finalize_response(view.request, response, *view.args, **view.kwargs)
+        if not isinstance(response, Response):
+            return response
+        response.render()
+        rendered = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        return rendered
+
+    @abstractmethod
+    async def get(self, request, *args, **kwargs):
+        """Serve the route's GET/HEAD and return a DRF Response."""
+
+    async def list(self, queryset=None):
+        """Async version of ListModelMixin.list (and RowListMixin.list)."""
+        view = self.view
+        if isinstance(view, RowListMixin):
+            row_serializer = view.get_row_serializer()
+            queryset = view.get_row_queryset(row_serializer, queryset)
+            serialize = row_serializer.ato_representation
+        else:
+            queryset = view.filter_queryset(view.get_queryset() if queryset is None else queryset)
+
+            async def serialize(objects):
+                return view.get_serializer(objects, many=True).data
+        page = await apaginate_queryset(view.paginator, queryset, view.request, view=view) if view.paginator else None
+        if page is not None:
+            return view.get_paginated_response(await serialize(page))
+        return Response(await serialize([obj async for obj in queryset]))
+
+    async def get_object(self):
+        """Async version of GenericAPIView.get_object."""
+        view = self.view
+        queryset = view.filter_queryset(view.get_queryset())
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        try:
+            obj = await queryset.aget(**{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        view.check_object_permissions(view.request, obj)
+        return obj
+
+    async def retrieve(self):
+        """Async version of RetrieveModelMixin.retrieve."""
+        return Response(self.view.get_serializer(await self.get_object()).data)
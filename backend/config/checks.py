@@ -0,0 +1,52 @@
+"""
+System checks for settings that only work when state is shared across worker processes.
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_local_cache(alias):
+    """True if cache `alias` keeps entries per process (or not at all)."""
+    return settings.CACHES.get(alias, {}).get('BACKEND') in LOCAL_CACHE_BACKENDS
+
+
+@register(Tags.caches)
+def check_throttle_cache(app_configs, **kwargs):
+    if settings.DEBUG or not is_local_cache(settings.THROTTLE_CACHE):
+        return []
+    return [Warning(
+        f"THROTTLE_CACHE ('{settings.THROTTLE_CACHE}') is a per-process cache, so each worker enforces "
+        "the pledge, vote and login rate limits on its own.",
+        hint='Point THROTTLE_CACHE at a Redis or Memcached cache shared by every worker.',
+        id='config.W001',
+    )]
+
+
+@register(Tags.caches)
+def check_response_cache(app_configs, **kwargs):
+    config = getattr(settings, 'PROJECTS_RESPONSE_CACHE', {})
+    if settings.DEBUG or not config.get('ENABLED', True) or not is_local_cache(config.get('CACHE_ALIAS', 'default')):
+        return []
+    return [Warning(
+        "PROJECTS_RESPONSE_CACHE uses a per-process cache, so each worker caches anonymous project reads "
+        "on its own and sees other workers' writes to project lists only once its entries expire.",
+        hint='Point CACHE_BACKEND/CACHE_LOCATION at a Redis or Memcached cache shared by every worker.',
+        id='config.W002',
+    )]
+
+
+@register(Tags.caches, Tags.database)
+def check_replica_stickiness(app_configs, **kwargs):
+    if settings.DEBUG or not getattr(settings, 'DATABASE_REPLICAS', []) or not is_local_cache('default'):
+        return []
+    return [Warning(
+        "DATABASE_REPLICAS is set but the default cache is per-process, so clients that do not keep the "
+        "read-your-writes cookie can read from a lagging replica right after a write handled by another worker.",
+        hint='Point CACHE_BACKEND/CACHE_LOCATION at a Redis or Memcached cache shared by every worker.',
+        id='config.W003',
+    )]
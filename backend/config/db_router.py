@@ -0,0 +1,136 @@
+"""
+Read-replica routing.
+
+DATABASE_REPLICAS lists the aliases of databases that replicate `default`.
+Reads go to a replica only when it is safe. That means inside a
+`use_replicas()` block, which ReplicaRoutingMiddleware opens for
+safe-method requests from clients that have not written recently, and
+only outside a transaction on the primary. The chosen replica's measured
+lag must also be within REPLICA_MAX_LAG seconds. Everything else,
+including all writes and `select_for_update()`, goes to the primary.
+
+Reads whose results are cached under a version that just moved (see
+`primary_if_changed_since`) also stay on the primary. Otherwise a lagging
+replica could refill the cache with data from before the write.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+_use_replicas = ContextVar('use_replicas', default=False)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def use_replicas():
+    """Allow reads in this block to be served by a replica."""
+    token = _use_replicas.set(True)
+    try:
+        yield
+    finally:
+        _use_replicas.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Send every read in this block to the primary."""
+    token = _use_replicas.set(False)
+    try:
+        yield
+    finally:
+        _use_replicas.reset(token)
+
+
+def staleness_window():
+    """Longest a routed replica can be behind: the lag threshold plus the time between lag checks."""
+    return getattr(settings, 'REPLICA_MAX_LAG', 5) + getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 2)
+
+
+def primary_if_changed_since(changed_at):
+    """
+    Pin reads to the primary if data changed (epoch seconds `changed_at`)
+    more recently than a replica may lag behind.
+    """
+    if replica_aliases() and time.time() - changed_at < staleness_window():
+        return use_primary()
+    return nullcontext()
+
+
+def measure_lag(alias):
+    """Replication lag of `alias` in seconds; inf if it cannot be measured."""
+    connection = connections[alias]
+    try:
+        if connection.vendor != 'postgresql':
+            # No replication to measure (e.g. SQLite copies in development and tests)
+            return 0.0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 '
+                'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+                'ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+            )
+            return float(cursor.fetchone()[0])
+    except Exception:
+        logger.warning('Could not measure replication lag of %s; reading from the primary', alias, exc_info=True)
+        return float('inf')
+
+
+class LagMonitor:
+    """Per-process cache of replica lag, refreshed every REPLICA_LAG_CHECK_INTERVAL seconds."""
+
+    def __init__(self):
+        self._lags = {}
+        self._lock = threading.Lock()
+
+    def lag(self, alias):
+        interval = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 2)
+        checked = self._lags.get(alias)
+        if checked is None or time.monotonic() - checked[1] >= interval:
+            with self._lock:
+                checked = self._lags.get(alias)
+                if checked is None or time.monotonic() - checked[1] >= interval:
+                    checked = self._lags[alias] = (measure_lag(alias), time.monotonic())
+        return checked[0]
+
+    def reset(self):
+        with self._lock:
+            self._lags.clear()
+
+
+lag_monitor = LagMonitor()
+
+
+def healthy_replicas():
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG', 5)
+    return [alias for alias in replica_aliases() if lag_monitor.lag(alias) <= max_lag]
+
+
+class ReplicaRouter:
+    """Send reads to a healthy replica where allowed and everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if not _use_replicas.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = healthy_replicas()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so instances read from a replica are still saved to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
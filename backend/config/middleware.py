@@ -0,0 +1,105 @@
+"""
+Request middleware for the backend project.
+"""
+import hashlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+from .db_router import replica_aliases, use_replicas
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_KEY = 'db:sticky:{client}'
+STICKY_COOKIE = 'db_primary'
+
+
+def client_key(request):
+    """
+    Identify the client before authentication runs: a digest of its
+    Authorization header or session cookie, or None for anonymous clients.
+    """
+    credential = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credential:
+        return None
+    return hashlib.sha256(credential.encode()).hexdigest()
+
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+
+
+def has_sticky_cookie(request):
+    """True if the request carries a pin to the primary, signed by this deployment within REPLICA_STICKY_SECONDS."""
+    return request.get_signed_cookie(STICKY_COOKIE, default=None, salt=STICKY_COOKIE, max_age=sticky_seconds()) is not None
+
+
+def set_sticky_cookie(request, response):
+    response.set_signed_cookie(
+        STICKY_COOKIE, '1', salt=STICKY_COOKIE, max_age=sticky_seconds(),
+        secure=request.is_secure(), httponly=True, samesite='Lax',
+    )
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let safe-method requests read from replicas, with read-your-writes stickiness.
+
+    After a client's successful write, its reads stay on the primary for
+    REPLICA_STICKY_SECONDS, so it sees its own change even while replicas
+    catch up. Unsafe-method requests always use the primary.
+
+    The pin travels with the client as a signed cookie, so it holds whichever
+    worker serves the next read. Clients that drop cookies are also pinned by
+    their credentials in the default cache, which only reaches other workers
+    when that cache is shared (see config.checks).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_aliases():
+            return self.get_response(request)
+
+        client = client_key(request)
+        sticky_key = STICKY_KEY.format(client=client) if client else None
+        if request.method in SAFE_METHODS:
+            pinned = has_sticky_cookie(request) or (sticky_key is not None and cache.get(sticky_key))
+            if not pinned:
+                with use_replicas():
+                    return self.get_response(request)
+            return self.get_response(request)
+
+        response = self.get_response(request)
+        if response.status_code < 400:
+            set_sticky_cookie(request, response)
+            if sticky_key is not None:
+                cache.set(sticky_key, True, sticky_seconds())
+        return response
+
+    async def __acall__(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+
+        client = client_key(request)
+        sticky_key = STICKY_KEY.format(client=client) if client else None
+        if request.method in SAFE_METHODS:
+            pinned = has_sticky_cookie(request) or (sticky_key is not None and await cache.aget(sticky_key))
+            if not pinned:
+                with use_replicas():
+                    return await self.get_response(request)
+            return await self.get_response(request)
+
+        response = await self.get_response(request)
+        if response.status_code < 400:
+            set_sticky_cookie(request, response)
+            if sticky_key is not None:
+                await cache.aset(sticky_key, True, sticky_seconds())
+        return response
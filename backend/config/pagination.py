@@ -0,0 +1,106 @@
+"""
+Pagination classes shared by the API apps.
+"""
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class OptInCursorPagination(PageNumberPagination):
+    """
+    Page-number pagination that switches to keyset (cursor) pagination on request.
+
+    Clients opt in with `?pagination=cursor` and then follow the `next` and
+    `previous` links, which carry an opaque `cursor` parameter. Cursor pages
+    skip the COUNT(*) query and never use OFFSET, so deep pages cost the same
+    as the first one. The ordering comes from the view's `cursor_ordering`.
+    """
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    default_cursor_ordering = ('-created_at', '-id')
+
+    cursor_paginator = None
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+
+    def get_cursor_paginator(self, view):
+        paginator = CursorPagination()
+        paginator.ordering = getattr(view, 'cursor_ordering', self.default_cursor_ordering)
+        paginator.page_size = self.page_size
+        paginator.cursor_query_param = self.cursor_query_param
+        return paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = self.get_cursor_paginator(view)
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        return parameters + [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Set to "cursor" for keyset pagination without page counts.',
+                'schema': {'type': 'string', 'enum': ['cursor']},
+            },
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor value from the previous cursor-paginated response.',
+                'schema': {'type': 'string'},
+            },
+        ]
+
+
+async def apaginate_queryset(paginator, queryset, request, view=None):
+    """
+    Async version of `paginator.paginate_queryset` for page-number pagination.
+
+    The count and the page are fetched with the async ORM; the paginator is
+    left in the same state as after the sync call, so its
+    `get_paginated_response` works unchanged. Cursor pages, and other
+    paginator classes, run the sync method in a thread, since DRF evaluates
+    the queryset inside it.
+    """
+    cursor_mode = isinstance(paginator, OptInCursorPagination) and paginator.use_cursor(request)
+    if cursor_mode or not isinstance(paginator, PageNumberPagination):
+        return await sync_to_async(paginator.paginate_queryset)(queryset, request, view)
+
+    page_size = paginator.get_page_size(request)
+    if not page_size:
+        return None
+    if isinstance(paginator, OptInCursorPagination):
+        paginator.cursor_paginator = None
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    django_paginator.count = await queryset.acount()
+    page_number = paginator.get_page_number(request, django_paginator)
+    try:
+        paginator.page = django_paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(page_number=page_number, message=str(exc)))
+    paginator.page.object_list = [obj async for obj in paginator.page.object_list]
+
+    if django_paginator.num_pages > 1 and paginator.template is not None:
+        paginator.display_page_controls = True
+    paginator.request = request
+    return list(paginator.page)
@@ -0,0 +1,215 @@
+"""
+Serialize list pages from `values()` rows instead of model instances.
+
+For a large list page most of a DRF request's CPU goes into building a
+model instance per row and then, for every field of every row, resolving
+its source attribute and calling its to_representation through several
+layers of indirection. RowSerializer reads a serializer's fields once and
+compiles each into (output name, row getter, converter); a page is then
+one `values()` query and a loop over plain dicts.
+
+The output is the serializer's own. Converters are the fields'
+to_representation, or an equivalent with the per-call setting lookups done
+once (ISO 8601 datetimes, decimals coerced to strings); fields that render
+their value unchanged (read-only, primary key related) get none.
+Serializers opt in through Meta:
+
+- `row_fields`: field name -> values() lookup it renders unchanged, or a
+  RowValue computing it from several columns. Needed for fields whose
+  source is not a concrete model field (related attributes, properties,
+  SerializerMethodFields backed by an annotation).
+- `row_nested`: field name -> serializer class, for a foreign key rendered
+  as a nested object. The related rows are fetched with one query per page.
+
+A field covered by neither raises ImproperlyConfigured when the
+RowSerializer is built, rather than rendering something different.
+"""
+import decimal
+from datetime import datetime
+from operator import itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, fields as drf_fields
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+class RowValue:
+    """A field computed from several values() columns as `function(*columns)`."""
+
+    def __init__(self, function, *lookups):
+        self.function = function
+        self.lookups = lookups
+
+    def getter(self):
+        function, get = self.function, itemgetter(*self.lookups)
+        if len(self.lookups) == 1:
+            return lambda row: function(get(row))
+        return lambda row: function(*get(row))
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if not isinstance(value, datetime) or timezone.is_naive(value):
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.decimal_places is None:
+        return field.to_representation
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            return field.to_representation(value)
+        return format(value.quantize(exponent, rounding=rounding, context=context), 'f')
+    return convert
+
+
+def compile_converter(field):
+    """The function turning a row value into `field`'s output, or None to use it unchanged."""
+    if isinstance(field, (drf_fields.ReadOnlyField, drf_fields.SerializerMethodField)):
+        return None
+    if isinstance(field, PrimaryKeyRelatedField) and field.pk_field is None:
+        return None
+    if isinstance(field, drf_fields.DateTimeField):
+        return _datetime_converter(field)
+    if isinstance(field, drf_fields.DecimalField):
+        return _decimal_converter(field)
+    if type(field) is drf_fields.CharField:
+        return str
+    if type(field) is drf_fields.IntegerField:
+        return int
+    return field.to_representation
+
+
+class RowSerializer:
+    """
+    Render values() rows the way `serializer` renders model instances.
+
+    `serializer` is a serializer instance (as returned by a view's
+    get_serializer(), so sparse fieldsets apply); only its fields and Meta
+    are used. Build one per request: converters capture the active
+    timezone and decimal context.
+    """
+
+    def __init__(self, serializer):
+        meta = serializer.Meta
+        self.model = meta.model
+        self.pk_lookup = self.model._meta.pk.attname
+        model_fields = {field.name for field in self.model._meta.concrete_fields}
+        row_fields = getattr(meta, 'row_fields', {})
+        row_nested = getattr(meta, 'row_nested', {})
+
+        self.lookups = {self.pk_lookup}
+        self.plan = []
+        self.nested = {}
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            spec = row_fields.get(name)
+            if name in row_nested:
+                self.nested[name] = (field.source, row_nested[name](context=serializer.context))
+                self.lookups.add(field.source)
+                self.plan.append((name, itemgetter(field.source), None))
+            elif isinstance(spec, RowValue):
+                self.lookups.update(spec.lookups)
+                self.plan.append((name, spec.getter(), None))
+            elif spec is not None or field.source in model_fields:
+                lookup = spec or field.source
+                self.lookups.add(lookup)
+                self.plan.append((name, itemgetter(lookup), compile_converter(field) if spec is None else None))
+            else:
+                raise ImproperlyConfigured(
+                    f'{type(serializer).__name__}.{name} has no row source; '
+                    f'add it to Meta.row_fields or Meta.row_nested'
+                )
+
+    def values(self, queryset, *lookups):
+        """`queryset` as rows with the columns this serializer reads, plus `lookups` (e.g. a cursor ordering)."""
+        return queryset.prefetch_related(None).values(*self.lookups.union(lookups))
+
+    def _nested_queryset(self, name, rows):
+        source, serializer = self.nested[name]
+        ids = {row[source] for row in rows if row[source] is not None}
+        nested = RowSerializer(serializer)
+        queryset = serializer.Meta.model._default_manager.filter(pk__in=ids)
+        if hasattr(serializer, 'prepare_queryset'):
+            queryset = serializer.prepare_queryset(queryset)
+        return nested, nested.values(queryset)
+
+    def _render(self, rows, related):
+        plan = [(name, get, related[name].get if name in related else convert) for name, get, convert in self.plan]
+        data = []
+        for row in rows:
+            item = {}
+            for name, get, convert in plan:
+                value = get(row)
+                item[name] = value if value is None or convert is None else convert(value)
+            data.append(item)
+        return data
+
+    def to_representation(self, rows):
+        """Render a list of rows (e.g. a page) to a list of dicts."""
+        rows = list(rows)
+        related = {}
+        for name in self.nested:
+            nested, queryset = self._nested_queryset(name, rows)
+            nested_rows = list(queryset)
+            related[name] = dict(zip(
+                (row[nested.pk_lookup] for row in nested_rows), nested.to_representation(nested_rows)
+            ))
+        return self._render(rows, related)
+
+    async def ato_representation(self, rows):
+        """Async version of to_representation; nested rows are fetched with the async ORM."""
+        rows = list(rows)
+        related = {}
+        for name in self.nested:
+            nested, queryset = self._nested_queryset(name, rows)
+            nested_rows = [row async for row in queryset]
+            related[name] = dict(zip(
+                (row[nested.pk_lookup] for row in nested_rows), await nested.ato_representation(nested_rows)
+            ))
+        return self._render(rows, related)
+
+
+class RowListMixin:
+    """
+    ViewSet mixin serving `list` from values() rows through RowSerializer.
+
+    The view's serializer must support rows (see the module docstring).
+    Pagination works unchanged; the cursor ordering columns are added to
+    the rows so cursor links can be built from them.
+    """
+
+    def get_row_serializer(self):
+        return RowSerializer(self.get_serializer())
+
+    def get_row_queryset(self, row_serializer, queryset=None):
+        queryset = self.filter_queryset(self.get_queryset() if queryset is None else queryset)
+        ordering = [column.lstrip('-') for column in getattr(self, 'cursor_ordering', ())]
+        return row_serializer.values(queryset, *ordering)
+
+    def list(self, request, *args, **kwargs):
+        row_serializer = self.get_row_serializer()
+        queryset = self.get_row_queryset(row_serializer)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(row_serializer.to_representation(page))
+        return Response(row_serializer.to_representation(queryset))
@@ -39,10 +39,13 @@ INSTALLED_APPS = [
     'projects',
     'finance',
     'governance',
+    'loadtest',
+    'config',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'config.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,6 +90,86 @@ DATABASES = {
     }
 }
 
+# Read replicas of the default database (see config/db_router.py). DB_REPLICAS is a
+# comma-separated list of replica hosts (PostgreSQL) or database files (SQLite).
+DATABASE_REPLICAS = []
+for _index, _location in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(','))):
+    _alias = f'replica{_index + 1}'
+    _key = 'HOST' if DATABASES['default']['ENGINE'].endswith('postgresql') else 'NAME'
+    DATABASES[_alias] = {**DATABASES['default'], _key: _location.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+
+# Replicas further behind than this many seconds are skipped; lag is re-measured
+# every REPLICA_LAG_CHECK_INTERVAL seconds per process
+REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 5))
+REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', 2))
+# After a write, the client's reads stay on the primary for this many seconds
+REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'milestone-crowdfunding'),
+    }
+}
+
+# Seconds a cached project stats payload stays valid (it is also invalidated on writes)
+PROJECT_STATS_CACHE_TIMEOUT = int(os.environ.get('PROJECT_STATS_CACHE_TIMEOUT', 300))
+
+# Read-through cache for anonymous project list/detail responses (see projects/response_cache.py)
+PROJECTS_RESPONSE_CACHE = {
+    'ENABLED': os.environ.get('PROJECTS_RESPONSE_CACHE_ENABLED', 'True') == 'True',
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': int(os.environ.get('PROJECTS_RESPONSE_CACHE_TIMEOUT', 60)),
+    'LOCAL_MAX_ENTRIES': int(os.environ.get('PROJECTS_RESPONSE_CACHE_LOCAL_ENTRIES', 512)),
+    'LOCAL_TIMEOUT': 5,
+    # Serve stale entries for this long past TIMEOUT while one worker rebuilds
+    'STALE_TIMEOUT': int(os.environ.get('PROJECTS_RESPONSE_CACHE_STALE_TIMEOUT', 30)),
+    'LOCK_TIMEOUT': 10,
+    'WAIT_TIMEOUT': 2.0,
+}
+
+
+# Run refund batches on a background thread after commit; when False they run
+# inline in the request. Interrupted batches resume via `manage.py process_refund_batches`.
+REFUND_BATCHES_IN_BACKGROUND = os.environ.get('REFUND_BATCHES_IN_BACKGROUND', 'True') == 'True'
+
+
+# Seconds between deadline sweeps on a thread in each web process; 0 disables it
+# (then schedule `manage.py sweep_expired_projects` instead)
+PROJECT_SWEEPER_INTERVAL = int(os.environ.get('PROJECT_SWEEPER_INTERVAL', 0))
+
+
+# Audit log entries are buffered in-process and bulk inserted when this many
+# are waiting or every AUDIT_LOG_FLUSH_INTERVAL seconds (see governance.audit);
+# an interval of 0 flushes inline once the buffer is full
+AUDIT_LOG_BUFFER_SIZE = int(os.environ.get('AUDIT_LOG_BUFFER_SIZE', 200))
+AUDIT_LOG_FLUSH_INTERVAL = float(os.environ.get('AUDIT_LOG_FLUSH_INTERVAL', 2.0))
+# Where `manage.py archive_audit_logs` writes archived months
+AUDIT_LOG_ARCHIVE_DIR = os.environ.get('AUDIT_LOG_ARCHIVE_DIR', os.path.join(BASE_DIR, 'audit_archive'))
+
+
+# Serve the hot read endpoints (project list/detail, milestones, my pledges) with
+# native async views (see config/async_views.py). config/asgi.py turns this on;
+# leave it off under WSGI, where every async view needs its own event loop.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', 'False') == 'True'
+
+# Trending projects (see projects/trending.py): pledge momentum loses half its
+# weight every TRENDING_HALF_LIFE_HOURS; TRENDING_WEIGHTS overrides the weights
+# of the score components ('velocity', 'backers', 'funding')
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 24))
+TRENDING_WEIGHTS = {}
+
+# Rows fetched and written per chunk by the streaming CSV/Parquet exports
+# (see config/exports.py); also the Parquet row group size
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -141,11 +224,30 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    # JSON is encoded with orjson when installed, with the same bytes as JSONRenderer (see config/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'config.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Per-user (per-IP for login) limits of the throttles in config/throttling.py; None disables one
+    'DEFAULT_THROTTLE_RATES': {
+        'pledge': os.environ.get('THROTTLE_RATE_PLEDGE', '30/min'),
+        'vote': os.environ.get('THROTTLE_RATE_VOTE', '30/min'),
+        'login': os.environ.get('THROTTLE_RATE_LOGIN', '10/min'),
+    },
+    # Reverse proxies in front of the app. Throttles identify anonymous clients
+    # by the address the last of them saw in X-Forwarded-For, or by REMOTE_ADDR
+    # when 0; clients choose every other X-Forwarded-For entry
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
 
+# Cache holding the throttle counters; point it at a shared backend (Redis,
+# Memcached) so limits hold across worker processes
+THROTTLE_CACHE = os.environ.get('THROTTLE_CACHE', 'default')
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
@@ -0,0 +1,288 @@
+"""
+Shared fixtures for the query-budget test suite.
+
+`seed_marketplace` bulk-loads a realistic slice of users, projects,
+milestones, pledges, votes, releases, refunds and audit logs.
+`QueryBudgetTestCase.assertQueryBudget` requests an endpoint at several
+page sizes and fails if any of them runs more queries than the budget, so
+an N+1 shows up as soon as a page holds more than a handful of rows.
+
+Set QUERY_BUDGET_REPORT=1 to print, per endpoint and page size, the query
+count, total time, time spent in SQL and the remainder ("serialize":
+serializers, rendering and view code). QUERY_BUDGET_SCALE multiplies the
+seeded volumes.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+PAGE_SIZES = (5, 20, 50)
+SCALE = int(os.environ.get('QUERY_BUDGET_SCALE', 1))
+REPORT = os.environ.get('QUERY_BUDGET_REPORT') == '1'
+
+
+def seed_marketplace(scale=SCALE, seed=42):
+    """
+    Bulk-create a marketplace and return its key objects.
+
+    The returned dict holds a `creator` user who owns most projects and a
+    `backer` user with pledges and votes in every project, so per-user
+    endpoints have full pages at every size in PAGE_SIZES.
+    """
+    from finance.models import Pledge, Refund, Release, Wallet
+    from governance.models import AuditLog, Vote
+    from projects.models import Milestone, Project, Update
+    from projects.search import rebuild_index
+    from projects.trending import rebuild_scores
+    from users.models import Creator, User
+
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    users = User.objects.bulk_create(
+        [User(username=f'creator{i}', email=f'creator{i}@example.com', is_creator=True) for i in range(4 * scale)]
+        + [User(username=f'backer{i}', email=f'backer{i}@example.com') for i in range(60 * scale)]
+        + [User(username='admin', email='admin@example.com', is_admin=True, is_staff=True)]
+    )
+    creator_users = users[:4 * scale]
+    backers = users[4 * scale:-1]
+    creators = Creator.objects.bulk_create(
+        [Creator(user=user, display_name=f'Studio {user.username}') for user in creator_users]
+    )
+
+    projects = Project.objects.bulk_create([
+        Project(
+            creator=creators[0] if i % 2 == 0 else rng.choice(creators),
+            title=f'{rng.choice(["Solar", "Wind", "Board game", "Drone", "Garden"])} project {i}',
+            description='A realistic campaign description ' * 8,
+            goal_amount=Decimal(rng.randrange(1000, 50000)),
+            status='active' if i % 5 else 'funded',
+            start_date=now - timedelta(days=rng.randrange(1, 60)),
+            end_date=now + timedelta(days=rng.randrange(1, 60)),
+        )
+        for i in range(60 * scale)
+    ])
+
+    milestones = Milestone.objects.bulk_create([
+        Milestone(
+            project=project,
+            title=f'Milestone {index}',
+            description='Deliverables for this stage',
+            target_amount=project.goal_amount / 4,
+            order_index=index,
+            status=('approved', 'voting', 'pending', 'pending')[index - 1],
+        )
+        for project in projects
+        for index in range(1, 5)
+    ])
+    Update.objects.bulk_create([
+        Update(project=project, title=f'Update {index}', content='Progress report', created_by=project.creator.user)
+        for project in projects
+        for index in range(2)
+    ])
+
+    backer = backers[0]
+    pledges = [
+        Pledge(project=project, backer=backer, amount=Decimal(rng.randrange(10, 500)))
+        for project in projects
+    ] + [
+        Pledge(project=rng.choice(projects), backer=rng.choice(backers), amount=Decimal(rng.randrange(10, 500)))
+        for _ in range(400 * scale)
+    ]
+    pledges = Pledge.objects.bulk_create(pledges)
+    Project.rebuild_funding_counters()
+
+    voting = [milestone for milestone in milestones if milestone.status == 'voting']
+    Vote.objects.bulk_create([
+        Vote(milestone=milestone, backer=backer, decision=rng.choice(['approve', 'reject']), weight=Decimal('100'))
+        for milestone in voting
+    ])
+    Milestone.rebuild_vote_tallies()
+    rebuild_scores()
+
+    wallets = {
+        creator.pk: Wallet.objects.create(owner_type='creator', owner_id=creator.pk)
+        for creator in creators
+    }
+    Release.objects.bulk_create([
+        Release(
+            milestone=milestone,
+            amount_released=milestone.target_amount,
+            released_to_wallet=wallets[milestone.project.creator_id],
+        )
+        for milestone in milestones if milestone.status == 'approved'
+    ])
+    Wallet.objects.create(owner_type='backer', owner_id=backer.pk)
+    Refund.objects.bulk_create([
+        Refund(pledge=pledge, amount=pledge.amount, reason='Changed my mind')
+        for pledge in pledges[:len(projects)]
+    ])
+    AuditLog.objects.bulk_create([
+        AuditLog(
+            actor_type=rng.choice(['creator', 'backer', 'system']),
+            actor_id=rng.choice(backers).pk,
+            action=rng.choice(['pledge.created', 'vote.cast', 'milestone.released']),
+            entity_type=rng.choice(['project', 'milestone', 'pledge']),
+            entity_id=rng.choice(projects).pk,
+            metadata={'source': 'seed'},
+        )
+        for _ in range(200 * scale)
+    ])
+    rebuild_index()
+
+    return {
+        'creator': creator_users[0],
+        'backer': backer,
+        'admin': users[-1],
+        'project': projects[0],
+        'milestone': voting[0],
+    }
+
+
+@contextmanager
+def sqlite_replica(alias='replica1'):
+    """
+    Register a migrated SQLite file as a read replica of `default` for the block.
+
+    Nothing replicates into it, so a test can tell from the rows it reads
+    which database served a request.
+    """
+    handle, path = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(handle)
+    connections.settings[alias] = connections.configure_settings({
+        DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+        alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path, 'TEST': {'NAME': path}},
+    })[alias]
+    try:
+        call_command('migrate', database=alias, verbosity=0)
+        with override_settings(DATABASE_REPLICAS=[alias]):
+            yield alias
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+        os.remove(path)
+
+
+def call_async_view(view, path, method='get', user=None, headers=None, data=None, **kwargs):
+    """Request `path` through the async view callable `view`, authenticated as `user` with a JWT."""
+    headers = dict(headers or {})
+    if user is not None:
+        headers['Authorization'] = f'Bearer {AccessToken.for_user(user)}'
+    factory = AsyncRequestFactory()
+    if method == 'get':
+        request = factory.get(path, data, headers=headers)
+    else:
+        request = getattr(factory, method)(path, data, content_type='application/json', headers=headers)
+    return async_to_sync(view)(request, **kwargs)
+
+
+class SQLTimer:
+    """Database execute wrapper that adds up time spent in SQL."""
+
+    def __init__(self):
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - started
+
+
+@override_settings(PROJECTS_RESPONSE_CACHE={'ENABLED': False})
+class QueryBudgetTestCase(APITestCase):
+    """
+    Base class for endpoint query budgets.
+
+    Data is seeded once per class. Caches are cleared before every test, and
+    the anonymous response cache is off, so budgets measure the cold path.
+    """
+    page_sizes = PAGE_SIZES
+    results = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_marketplace()
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.results = []
+
+    @classmethod
+    def tearDownClass(cls):
+        if REPORT and cls.results:
+            cls.print_report()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+    def assertQueryBudget(self, url, budget, user=None, page_sizes=None, min_results=None):
+        """
+        GET `url` at each page size and assert at most `budget` queries each time.
+
+        Pass `page_sizes=()` for unpaginated endpoints, which are requested
+        once. `min_results` guards against a budget passing on an empty page.
+        Returns the last response.
+        """
+        client = self.client_for(user)
+        sizes = self.page_sizes if page_sizes is None else page_sizes
+        response = None
+        for size in sizes or (None,):
+            with mock.patch.object(PageNumberPagination, 'page_size', size or PageNumberPagination.page_size):
+                cache.clear()
+                timer = SQLTimer()
+                started = time.perf_counter()
+                with connection.execute_wrapper(timer), CaptureQueriesContext(connection) as queries:
+                    response = client.get(url)
+                elapsed = time.perf_counter() - started
+
+            self.assertEqual(response.status_code, 200, f'{url}: {response.status_code}')
+            self.results.append((url, size, len(queries), elapsed, timer.elapsed))
+            if min_results is not None:
+                data = response.data
+                rows = data.get('results', data) if isinstance(data, dict) else data
+                self.assertGreaterEqual(len(rows), min(min_results, size or min_results), url)
+            self.assertLessEqual(
+                len(queries), budget,
+                f'{url} (page size {size}) ran {len(queries)} queries, budget is {budget}:\n'
+                + '\n'.join(query['sql'] for query in queries.captured_queries)
+            )
+        return response
+
+    @classmethod
+    def print_report(cls):
+        out = sys.stderr
+        out.write(f'\n{cls.__name__}\n')
+        out.write(f'{"endpoint":<55} {"size":>5} {"queries":>8} {"total ms":>9} {"sql ms":>8} {"serialize ms":>12}\n')
+        for url, size, count, elapsed, sql_time in cls.results:
+            out.write(
+                f'{url:<55} {size or "-":>5} {count:>8} {elapsed * 1000:>9.1f} '
+                f'{sql_time * 1000:>8.1f} {(elapsed - sql_time) * 1000:>12.1f}\n'
+            )
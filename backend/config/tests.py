@@ -0,0 +1,292 @@
+"""
+Tests for read-replica routing against two SQLite files, the row serializers and JSON renderer, and throttling.
+"""
+import datetime
+import uuid
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.mixins import ListModelMixin
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITransactionTestCase
+
+from config.checks import check_replica_stickiness, check_response_cache, check_throttle_cache
+from config.db_router import lag_monitor, use_replicas
+from config.middleware import STICKY_COOKIE
+from config.renderers import FastJSONRenderer
+from config.row_serializers import RowListMixin, RowSerializer
+from config.throttling import SlidingWindowThrottle
+from config.testing import QueryBudgetTestCase, sqlite_replica
+from finance.models import Pledge
+from finance.serializers import PledgeSerializer
+from projects.models import Project
+from projects.serializers import ProjectListSerializer
+from users.models import User
+
+
+class ReplicaRoutingTests(APITransactionTestCase):
+    # Not TestCase: its per-test transaction would keep every read on the primary
+
+    def setUp(self):
+        cache.clear()
+        lag_monitor.reset()
+        self.user = User.objects.create_user('reader', email='reader@example.com', password='pw')
+        self.client.force_authenticate(self.user)
+        # Identifies the client to the middleware, which runs before authentication
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer reader-token')
+
+    def usernames(self):
+        response = self.client.get('/api/users/')
+        self.assertEqual(response.status_code, 200)
+        return {user['username'] for user in response.data['results']}
+
+    def test_reads_go_to_the_replica(self):
+        with sqlite_replica() as replica:
+            User.objects.db_manager(replica).create_user('replicated', email='replicated@example.com')
+            self.assertEqual(self.usernames(), {'replicated'})
+
+    def test_client_reads_its_own_writes_from_the_primary(self):
+        with sqlite_replica() as replica:
+            User.objects.db_manager(replica).create_user('replicated', email='replicated@example.com')
+            response = self.client.patch('/api/users/me/', {'wallet_address': '0xabc'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(User.objects.using('default').get(pk=self.user.pk).wallet_address, '0xabc')
+            self.assertEqual(self.usernames(), {'reader'})
+
+            # Another worker, with nothing in its own cache, honours the signed cookie
+            cache.clear()
+            self.assertEqual(self.usernames(), {'reader'})
+
+            # Other clients are not pinned
+            self.client.cookies.clear()
+            self.client.credentials(HTTP_AUTHORIZATION='Bearer another-token')
+            self.assertEqual(self.usernames(), {'replicated'})
+
+    def test_forged_pin_is_ignored(self):
+        with sqlite_replica() as replica:
+            User.objects.db_manager(replica).create_user('replicated', email='replicated@example.com')
+            self.client.cookies[STICKY_COOKIE] = '1'
+            self.assertEqual(self.usernames(), {'replicated'})
+
+    def test_lagging_replica_falls_back_to_the_primary(self):
+        with sqlite_replica() as replica, mock.patch('config.db_router.measure_lag', return_value=60.0):
+            User.objects.db_manager(replica).create_user('replicated', email='replicated@example.com')
+            self.assertEqual(self.usernames(), {'reader'})
+
+    def test_writes_and_transactions_use_the_primary(self):
+        with sqlite_replica() as replica, use_replicas():
+            self.assertEqual(User.objects.db, replica)
+            created = User.objects.create_user('writer', email='writer@example.com')
+            self.assertEqual(created._state.db, 'default')
+            with transaction.atomic():
+                self.assertEqual(User.objects.db, 'default')
+                self.assertTrue(User.objects.filter(username='writer').exists())
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """FastJSONRenderer writes the same bytes as JSONRenderer."""
+
+    def assertSameBytes(self, data, accepted_media_type=None):
+        expected = JSONRenderer().render(data, accepted_media_type)
+        self.assertEqual(FastJSONRenderer().render(data, accepted_media_type), expected)
+
+    def test_same_bytes(self):
+        now = datetime.datetime(2030, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc)
+        self.assertSameBytes({
+            'int': 12, 'big': 2 ** 70, 'float': 12.5, 'negative': -0.0, 'bool': True, 'none': None,
+            'decimal': Decimal('1234.50'), 'datetime': now, 'naive': now.replace(tzinfo=None),
+            'date': now.date(), 'time': now.time(), 'delta': datetime.timedelta(hours=1),
+            'uuid': uuid.UUID(int=7), 'lazy': gettext_lazy('Active'), 'tuple': (1, 2),
+            'text': 'caf\u00e9 \U0001F600 "quoted" \\ \u2028 \u2029 \x00',
+        })
+        self.assertSameBytes([{'id': 1}, {'id': 2}])
+        self.assertSameBytes('plain')
+        self.assertSameBytes({1: 'non-string key'})
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_floats_json_writes_with_an_exponent(self):
+        for value in (1e-05, 9.7e-06, 0.00012, 2.5e-07, 1e16, 6.2e62, 123456789.0, 1.5e300, -3e-5, 33.333333333333336):
+            self.assertSameBytes({'value': value})
+            self.assertSameBytes([{'nested': (1, value)}])
+            self.assertSameBytes(value)
+
+    def test_decimals_encoded_as_floats(self):
+        self.assertSameBytes({'small': Decimal('0.00001'), 'plain': Decimal('12.50')})
+
+    def test_nan_is_rejected(self):
+        for value in (float('nan'), float('inf')):
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({'value': value})
+
+    def test_indent(self):
+        self.assertSameBytes({'a': [1, 2]}, 'application/json; indent=4')
+
+
+class RowSerializerTests(QueryBudgetTestCase):
+    """Rows rendered through RowSerializer match the model serializers byte for byte."""
+
+    def assertSameOutput(self, serializer_class, queryset, **kwargs):
+        expected = JSONRenderer().render(serializer_class(list(queryset), many=True, **kwargs).data)
+        rows = RowSerializer(serializer_class(**kwargs))
+        rendered = FastJSONRenderer().render(rows.to_representation(rows.values(queryset)))
+        self.assertEqual(rendered, expected)
+
+    def test_project_list(self):
+        # A progress below 1e-4 percent, which json.dumps writes with an exponent
+        Project.objects.filter(pk=self.data['project'].pk).update(total_pledged=Decimal('0.01'), goal_amount=Decimal('49999'))
+        self.assertSameOutput(ProjectListSerializer, ProjectListSerializer.prepare_queryset(Project.objects.all()))
+        fields = ['id', 'title', 'progress_percentage']
+        self.assertSameOutput(
+            ProjectListSerializer, ProjectListSerializer.prepare_queryset(Project.objects.all(), fields), fields=fields
+        )
+
+    def test_pledge_list(self):
+        queryset = Pledge.objects.filter(backer=self.data['backer']).select_related('backer').prefetch_related('project')
+        self.assertSameOutput(PledgeSerializer, queryset)
+
+    def test_list_endpoints(self):
+        client = self.client_for(self.data['backer'])
+        for url in ('/api/projects/?page=2', '/api/projects/?pagination=cursor&fields=id,title',
+                    '/api/projects/?search=solar', '/api/finance/pledges/', '/api/finance/pledges/?pagination=cursor'):
+            cache.clear()
+            fast = client.get(url)
+            cache.clear()
+            with mock.patch.object(RowListMixin, 'list', ListModelMixin.list), \
+                    mock.patch.object(FastJSONRenderer, 'render', JSONRenderer.render):
+                expected = client.get(url)
+            self.assertEqual(fast.status_code, 200, url)
+            self.assertEqual(fast.content, expected.content, url)
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+class SlidingWindowThrottleTests(SimpleTestCase):
+    """The throttle weighs the previous window by how much of it is still inside the last minute."""
+
+    def setUp(self):
+        cache.clear()
+        self.now = 6000.0
+        self.request = APIRequestFactory().get('/', REMOTE_ADDR='10.0.0.1')
+        self.request.user = None
+
+    def allowed(self):
+        throttle = SlidingWindowThrottle()
+        throttle.timer = lambda: self.now
+        return throttle.allow_request(self.request, None), throttle.wait()
+
+    @throttle_rates(test='3/min')
+    def test_sliding_window(self):
+        with mock.patch.object(SlidingWindowThrottle, 'scope', 'test', create=True):
+            self.assertEqual([self.allowed()[0] for _ in range(3)], [True] * 3)
+            allowed, wait = self.allowed()
+            self.assertFalse(allowed)
+            # The next window still holds the three requests at full weight
+            self.assertAlmostEqual(wait, 80)
+            self.now += 60
+            self.assertFalse(self.allowed()[0])
+            # Half of the previous window has slid out: 1.5 + 1 fits, 1.5 + 2 does not
+            self.now += 30
+            self.assertTrue(self.allowed()[0])
+            allowed, wait = self.allowed()
+            self.assertFalse(allowed)
+            self.assertAlmostEqual(wait, 10)
+            self.now += 120
+            self.assertTrue(self.allowed()[0])
+
+    @throttle_rates(test=None)
+    def test_disabled(self):
+        with mock.patch.object(SlidingWindowThrottle, 'scope', 'test', create=True):
+            self.assertTrue(all(self.allowed()[0] for _ in range(100)))
+
+
+class EndpointThrottleTests(QueryBudgetTestCase):
+    """Pledge, vote and login endpoints answer 429 once a client is over its limit."""
+
+    @throttle_rates(pledge='1/min', vote='30/min', login='10/min')
+    def test_pledge_limit_is_shared_by_pledge_endpoints(self):
+        client = self.client_for(self.data['backer'])
+        project = self.data['project']
+        # Refused by validation, but still counted
+        self.assertEqual(client.post(f'/api/projects/{project.pk}/pledge/', {'amount': -1}).status_code, 400)
+        response = client.post(f'/api/projects/{project.pk}/pledge/', {'amount': -1})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(client.post('/api/finance/pledges/', {'project': project.pk, 'amount': -1}).status_code, 429)
+        # Other users have their own limit, and reads are not throttled
+        self.assertEqual(
+            self.client_for(self.data['creator']).post(f'/api/projects/{project.pk}/pledge/', {'amount': -1}).status_code,
+            400,
+        )
+        self.assertEqual(client.get('/api/finance/pledges/').status_code, 200)
+
+    @throttle_rates(pledge='30/min', vote='1/min', login='10/min')
+    def test_vote_create(self):
+        client = self.client_for(self.data['backer'])
+        self.assertEqual(client.post('/api/governance/votes/', {}).status_code, 400)
+        self.assertEqual(client.post('/api/governance/votes/', {}).status_code, 429)
+
+    @throttle_rates(pledge='30/min', vote='30/min', login='2/min')
+    def test_token_endpoint_per_ip(self):
+        credentials = {'username': 'nobody', 'password': 'wrong'}
+        for _ in range(2):
+            self.assertEqual(self.client.post('/api/token/', credentials).status_code, 401)
+        self.assertEqual(self.client.post('/api/token/', credentials).status_code, 429)
+        self.assertEqual(self.client.post('/api/token/', credentials, REMOTE_ADDR='10.0.0.2').status_code, 401)
+
+    @throttle_rates(pledge='30/min', vote='30/min', login='2/min')
+    def test_token_endpoint_ignores_spoofed_forwarded_for(self):
+        credentials = {'username': 'nobody', 'password': 'wrong'}
+        statuses = [
+            self.client.post('/api/token/', credentials, HTTP_X_FORWARDED_FOR=f'203.0.113.{i}').status_code
+            for i in range(3)
+        ]
+        self.assertEqual(statuses, [401, 401, 429])
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1, 'DEFAULT_THROTTLE_RATES': {
+        'pledge': '30/min', 'vote': '30/min', 'login': '2/min',
+    }})
+    def test_token_endpoint_behind_proxy(self):
+        credentials = {'username': 'nobody', 'password': 'wrong'}
+        # Behind one proxy the client is the address it appended, whatever the client put before it
+        statuses = [
+            self.client.post('/api/token/', credentials, HTTP_X_FORWARDED_FOR=f'203.0.113.{i}, 198.51.100.7').status_code
+            for i in range(3)
+        ]
+        self.assertEqual(statuses, [401, 401, 429])
+        response = self.client.post('/api/token/', credentials, HTTP_X_FORWARDED_FOR='198.51.100.8')
+        self.assertEqual(response.status_code, 401)
+
+
+class CacheCheckTests(SimpleTestCase):
+    """System checks warn when state that must be shared across workers sits in a per-process cache."""
+
+    @override_settings(DEBUG=False, THROTTLE_CACHE='default', CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    })
+    def test_local_throttle_cache(self):
+        self.assertEqual([warning.id for warning in check_throttle_cache(None)], ['config.W001'])
+
+    @override_settings(DEBUG=True)
+    def test_debug(self):
+        self.assertEqual(check_throttle_cache(None), [])
+
+    @override_settings(DEBUG=False, PROJECTS_RESPONSE_CACHE={'ENABLED': True, 'CACHE_ALIAS': 'default'}, CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    })
+    @override_settings(DEBUG=False, DATABASE_REPLICAS=['replica1'], CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    })
+    def test_replicas_with_local_cache(self):
+        self.assertEqual([warning.id for warning in check_replica_stickiness(None)], ['config.W003'])
+
+    def test_local_response_cache(self):
+        self.assertEqual([warning.id for warning in check_response_cache(None)], ['config.W002'])
+        with override_settings(PROJECTS_RESPONSE_CACHE={'ENABLED': False}):
+            self.assertEqual(check_response_cache(None), [])
@@ -10,4 +10,9 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
 
+# Optional in-process deadline sweeper (PROJECT_SWEEPER_INTERVAL)
+from projects.sweeper import start_scheduler  # noqa: E402
+
+start_scheduler()
+
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Wallet, Pledge, Release, Refund
+from .models import Wallet, Pledge, Release, Refund, RefundBatch, LedgerEntry, WalletSnapshot
 
 
 @admin.register(Wallet)
@@ -7,6 +7,7 @@ class WalletAdmin(admin.ModelAdmin):
     list_display = ('owner_type', 'owner_id', 'balance', 'currency', 'created_at')
     list_filter = ('owner_type', 'currency', 'created_at')
     search_fields = ('owner_id',)
+    readonly_fields = ('balance',)
 
 
 @admin.register(Pledge)
@@ -30,3 +31,34 @@ class RefundAdmin(admin.ModelAdmin):
     search_fields = ('pledge__backer__username', 'reason')
 
 
+@admin.register(RefundBatch)
+class RefundBatchAdmin(admin.ModelAdmin):
+    list_display = ('project', 'milestone', 'reason', 'status', 'processed_pledges', 'total_pledges', 'refunded_amount', 'created_at')
+    list_filter = ('status', 'reason', 'created_at')
+    search_fields = ('project__title',)
+    readonly_fields = ('processed_pledges', 'refunded_amount', 'last_pledge_id', 'locked_until')
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'wallet', 'entry_type', 'amount', 'release', 'refund', 'created_at')
+    list_filter = ('entry_type', 'created_at')
+    search_fields = ('memo',)
+    raw_id_fields = ('wallet', 'release', 'refund')
+
+    # Entries are written through Wallet.credit, which also moves the balance
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(WalletSnapshot)
+class WalletSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('wallet', 'balance', 'last_entry', 'created_at')
+    list_filter = ('created_at',)
+    raw_id_fields = ('wallet', 'last_entry')
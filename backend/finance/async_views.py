@@ -0,0 +1,14 @@
+"""
+Async version of the backer's pledge list (see config.async_views).
+"""
+from config.async_views import AsyncReadView
+from .views import PledgeViewSet
+
+
+class PledgeListView(AsyncReadView):
+    """GET /api/finance/pledges/"""
+    viewset = PledgeViewSet
+    actions = {'get': 'list', 'post': 'create'}
+
+    async def get(self, request):
+        return await self.list()
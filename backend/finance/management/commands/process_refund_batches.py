@@ -0,0 +1,34 @@
+"""
+Process pending refund batches and resume interrupted ones.
+"""
+from django.core.management.base import BaseCommand
+
+from finance.refunds import CHUNK_SIZE, claimable_refund_batches, process_refund_batch
+
+
+class Command(BaseCommand):
+    help = 'Run pending refund batches, and running ones whose worker lease has lapsed, to completion.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'batch_ids', nargs='*', type=int,
+            help='Only process these batches (default: every claimable batch).',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help=f'Pledges refunded per transaction (default: {CHUNK_SIZE}).',
+        )
+
+    def handle(self, *args, **options):
+        batches = claimable_refund_batches()
+        if options['batch_ids']:
+            batches = batches.filter(pk__in=options['batch_ids'])
+        processed = 0
+        for batch_id in list(batches.values_list('pk', flat=True)):
+            batch = process_refund_batch(batch_id, options['chunk_size'])
+            self.stdout.write(
+                f'Batch {batch.pk}: {batch.status}, {batch.processed_pledges}/{batch.total_pledges} pledges, '
+                f'{batch.refunded_amount} refunded'
+            )
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} refund batch(es).'))
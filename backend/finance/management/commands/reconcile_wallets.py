@@ -0,0 +1,30 @@
+"""
+Reconcile stored wallet balances against the append-only ledger.
+"""
+from django.core.management.base import BaseCommand
+
+from finance.models import Wallet
+
+
+class Command(BaseCommand):
+    help = 'Recompute wallet balances from the ledger (latest snapshot plus newer entries) and fix any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'wallet_ids', nargs='*', type=int,
+            help='Only reconcile these wallets (default: all wallets).',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report mismatched wallets without updating them.',
+        )
+
+    def handle(self, *args, **options):
+        mismatched = Wallet.reconcile_balances(
+            options['wallet_ids'] or None,
+            dry_run=options['dry_run'],
+        )
+        for wallet_id, balance, ledger_balance in mismatched:
+            self.stdout.write(f'Wallet {wallet_id}: stored {balance}, ledger {ledger_balance}')
+        verb = 'Found' if options['dry_run'] else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(mismatched)} wallet(s) out of step with the ledger.'))
@@ -0,0 +1,20 @@
+"""
+Snapshot wallet balances from the ledger. Run periodically (e.g. hourly from cron).
+"""
+from django.core.management.base import BaseCommand
+
+from finance.models import Wallet
+
+
+class Command(BaseCommand):
+    help = 'Record a balance snapshot for every wallet with ledger entries since its last snapshot.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'wallet_ids', nargs='*', type=int,
+            help='Only snapshot these wallets (default: all wallets).',
+        )
+
+    def handle(self, *args, **options):
+        count = Wallet.take_snapshots(options['wallet_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Took {count} wallet snapshot(s).'))
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pledge',
+            index=models.Index(fields=['backer', '-created_at', '-id'], name='finance_ple_backer__e0203c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='refund',
+            index=models.Index(fields=['-created_at', '-id'], name='finance_ref_created_7f1a46_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='release',
+            index=models.Index(fields=['-released_at', '-id'], name='finance_rel_release_9886bd_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def open_ledgers(apps, schema_editor):
+    """Carry existing balances into the ledger as opening entries."""
+    Wallet = apps.get_model('finance', 'Wallet')
+    LedgerEntry = apps.get_model('finance', 'LedgerEntry')
+    LedgerEntry.objects.bulk_create(
+        (
+            LedgerEntry(wallet_id=wallet_id, amount=balance, entry_type='opening', memo='Balance before the ledger')
+            for wallet_id, balance in Wallet.objects.exclude(balance=0).values_list('id', 'balance').iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_pledge_finance_ple_backer__e0203c_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('entry_type', models.CharField(choices=[('opening', 'Opening balance'), ('release', 'Release'), ('refund', 'Refund'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('memo', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('refund', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='finance.refund')),
+                ('release', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='finance.release')),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='finance.wallet')),
+            ],
+            options={
+                'verbose_name_plural': 'ledger entries',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WalletSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_entry', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='finance.ledgerentry')),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='finance.wallet')),
+            ],
+            options={
+                'ordering': ['-last_entry_id'],
+                'indexes': [models.Index(fields=['wallet', '-last_entry'], name='finance_wal_wallet__7a8649_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['wallet', 'id'], name='finance_led_wallet__b15af5_idx'),
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
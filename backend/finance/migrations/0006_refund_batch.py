@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_milestone_approve_votes_count_and_more'),
+        ('finance', '0005_wallet_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefundBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('milestone_rejected', 'Milestone rejected'), ('project_failed', 'Project failed')], max_length=30)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('pledged_total', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('refund_pool', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('max_pledge_id', models.BigIntegerField()),
+                ('total_pledges', models.PositiveIntegerField()),
+                ('processed_pledges', models.PositiveIntegerField(default=0)),
+                ('refunded_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('last_pledge_id', models.BigIntegerField(default=0)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('milestone', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='refund_batches', to='projects.milestone')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='refund_batches', to='projects.project')),
+            ],
+            options={
+                'verbose_name_plural': 'refund batches',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'locked_until'], name='finance_ref_status_d409dc_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='refundbatch',
+            constraint=models.UniqueConstraint(fields=('milestone',), name='unique_refund_batch_per_milestone'),
+        ),
+        migrations.AddConstraint(
+            model_name='refundbatch',
+            constraint=models.UniqueConstraint(condition=models.Q(('milestone__isnull', True)), fields=('project',), name='unique_refund_batch_per_failed_project'),
+        ),
+    ]
@@ -1,12 +1,17 @@
 """
 Finance models for wallets, pledges, releases, and refunds.
 """
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import BigIntegerField, Case, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from users.models import User
 from projects.models import Project, Milestone
+from projects.trending import record_pledge, record_pledge_removal
 
 
 class Wallet(models.Model):
@@ -40,6 +45,164 @@ class Wallet(models.Model):
         )
         return wallet
 
+    @classmethod
+    def get_or_create_wallets(cls, owner_type, keys):
+        """Return {(owner_id, currency): wallet id} for `keys`, creating missing wallets in bulk."""
+        keys = set(keys)
+
+        def existing():
+            wallets = cls.objects.filter(
+                owner_type=owner_type, owner_id__in={owner_id for owner_id, _ in keys}
+            ).values_list('owner_id', 'currency', 'id')
+            return {(owner_id, currency): pk for owner_id, currency, pk in wallets if (owner_id, currency) in keys}
+
+        found = existing()
+        missing = keys - found.keys()
+        if missing:
+            cls.objects.bulk_create(
+                [cls(owner_type=owner_type, owner_id=owner_id, currency=currency) for owner_id, currency in missing],
+                ignore_conflicts=True,
+            )
+            found = existing()
+        return found
+
+    def credit(self, amount, entry_type, release=None, refund=None, memo=''):
+        """
+        Append a ledger entry and apply it to the balance (negative amounts debit).
+
+        The balance moves with a single F-expression update, so concurrent
+        credits never lose each other. It runs before the entry is inserted:
+        the wallet row lock it takes keeps the entry ordered against
+        `take_snapshot`. A debit larger than the balance raises ValueError
+        and changes nothing, as balances never go below zero.
+        """
+        wallets = Wallet.objects.filter(pk=self.pk)
+        if amount < 0:
+            wallets = wallets.filter(balance__gte=-amount)
+        with transaction.atomic():
+            if not wallets.update(balance=F('balance') + amount) and amount < 0:
+                raise ValueError(f'Wallet {self.pk} has less than {-amount} to debit')
+            entry = LedgerEntry.objects.create(
+                wallet=self, amount=amount, entry_type=entry_type,
+                release=release, refund=refund, memo=memo,
+            )
+        self.refresh_from_db(fields=['balance'])
+        return entry
+
+    @classmethod
+    def credit_many(cls, entries):
+        """
+        Apply many unsaved LedgerEntry objects in two statements.
+
+        Balances move with one UPDATE of F('balance') plus a per-wallet
+        CASE, then the entries are bulk inserted. Call inside a transaction.
+        Only credits are accepted; debit through `credit`, which checks the
+        balance.
+        """
+        deltas = {}
+        for entry in entries:
+            deltas[entry.wallet_id] = deltas.get(entry.wallet_id, 0) + entry.amount
+        if not deltas:
+            return []
+        if any(entry.amount < 0 for entry in entries):
+            raise ValueError('credit_many only applies credits; debit through Wallet.credit')
+        cls.objects.filter(pk__in=deltas).update(
+            balance=F('balance') + Case(
+                *[When(pk=wallet_id, then=Value(delta)) for wallet_id, delta in sorted(deltas.items())],
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
+        return LedgerEntry.objects.bulk_create(entries)
+
+    @classmethod
+    def with_ledger_balance(cls):
+        """
+        Annotate wallets with `ledger_balance`, the balance implied by the ledger.
+
+        Starts from each wallet's latest snapshot and adds only the entries
+        appended after it, so the cost grows with recent activity rather
+        than with the full ledger history.
+        """
+        amount = DecimalField(max_digits=14, decimal_places=2)
+        latest = WalletSnapshot.objects.filter(wallet=OuterRef('pk')).order_by('-last_entry_id')
+        since_snapshot = LedgerEntry.objects.filter(
+            wallet=OuterRef('pk'), id__gt=OuterRef('snapshot_entry_id')
+        ).order_by().values('wallet').annotate(total=Sum('amount')).values('total')
+        return cls.objects.annotate(
+            snapshot_entry_id=Coalesce(Subquery(latest.values('last_entry_id')[:1]), 0, output_field=BigIntegerField()),
+            snapshot_balance=Coalesce(Subquery(latest.values('balance')[:1]), Value(Decimal('0')), output_field=amount),
+        ).annotate(
+            ledger_balance=F('snapshot_balance') + Coalesce(
+                Subquery(since_snapshot), Value(Decimal('0')), output_field=amount
+            ),
+        )
+
+    def take_snapshot(self):
+        """Record the ledger balance up to the latest entry. Returns None if nothing changed."""
+        with transaction.atomic():
+            # Waits for in-flight credits, which hold this lock until they commit
+            Wallet.objects.select_for_update().filter(pk=self.pk).exists()
+            row = Wallet.with_ledger_balance().filter(pk=self.pk).values(
+                'ledger_balance', 'snapshot_entry_id'
+            ).get()
+            last_entry_id = LedgerEntry.objects.filter(wallet=self).order_by('-id').values_list('id', flat=True).first()
+            if last_entry_id is None or last_entry_id == row['snapshot_entry_id']:
+                return None
+            return WalletSnapshot.objects.create(
+                wallet=self, balance=row['ledger_balance'], last_entry_id=last_entry_id
+            )
+
+    @classmethod
+    def take_snapshots(cls, wallet_ids=None):
+        """Snapshot every wallet with ledger entries since its last snapshot. Returns the number taken."""
+        wallets = cls.objects.filter(
+            ledger_entries__id__gt=Coalesce(
+                Subquery(
+                    WalletSnapshot.objects.filter(wallet=OuterRef('pk'))
+                    .order_by('-last_entry_id').values('last_entry_id')[:1]
+                ),
+                0,
+                output_field=BigIntegerField(),
+            )
+        ).distinct()
+        if wallet_ids is not None:
+            wallets = wallets.filter(pk__in=wallet_ids)
+        taken = 0
+        for wallet in wallets.only('id').iterator(chunk_size=500):
+            if wallet.take_snapshot() is not None:
+                taken += 1
+        return taken
+
+    @classmethod
+    def reconcile_balances(cls, wallet_ids=None, dry_run=False, chunk_size=1000):
+        """
+        Compare stored balances with the ledger. Returns (wallet id, stored, ledger) for each mismatch.
+
+        Wallets are streamed from one query; mismatches are re-checked and
+        fixed under a row lock so a concurrent credit is not overwritten.
+        """
+        wallets = cls.with_ledger_balance().order_by('pk')
+        if wallet_ids is not None:
+            wallets = wallets.filter(pk__in=wallet_ids)
+        mismatched = [
+            row for row in wallets.values_list('pk', 'balance', 'ledger_balance').iterator(chunk_size=chunk_size)
+            if row[1] != row[2]
+        ]
+        if dry_run:
+            return mismatched
+
+        fixed = []
+        for wallet_id, _, _ in mismatched:
+            with transaction.atomic():
+                balance = cls.objects.select_for_update().filter(pk=wallet_id).values_list('balance', flat=True).get()
+                ledger_balance = cls.with_ledger_balance().filter(pk=wallet_id).values_list(
+                    'ledger_balance', flat=True
+                ).get()
+                if balance != ledger_balance:
+                    cls.objects.filter(pk=wallet_id).update(balance=ledger_balance)
+                    fixed.append((wallet_id, balance, ledger_balance))
+        return fixed
+
 
 class Pledge(models.Model):
     """Pledge model for backer contributions."""
@@ -59,10 +222,55 @@ class Pledge(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['backer', '-created_at', '-id']),
+        ]
 
     def __str__(self):
         return f"{self.backer.username} - {self.amount} {self.currency} to {self.project.title}"
 
+    def _has_other_active_pledges(self):
+        return Pledge.objects.filter(
+            project_id=self.project_id,
+            backer_id=self.backer_id,
+            status='active'
+        ).exclude(pk=self.pk).exists()
+
+    def _is_first_pledge(self):
+        return not Pledge.objects.filter(project_id=self.project_id, backer_id=self.backer_id).exclude(pk=self.pk).exists()
+
+    def add_to_project_counters(self):
+        """Count this active pledge in its project's funding counters and trending score."""
+        new_backer = 0 if self._has_other_active_pledges() else 1
+        Project.objects.filter(pk=self.project_id).update(
+            total_pledged=F('total_pledged') + self.amount,
+            active_pledge_count=F('active_pledge_count') + 1,
+            backers_count=F('backers_count') + new_backer,
+        )
+        # Trending counts a backer as new once, on their first pledge to the project
+        record_pledge(self.project_id, self.amount, bool(new_backer) and self._is_first_pledge())
+
+    def change_project_counters(self, previous_amount):
+        """Move this active pledge's project counters and trending score by its change from `previous_amount`."""
+        difference = self.amount - previous_amount
+        if not difference:
+            return
+        Project.objects.filter(pk=self.project_id).update(total_pledged=F('total_pledged') + difference)
+        if difference > 0:
+            record_pledge(self.project_id, difference, False)
+        else:
+            record_pledge_removal(self.project_id, -difference, self.created_at)
+
+    def remove_from_project_counters(self):
+        """Stop counting this pledge in its project's funding counters and trending score once it is refunded, cancelled or deleted."""
+        last_pledge = 0 if self._has_other_active_pledges() else 1
+        Project.objects.filter(pk=self.project_id).update(
+            total_pledged=F('total_pledged') - self.amount,
+            active_pledge_count=F('active_pledge_count') - 1,
+            backers_count=F('backers_count') - last_pledge,
+        )
+        record_pledge_removal(self.project_id, self.amount, self.created_at)
+
 
 class Release(models.Model):
     """Release model for milestone fund releases."""
@@ -74,6 +282,9 @@ class Release(models.Model):
 
     class Meta:
         ordering = ['-released_at']
+        indexes = [
+            models.Index(fields=['-released_at', '-id']),
+        ]
 
     def __str__(self):
         return f"Release {self.amount_released} for {self.milestone.title}"
@@ -96,8 +307,131 @@ class Refund(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+        ]
 
     def __str__(self):
         return f"Refund {self.amount} for {self.pledge}"
 
 
+class LedgerEntry(models.Model):
+    """
+    Append-only record of a wallet balance change.
+
+    The wallet's stored balance is a materialization of its entries; write
+    through `Wallet.credit` and check with `manage.py reconcile_wallets`.
+    """
+    ENTRY_TYPE_CHOICES = [
+        ('opening', 'Opening balance'),
+        ('release', 'Release'),
+        ('refund', 'Refund'),
+        ('adjustment', 'Adjustment'),
+    ]
+
+    wallet = models.ForeignKey(Wallet, on_delete=models.PROTECT, related_name='ledger_entries')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPE_CHOICES)
+    release = models.ForeignKey(Release, on_delete=models.PROTECT, null=True, blank=True, related_name='ledger_entries')
+    refund = models.ForeignKey(Refund, on_delete=models.PROTECT, null=True, blank=True, related_name='ledger_entries')
+    memo = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name_plural = 'ledger entries'
+        indexes = [
+            models.Index(fields=['wallet', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.entry_type} {self.amount} on wallet {self.wallet_id}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Ledger entries are append-only')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Ledger entries are append-only')
+
+
+class WalletSnapshot(models.Model):
+    """Wallet balance as of a ledger entry, so balances can be rebuilt from recent entries only."""
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='snapshots')
+    balance = models.DecimalField(max_digits=14, decimal_places=2)
+    last_entry = models.ForeignKey(LedgerEntry, on_delete=models.PROTECT, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-last_entry_id']
+        indexes = [
+            models.Index(fields=['wallet', '-last_entry']),
+        ]
+
+    def __str__(self):
+        return f"Wallet {self.wallet_id} at entry {self.last_entry_id}: {self.balance}"
+
+
+class RefundBatch(models.Model):
+    """
+    Bulk refund of a project's active pledges after a milestone rejection or project failure.
+
+    The refundable pool is the escrow still held (active pledges minus
+    releases), shared pro rata by pledge amount. Pledges are processed in
+    id order in chunks, each committed together with `last_pledge_id`, so a
+    batch resumes where it stopped. See `finance.refunds`.
+    """
+    REASON_CHOICES = [
+        ('milestone_rejected', 'Milestone rejected'),
+        ('project_failed', 'Project failed'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='refund_batches')
+    milestone = models.ForeignKey(Milestone, on_delete=models.SET_NULL, null=True, blank=True, related_name='refund_batches')
+    reason = models.CharField(max_length=30, choices=REASON_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Fixed when the batch is created
+    pledged_total = models.DecimalField(max_digits=12, decimal_places=2)
+    refund_pool = models.DecimalField(max_digits=12, decimal_places=2)
+    max_pledge_id = models.BigIntegerField()
+    total_pledges = models.PositiveIntegerField()
+    # Progress, committed with each chunk
+    processed_pledges = models.PositiveIntegerField(default=0)
+    refunded_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    last_pledge_id = models.BigIntegerField(default=0)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = 'refund batches'
+        constraints = [
+            # One batch per rejected milestone and one per failed project
+            models.UniqueConstraint(fields=['milestone'], name='unique_refund_batch_per_milestone'),
+            models.UniqueConstraint(
+                fields=['project'], condition=Q(milestone__isnull=True),
+                name='unique_refund_batch_per_failed_project',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'locked_until']),
+        ]
+
+    def __str__(self):
+        return f"Refund batch {self.pk} for {self.project.title} ({self.status})"
+
+    @property
+    def progress_percentage(self):
+        if not self.total_pledges:
+            return 100 if self.status == 'completed' else 0
+        return round(self.processed_pledges * 100 / self.total_pledges, 2)
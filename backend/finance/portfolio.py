@@ -0,0 +1,121 @@
+"""
+Backer portfolio: per-project totals for every project a backer pledged to.
+
+`backer_portfolio` costs the same five queries whatever the number of
+pledges: the backer's pledges, refunds and votes grouped by project, the
+milestones (with their releases) of those projects grouped by project and
+status, and the projects themselves, prepared for ProjectListSerializer.
+All sums are done by the database; Python only stitches the rows together.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, Max, Q, Sum
+
+from governance.models import Vote
+from projects.models import Milestone, Project
+from projects.serializers import ProjectListSerializer
+from .models import Pledge, Refund
+from .refunds import share_of_pool
+
+ZERO = Decimal('0.00')
+MILESTONE_STATES = tuple(status for status, _ in Milestone.STATUS_CHOICES)
+
+
+def _pledge_totals(backer):
+    active = Q(status='active')
+    return {
+        row['project_id']: row
+        for row in Pledge.objects.filter(backer=backer).order_by().values('project_id').annotate(
+            pledged=Sum('amount'),
+            active_pledged=Sum('amount', filter=active),
+            pledge_count=Count('id'),
+            active_pledge_count=Count('id', filter=active),
+            last_pledged_at=Max('created_at'),
+        )
+    }
+
+
+def _refund_totals(backer):
+    totals = defaultdict(lambda: {'refunded': ZERO, 'refund_requested': ZERO})
+    for row in Refund.objects.filter(pledge__backer=backer).order_by().values('pledge__project_id').annotate(
+        refunded=Sum('amount', filter=Q(status='processed')),
+        refund_requested=Sum('amount', filter=Q(status='requested')),
+    ):
+        totals[row['pledge__project_id']] = {
+            'refunded': row['refunded'] or ZERO,
+            'refund_requested': row['refund_requested'] or ZERO,
+        }
+    return totals
+
+
+def _milestone_states(project_ids):
+    """Per-project milestone counts by status, and amounts released, for the given projects."""
+    counts = defaultdict(lambda: dict.fromkeys(MILESTONE_STATES, 0))
+    released = defaultdict(lambda: ZERO)
+    for row in Milestone.objects.filter(project_id__in=project_ids).order_by().values('project_id', 'status').annotate(
+        count=Count('id', distinct=True),
+        released=Sum('releases__amount_released'),
+    ):
+        counts[row['project_id']][row['status']] = row['count']
+        released[row['project_id']] += row['released'] or ZERO
+    return counts, released
+
+
+def _vote_counts(backer, project_ids):
+    return {
+        row['milestone__project_id']: row
+        for row in Vote.objects.filter(backer=backer, milestone__project_id__in=project_ids).order_by().values(
+            'milestone__project_id'
+        ).annotate(cast=Count('id'), open=Count('id', filter=Q(milestone__status='voting')))
+    }
+
+
+def backer_portfolio(backer):
+    """
+    Summarise `backer`'s pledges per project for PortfolioSerializer.
+    Returns {'totals', 'projects'}, most recently pledged to first.
+
+    `refundable` is what the backer's active pledges would get back if the
+    project's escrow were refunded now: their pro rata share of what has not
+    been released to the creator, as a refund batch would pay it.
+    """
+    pledges = _pledge_totals(backer)
+    project_ids = list(pledges)
+    refunds = _refund_totals(backer)
+    milestone_counts, released_totals = _milestone_states(project_ids)
+    votes = _vote_counts(backer, project_ids)
+    projects = ProjectListSerializer.prepare_queryset(Project.objects.filter(pk__in=project_ids)).in_bulk()
+
+    entries = []
+    for project_id in sorted(project_ids, key=lambda pk: pledges[pk]['last_pledged_at'], reverse=True):
+        project = projects[project_id]
+        totals = pledges[project_id]
+        counts, released = milestone_counts[project_id], released_totals[project_id]
+        active_pledged = totals['active_pledged'] or ZERO
+        cast = votes.get(project_id, {'cast': 0, 'open': 0})
+        entries.append({
+            'project': project,
+            'pledged': totals['pledged'],
+            'active_pledged': active_pledged,
+            'pledge_count': totals['pledge_count'],
+            'active_pledge_count': totals['active_pledge_count'],
+            'last_pledged_at': totals['last_pledged_at'],
+            **refunds[project_id],
+            'refundable': share_of_pool(max(project.total_pledged - released, ZERO), project.total_pledged, active_pledged),
+            'released': released,
+            'milestones': counts,
+            'votes_cast': cast['cast'],
+            # Voting milestones this backer could vote on (they need an active pledge) but has not
+            'votes_pending': counts['voting'] - cast['open'] if totals['active_pledge_count'] else 0,
+        })
+
+    summary = {
+        'projects': len(entries),
+        'active_projects': sum(1 for entry in entries if entry['active_pledge_count']),
+    }
+    for field in ('pledged', 'active_pledged', 'refunded', 'refund_requested', 'refundable'):
+        summary[field] = sum((entry[field] for entry in entries), ZERO)
+    for field in ('votes_cast', 'votes_pending'):
+        summary[field] = sum(entry[field] for entry in entries)
+    return {'totals': summary, 'projects': entries}
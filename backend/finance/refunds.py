@@ -0,0 +1,264 @@
+"""
+Batch refund engine for rejected milestones and failed projects.
+
+A rejected milestone ends its project: `fail_project_for_rejected_milestone`
+fails the project and cancels its other unpaid milestones, so no new
+pledges or releases draw on the escrow being refunded. Either way the
+project's unreleased escrow is shared pro rata among its active pledges.
+
+`start_refund_batch` records a RefundBatch with the refundable pool fixed
+at creation; `process_refund_batch` then refunds the project's active
+pledges in id order, one transaction per chunk. Each chunk bulk inserts its
+Refund rows and ledger entries, marks the pledges refunded, credits backer
+wallets in one statement, takes the chunk out of the project's funding
+counters and advances the batch cursor, so an interrupted batch resumes
+after its last committed chunk.
+
+A worker claims a batch with a lease (`locked_until`), renewed per chunk,
+so two workers never process the same batch and a batch whose worker died
+can be picked up again once the lease lapses.
+"""
+import logging
+import threading
+from datetime import timedelta
+from decimal import Decimal, ROUND_DOWN
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from projects.cache import invalidate_project
+from projects.models import Project
+from .models import LedgerEntry, Pledge, Refund, RefundBatch, Release, Wallet
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+LEASE = timedelta(minutes=5)
+CENT = Decimal('0.01')
+
+
+def fail_project_for_rejected_milestone(milestone):
+    """
+    Fail `milestone`'s project and cancel its other pending, voting or approved milestones.
+
+    Call inside the transaction that rejects the milestone, before
+    start_refund_batch. Returns the project.
+    """
+    from projects.trending import drop_scores
+
+    project = Project.objects.select_for_update().get(pk=milestone.project_id)
+    if project.status in ('active', 'goal_reached', 'funded'):
+        project.status = 'failed'
+        project.save(update_fields=['status', 'updated_at'])
+    project.milestones.exclude(pk=milestone.pk).filter(status__in=['pending', 'voting', 'approved']).update(
+        status='cancelled'
+    )
+    drop_scores([project.pk])
+    # The milestone update sends no post_save, so the project caches are dropped here
+    transaction.on_commit(lambda: invalidate_project(project.pk))
+    return project
+
+
+def start_refund_batch(project, milestone=None):
+    """
+    Create the refund batch for a rejected milestone, or for a failed project if no milestone is given.
+
+    Idempotent: returns (batch, created), with the existing batch if there
+    already is one.
+    """
+    if milestone is not None:
+        lookup = {'milestone': milestone}
+    else:
+        lookup = {'project': project, 'milestone__isnull': True}
+    batch = RefundBatch.objects.filter(**lookup).first()
+    if batch is not None:
+        return batch, False
+
+    pledges = Pledge.objects.filter(project=project, status='active').aggregate(
+        total=Sum('amount'), count=Count('id'), max_id=Max('id')
+    )
+    released = Release.objects.filter(milestone__project=project).aggregate(
+        total=Sum('amount_released')
+    )['total'] or 0
+    pledged_total = pledges['total'] or 0
+    try:
+        with transaction.atomic():
+            batch = RefundBatch.objects.create(
+                project=project,
+                milestone=milestone,
+                reason='milestone_rejected' if milestone is not None else 'project_failed',
+                pledged_total=pledged_total,
+                refund_pool=max(pledged_total - released, 0),
+                max_pledge_id=pledges['max_id'] or 0,
+                total_pledges=pledges['count'],
+            )
+    except IntegrityError:
+        return RefundBatch.objects.get(**lookup), False
+    return batch, True
+
+
+def share_of_pool(refund_pool, pledged_total, amount):
+    """`amount`'s share of a refund pool left from `pledged_total`, rounded down to the cent."""
+    if not pledged_total:
+        return Decimal('0.00')
+    if refund_pool == pledged_total:
+        return amount
+    return (refund_pool * amount / pledged_total).quantize(CENT, rounding=ROUND_DOWN)
+
+
+def pro_rata_share(batch, amount):
+    """A pledge's share of the batch's refund pool, rounded down to the cent."""
+    return share_of_pool(batch.refund_pool, batch.pledged_total, amount)
+
+
+def claim_refund_batch(batch_id):
+    """Take the lease on a pending batch, or on a running one whose lease lapsed. Returns True on success."""
+    now = timezone.now()
+    return bool(
+        RefundBatch.objects.filter(pk=batch_id).filter(
+            Q(status='pending') | Q(status='running', locked_until__lt=now)
+        ).update(status='running', locked_until=now + LEASE, started_at=Coalesce('started_at', Value(now)))
+    )
+
+
+def _refund_reason(batch):
+    if batch.milestone_id is not None:
+        return f'Milestone {batch.milestone_id} was rejected'
+    return 'Project failed'
+
+
+def process_refund_chunk(batch_id, chunk_size=CHUNK_SIZE):
+    """Refund the next chunk of pledges in one transaction. Returns False once the batch is complete."""
+    with transaction.atomic():
+        batch = RefundBatch.objects.select_for_update().get(pk=batch_id)
+        pledges = list(
+            Pledge.objects.select_for_update().filter(
+                project_id=batch.project_id,
+                status='active',
+                id__gt=batch.last_pledge_id,
+                id__lte=batch.max_pledge_id,
+            ).order_by('id').only('id', 'backer_id', 'amount', 'currency', 'status')[:chunk_size]
+        )
+        now = timezone.now()
+        if not pledges:
+            batch.status = 'completed'
+            batch.completed_at = now
+            batch.locked_until = None
+            batch.save(update_fields=['status', 'completed_at', 'locked_until'])
+            return False
+
+        reason = _refund_reason(batch)
+        refunds = []
+        for pledge in pledges:
+            refunds.append(Refund(
+                pledge=pledge,
+                milestone_id=batch.milestone_id,
+                amount=pro_rata_share(batch, pledge.amount),
+                reason=reason,
+                status='processed',
+            ))
+            pledge.status = 'refunded'
+        Refund.objects.bulk_create(refunds)
+        Pledge.objects.bulk_update(pledges, ['status'])
+
+        wallets = Wallet.get_or_create_wallets(
+            'backer', {(pledge.backer_id, pledge.currency) for pledge in pledges}
+        )
+        Wallet.credit_many([
+            LedgerEntry(
+                wallet_id=wallets[(pledge.backer_id, pledge.currency)],
+                amount=refund.amount,
+                entry_type='refund',
+                refund=refund,
+            )
+            for pledge, refund in zip(pledges, refunds)
+            if refund.amount
+        ])
+        # Take the chunk out of the funding counters; backers with no active
+        # pledge left in the project stop counting
+        backers = {pledge.backer_id for pledge in pledges}
+        still_backing = set(
+            Pledge.objects.filter(project_id=batch.project_id, status='active', backer_id__in=backers)
+            .values_list('backer_id', flat=True).distinct()
+        )
+        Project.objects.filter(pk=batch.project_id).update(
+            total_pledged=F('total_pledged') - sum(pledge.amount for pledge in pledges),
+            active_pledge_count=F('active_pledge_count') - len(pledges),
+            backers_count=F('backers_count') - len(backers - still_backing),
+        )
+
+        batch.processed_pledges += len(pledges)
+        batch.refunded_amount += sum(refund.amount for refund in refunds)
+        batch.last_pledge_id = pledges[-1].id
+        batch.locked_until = now + LEASE
+        batch.save(update_fields=['processed_pledges', 'refunded_amount', 'last_pledge_id', 'locked_until'])
+        # Bulk writes send no post_save, so the project caches are dropped here
+        project_id = batch.project_id
+        transaction.on_commit(lambda: invalidate_project(project_id))
+    return True
+
+
+def process_refund_batch(batch_id, chunk_size=CHUNK_SIZE):
+    """
+    Run a batch to completion if its lease can be claimed. Returns the batch.
+
+    On error the batch is marked failed with the message; committed chunks
+    stay applied and `resume_refund_batch` continues from there.
+    """
+    if claim_refund_batch(batch_id):
+        try:
+            while process_refund_chunk(batch_id, chunk_size):
+                pass
+        except Exception as exc:
+            RefundBatch.objects.filter(pk=batch_id).update(status='failed', error=str(exc), locked_until=None)
+            raise
+    return RefundBatch.objects.get(pk=batch_id)
+
+
+def resume_refund_batch(batch_id):
+    """Put a failed batch back in the queue. Returns True if it was failed."""
+    return bool(
+        RefundBatch.objects.filter(pk=batch_id, status='failed').update(status='pending', error='')
+    )
+
+
+def claimable_refund_batches():
+    """Batches a worker can pick up: pending ones and running ones whose lease lapsed."""
+    return RefundBatch.objects.filter(
+        Q(status='pending') | Q(status='running', locked_until__lt=timezone.now())
+    ).order_by('created_at')
+
+
+def _run_logged(batch_id):
+    # The batch records its own failure; the caller's request has already committed
+    try:
+        process_refund_batch(batch_id)
+    except Exception:
+        logger.exception('Refund batch %s failed', batch_id)
+
+
+def _run_in_background(batch_id):
+    try:
+        _run_logged(batch_id)
+    finally:
+        connection.close()
+
+
+def schedule_refund_batch(batch):
+    """
+    Process the batch once the current transaction commits.
+
+    Runs on a background thread when REFUND_BATCHES_IN_BACKGROUND is set
+    (the default), otherwise inline. Batches left behind by a restart are
+    picked up by `manage.py process_refund_batches`.
+    """
+    def run():
+        if getattr(settings, 'REFUND_BATCHES_IN_BACKGROUND', True):
+            threading.Thread(target=_run_in_background, args=(batch.pk,), daemon=True).start()
+        else:
+            _run_logged(batch.pk)
+
+    transaction.on_commit(run)
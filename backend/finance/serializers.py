@@ -2,7 +2,7 @@
 Serializers for finance-related endpoints.
 """
 from rest_framework import serializers
-from .models import Wallet, Pledge, Release, Refund
+from .models import Wallet, Pledge, Release, Refund, RefundBatch
 from projects.serializers import ProjectListSerializer, MilestoneSerializer
 
 
@@ -15,8 +15,11 @@ class WalletSerializer(serializers.ModelSerializer):
 
 
 class PledgeSerializer(serializers.ModelSerializer):
-    """Serializer for Pledge model."""
-    project = ProjectListSerializer(read_only=True)
+    """Serializer for Pledge model.
+
+    Accepts a project id on create and renders the nested project on read.
+    A pledge cannot be moved to another project once made.
+    """
     backer_username = serializers.CharField(source='backer.username', read_only=True)
 
     class Meta:
@@ -25,7 +28,19 @@ class PledgeSerializer(serializers.ModelSerializer):
             'id', 'project', 'backer', 'backer_username', 'amount', 'currency',
             'status', 'payment_reference', 'created_at'
         )
-        read_only_fields = ('id', 'created_at', 'status')
+        read_only_fields = ('id', 'backer', 'created_at', 'status')
+        row_fields = {'backer_username': 'backer__username'}
+        row_nested = {'project': ProjectListSerializer}
+
+    def validate_project(self, project):
+        if self.instance is not None and project.pk != self.instance.project_id:
+            raise serializers.ValidationError('A pledge cannot be moved to another project.')
+        return project
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['project'] = ProjectListSerializer(instance.project, context=self.context).data
+        return data
 
 
 class ReleaseSerializer(serializers.ModelSerializer):
@@ -42,9 +57,10 @@ class ReleaseSerializer(serializers.ModelSerializer):
 
 
 class RefundSerializer(serializers.ModelSerializer):
-    """Serializer for Refund model."""
-    pledge = PledgeSerializer(read_only=True)
-    milestone = MilestoneSerializer(read_only=True)
+    """Serializer for Refund model.
+
+    Accepts pledge and milestone ids on write and renders them nested on read.
+    """
 
     class Meta:
         model = Refund
@@ -54,4 +70,60 @@ class RefundSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id', 'created_at', 'status')
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['pledge'] = PledgeSerializer(instance.pledge, context=self.context).data
+        data['milestone'] = (
+            MilestoneSerializer(instance.milestone, context=self.context).data if instance.milestone else None
+        )
+        return data
+
+
+class RefundBatchSerializer(serializers.ModelSerializer):
+    """Serializer for RefundBatch progress."""
+    progress_percentage = serializers.ReadOnlyField()
+
+    class Meta:
+        model = RefundBatch
+        fields = (
+            'id', 'project', 'milestone', 'reason', 'status', 'pledged_total', 'refund_pool',
+            'total_pledges', 'processed_pledges', 'refunded_amount', 'progress_percentage',
+            'error', 'created_at', 'started_at', 'completed_at'
+        )
+        read_only_fields = fields
+
+
+class PortfolioProjectSerializer(serializers.Serializer):
+    """One project in a backer's portfolio, with the backer's totals in it."""
+    project = ProjectListSerializer(read_only=True)
+    pledged = serializers.DecimalField(max_digits=14, decimal_places=2)
+    active_pledged = serializers.DecimalField(max_digits=14, decimal_places=2)
+    pledge_count = serializers.IntegerField()
+    active_pledge_count = serializers.IntegerField()
+    last_pledged_at = serializers.DateTimeField()
+    refunded = serializers.DecimalField(max_digits=14, decimal_places=2)
+    refund_requested = serializers.DecimalField(max_digits=14, decimal_places=2)
+    refundable = serializers.DecimalField(max_digits=14, decimal_places=2)
+    released = serializers.DecimalField(max_digits=14, decimal_places=2)
+    milestones = serializers.DictField(child=serializers.IntegerField())
+    votes_cast = serializers.IntegerField()
+    votes_pending = serializers.IntegerField()
+
+
+class PortfolioTotalsSerializer(serializers.Serializer):
+    """Portfolio totals across every project a backer pledged to."""
+    projects = serializers.IntegerField()
+    active_projects = serializers.IntegerField()
+    pledged = serializers.DecimalField(max_digits=14, decimal_places=2)
+    active_pledged = serializers.DecimalField(max_digits=14, decimal_places=2)
+    refunded = serializers.DecimalField(max_digits=14, decimal_places=2)
+    refund_requested = serializers.DecimalField(max_digits=14, decimal_places=2)
+    refundable = serializers.DecimalField(max_digits=14, decimal_places=2)
+    votes_cast = serializers.IntegerField()
+    votes_pending = serializers.IntegerField()
+
 
+class PortfolioSerializer(serializers.Serializer):
+    """Serializer for a backer's portfolio summary (see finance.portfolio)."""
+    totals = PortfolioTotalsSerializer()
+    projects = PortfolioProjectSerializer(many=True)
@@ -0,0 +1,439 @@
+"""
+Query budgets for finance endpoints and tests for the backer portfolio,
+pledge counters and exports.
+"""
+import csv
+import io
+import json
+import sys
+from datetime import timedelta
+from decimal import Decimal, ROUND_DOWN
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from config.exports import _arrow_type
+from config.testing import QueryBudgetTestCase, call_async_view
+from governance.audit import flush_audit_log
+from governance.models import Vote
+from projects.models import Project, TrendingScore
+from users.models import Creator, User
+from .async_views import PledgeListView
+from .models import LedgerEntry, Pledge, Refund, Release, Wallet, WalletSnapshot
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pq = None
+
+
+class FinanceQueryBudgetTests(QueryBudgetTestCase):
+    """Fixed query budgets for the finance API, independent of page size."""
+
+    def test_wallet_list(self):
+        self.assertQueryBudget('/api/finance/wallets/', 2, user=self.data['creator'], min_results=1)
+
+    def test_pledge_list(self):
+        # COUNT, pledges + backers, projects + creators + milestone counts
+        self.assertQueryBudget('/api/finance/pledges/', 3, user=self.data['backer'], min_results=50)
+
+    def test_pledge_list_cursor(self):
+        self.assertQueryBudget('/api/finance/pledges/?pagination=cursor', 2, user=self.data['backer'], min_results=50)
+
+    def test_portfolio(self):
+        # pledges, refunds, milestones + releases, votes, projects
+        self.assertQueryBudget('/api/finance/pledges/portfolio/', 5, user=self.data['backer'], page_sizes=())
+
+    def test_release_list(self):
+        self.assertQueryBudget('/api/finance/releases/', 2, user=self.data['backer'], min_results=50)
+
+    def test_refund_list(self):
+        self.assertQueryBudget('/api/finance/refunds/', 3, user=self.data['backer'], min_results=50)
+
+    def test_refund_batch_list(self):
+        self.assertQueryBudget('/api/finance/refund-batches/', 1, user=self.data['admin'])
+
+
+class AsyncPledgeListTests(QueryBudgetTestCase):
+    """The async pledge list returns what the sync ViewSet returns."""
+
+    def test_pledge_list(self):
+        view = PledgeListView.as_view()
+        backer = self.data['backer']
+        for query in ('', '?page=2', '?pagination=cursor', f"?project={self.data['project'].pk}"):
+            expected = self.client_for(backer).get(f'/api/finance/pledges/{query}')
+            response = call_async_view(view, f'/api/finance/pledges/{query}', user=backer)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content), expected.json())
+
+    def test_requires_authentication(self):
+        view = PledgeListView.as_view()
+        response = call_async_view(view, '/api/finance/pledges/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+        response = call_async_view(view, '/api/finance/pledges/', headers={'Authorization': 'Bearer not-a-token'})
+        self.assertEqual(response.status_code, 401)
+
+
+class BackerPortfolioTests(QueryBudgetTestCase):
+    """The portfolio's grouped totals match the pledges, refunds and votes they summarise."""
+
+    def test_totals_per_project(self):
+        backer = self.data['backer']
+        response = self.client_for(backer).get('/api/finance/pledges/portfolio/')
+        self.assertEqual(response.status_code, 200)
+        entries = response.data['projects']
+        pledges = Pledge.objects.filter(backer=backer)
+        self.assertEqual(len(entries), pledges.values('project').distinct().count())
+
+        for entry in entries:
+            project_id = entry['project']['id']
+            project_pledges = pledges.filter(project_id=project_id)
+            active = project_pledges.filter(status='active').aggregate(total=Sum('amount'))['total'] or Decimal('0')
+            self.assertEqual(Decimal(entry['pledged']), project_pledges.aggregate(total=Sum('amount'))['total'])
+            self.assertEqual(Decimal(entry['active_pledged']), active)
+            self.assertEqual(
+                Decimal(entry['refund_requested']),
+                Refund.objects.filter(pledge__in=project_pledges, status='requested').aggregate(
+                    total=Sum('amount'))['total'] or Decimal('0'),
+            )
+            self.assertEqual(
+                Decimal(entry['released']),
+                Release.objects.filter(milestone__project_id=project_id).aggregate(
+                    total=Sum('amount_released'))['total'] or Decimal('0'),
+            )
+            self.assertEqual(sum(entry['milestones'].values()), entry['project']['milestones_count'])
+            self.assertEqual(
+                entry['votes_cast'], Vote.objects.filter(backer=backer, milestone__project_id=project_id).count()
+            )
+            self.assertLessEqual(Decimal(entry['refundable']), active)
+
+        totals = response.data['totals']
+        self.assertEqual(totals['projects'], len(entries))
+        self.assertEqual(Decimal(totals['pledged']), pledges.aggregate(total=Sum('amount'))['total'])
+        self.assertEqual(totals['votes_cast'], Vote.objects.filter(backer=backer).count())
+        last_pledged = [entry['last_pledged_at'] for entry in entries]
+        self.assertEqual(last_pledged, sorted(last_pledged, reverse=True))
+
+    def test_refundable_is_share_of_unreleased_escrow(self):
+        backer = self.data['backer']
+        project = self.data['project']
+        project.refresh_from_db()
+        entry = next(
+            entry for entry in self.client_for(backer).get('/api/finance/pledges/portfolio/').data['projects']
+            if entry['project']['id'] == project.pk
+        )
+        released = Release.objects.filter(milestone__project=project).aggregate(
+            total=Sum('amount_released'))['total'] or Decimal('0')
+        pool = max(project.total_pledged - released, Decimal('0'))
+        expected = pool * Decimal(entry['active_pledged']) / project.total_pledged
+        self.assertEqual(Decimal(entry['refundable']), expected.quantize(Decimal('0.01'), rounding=ROUND_DOWN))
+
+    def test_anonymous_is_rejected(self):
+        self.assertEqual(self.client_for().get('/api/finance/pledges/portfolio/').status_code, 401)
+
+
+@override_settings(AUDIT_LOG_FLUSH_INTERVAL=0)
+class PledgeCounterTests(APITestCase):
+    """Pledge writes keep their project's funding counters in step."""
+
+    def setUp(self):
+        creator = Creator.objects.create(
+            user=User.objects.create_user('maker', email='maker@example.com', password='pw', is_creator=True),
+            display_name='Maker',
+        )
+        self.backers = [User.objects.create_user(f'fan{i}', email=f'fan{i}@example.com', password='pw') for i in range(2)]
+        now = timezone.now()
+        self.project, self.draft = (
+            Project.objects.create(
+                creator=creator, title=f'Lamp {status}', description='A lamp', goal_amount=Decimal('1000'),
+                status=status, start_date=now, end_date=now + timedelta(days=30),
+            )
+            for status in ('active', 'draft')
+        )
+
+    def tearDown(self):
+        flush_audit_log()
+
+    def pledge(self, backer, amount):
+        self.client.force_authenticate(backer)
+        response = self.client.post(f'/api/projects/{self.project.pk}/pledge/', {'amount': amount})
+        self.assertEqual(response.status_code, 201, response.data)
+        return Pledge.objects.get(pk=response.data['id'])
+
+    def counters(self, project):
+        return Project.objects.values_list('total_pledged', 'active_pledge_count', 'backers_count').get(pk=project.pk)
+
+    def assertCounters(self, total, pledges, backers):
+        self.assertEqual(self.counters(self.project), (Decimal(total), pledges, backers))
+        # The incremental counters agree with a rebuild from the pledges
+        self.assertEqual(Project.rebuild_funding_counters([self.project.pk]), 1)
+        self.assertEqual(self.counters(self.project), (Decimal(total), pledges, backers))
+
+    def test_counters_follow_pledge_writes(self):
+        first = self.pledge(self.backers[0], '100.00')
+        second = self.pledge(self.backers[0], '50.00')
+        other = self.pledge(self.backers[1], '200.00')
+        self.assertCounters('350.00', 3, 2)
+
+        self.client.force_authenticate(self.backers[0])
+        self.assertEqual(self.client.patch(f'/api/finance/pledges/{first.pk}/', {'amount': '150.00'}).status_code, 200)
+        self.assertCounters('400.00', 3, 2)
+        self.assertEqual(self.client.post(f'/api/finance/pledges/{second.pk}/cancel/').status_code, 200)
+        self.assertCounters('350.00', 2, 2)
+        # Cancelling twice changes nothing
+        self.assertEqual(self.client.post(f'/api/finance/pledges/{second.pk}/cancel/').status_code, 400)
+        self.assertCounters('350.00', 2, 2)
+
+        self.client.force_authenticate(self.backers[1])
+        self.assertEqual(self.client.delete(f'/api/finance/pledges/{other.pk}/').status_code, 204)
+        self.assertCounters('150.00', 1, 1)
+
+        # Refunds on a failed project are processed at once
+        Project.objects.filter(pk=self.project.pk).update(status='failed')
+        self.client.force_authenticate(self.backers[0])
+        response = self.client.post(
+            '/api/finance/refunds/', {'pledge': first.pk, 'amount': '150.00', 'reason': 'Project failed'}
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Pledge.objects.get(pk=first.pk).status, 'refunded')
+        self.assertCounters('0.00', 0, 0)
+
+    def test_rebuild_command_fixes_corrupted_counters(self):
+        self.pledge(self.backers[0], '100.00')
+        self.pledge(self.backers[1], '25.00')
+        Project.objects.filter(pk__in=[self.project.pk, self.draft.pk]).update(
+            total_pledged=Decimal('9999.00'), active_pledge_count=7, backers_count=5,
+        )
+        out = io.StringIO()
+        call_command('rebuild_project_counters', str(self.project.pk), stdout=out)
+        self.assertIn('Rebuilt funding counters for 1 project(s)', out.getvalue())
+        self.assertCounters('125.00', 2, 2)
+        # Only the named project was rebuilt
+        self.assertEqual(self.counters(self.draft), (Decimal('9999.00'), 7, 5))
+
+        call_command('rebuild_project_counters', stdout=io.StringIO())
+        self.assertEqual(self.counters(self.draft), (0, 0, 0))
+
+    def test_pledge_cannot_move_project(self):
+        pledge = self.pledge(self.backers[0], '100.00')
+        response = self.client.patch(f'/api/finance/pledges/{pledge.pk}/', {'project': self.draft.pk})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('project', response.data)
+        pledge.refresh_from_db()
+        self.assertEqual(pledge.project_id, self.project.pk)
+        self.assertEqual(
+            self.client.patch(f'/api/finance/pledges/{pledge.pk}/', {'project': self.project.pk}).status_code, 200
+        )
+
+
+class WalletLedgerTests(TestCase):
+    """Stored wallet balances match their ledger, from snapshots or from scratch."""
+
+    def setUp(self):
+        self.wallet, self.other = (
+            Wallet.objects.create(owner_type='creator', owner_id=owner_id) for owner_id in (1, 2)
+        )
+
+    def ledger_sum(self, wallet):
+        return LedgerEntry.objects.filter(wallet=wallet).aggregate(total=Sum('amount'))['total']
+
+    def ledger_balance(self, wallet):
+        return Wallet.with_ledger_balance().values_list('ledger_balance', flat=True).get(pk=wallet.pk)
+
+    def test_entries_sum_to_balance(self):
+        self.wallet.credit(Decimal('100.00'), 'opening')
+        self.wallet.credit(Decimal('-30.00'), 'adjustment', memo='fee')
+        Wallet.credit_many([
+            LedgerEntry(wallet=self.wallet, amount=Decimal('12.50'), entry_type='refund'),
+            LedgerEntry(wallet=self.other, amount=Decimal('5.00'), entry_type='refund'),
+            LedgerEntry(wallet=self.wallet, amount=Decimal('7.50'), entry_type='refund'),
+        ])
+        for wallet, expected in ((self.wallet, Decimal('90.00')), (self.other, Decimal('5.00'))):
+            wallet.refresh_from_db()
+            self.assertEqual(wallet.balance, expected)
+            self.assertEqual(self.ledger_sum(wallet), expected)
+            self.assertEqual(self.ledger_balance(wallet), expected)
+
+    def test_debits_stop_at_zero(self):
+        self.wallet.credit(Decimal('20.00'), 'opening')
+        with self.assertRaises(ValueError):
+            self.wallet.credit(Decimal('-20.01'), 'adjustment')
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('20.00'))
+        self.assertEqual(LedgerEntry.objects.filter(wallet=self.wallet).count(), 1)
+        self.wallet.credit(Decimal('-20.00'), 'adjustment')
+        self.assertEqual(self.wallet.balance, 0)
+        with self.assertRaises(ValueError):
+            Wallet.credit_many([LedgerEntry(wallet=self.other, amount=Decimal('-1.00'), entry_type='adjustment')])
+        self.assertFalse(LedgerEntry.objects.filter(wallet=self.other).exists())
+
+    def test_snapshot_plus_later_entries(self):
+        self.wallet.credit(Decimal('100.00'), 'opening')
+        self.wallet.credit(Decimal('25.00'), 'release')
+        self.other.credit(Decimal('10.00'), 'opening')
+        out = io.StringIO()
+        call_command('snapshot_wallets', stdout=out)
+        self.assertIn('Took 2 wallet snapshot(s)', out.getvalue())
+        snapshot = WalletSnapshot.objects.get(wallet=self.wallet)
+        self.assertEqual(snapshot.balance, Decimal('125.00'))
+        # Nothing new to snapshot
+        self.assertIsNone(self.wallet.take_snapshot())
+        self.assertEqual(Wallet.take_snapshots(), 0)
+
+        self.wallet.credit(Decimal('-40.00'), 'adjustment')
+        self.wallet.credit(Decimal('5.00'), 'refund')
+        self.assertEqual(self.ledger_balance(self.wallet), Decimal('90.00'))
+        self.assertEqual(self.ledger_balance(self.wallet), self.wallet.balance)
+        # Entries before the snapshot are not read again: changing one does not move the ledger balance
+        LedgerEntry.objects.filter(wallet=self.wallet, entry_type='opening').update(amount=Decimal('1.00'))
+        self.assertEqual(self.ledger_balance(self.wallet), Decimal('90.00'))
+
+        self.assertEqual(Wallet.take_snapshots([self.wallet.pk, self.other.pk]), 1)
+        latest = WalletSnapshot.objects.filter(wallet=self.wallet).order_by('-last_entry_id').first()
+        self.assertEqual(latest.balance, Decimal('90.00'))
+
+    def test_reconcile_repairs_drift(self):
+        self.wallet.credit(Decimal('100.00'), 'opening')
+        self.wallet.take_snapshot()
+        self.wallet.credit(Decimal('15.00'), 'release')
+        self.other.credit(Decimal('10.00'), 'opening')
+        Wallet.objects.filter(pk=self.wallet.pk).update(balance=Decimal('999.00'))
+        Wallet.objects.filter(pk=self.other.pk).update(balance=Decimal('0.00'))
+
+        out = io.StringIO()
+        call_command('reconcile_wallets', '--dry-run', stdout=out)
+        self.assertIn('Found 2 wallet(s)', out.getvalue())
+        self.assertRegex(out.getvalue(), rf'Wallet {self.wallet.pk}: stored 999\.00, ledger 115(\.00)?\n')
+        self.assertEqual(Wallet.objects.get(pk=self.wallet.pk).balance, Decimal('999.00'))
+
+        fixed = Wallet.reconcile_balances([self.wallet.pk])
+        self.assertEqual(fixed, [(self.wallet.pk, Decimal('999.00'), Decimal('115.00'))])
+        out = io.StringIO()
+        call_command('reconcile_wallets', stdout=out)
+        self.assertIn('Fixed 1 wallet(s)', out.getvalue())
+        self.assertEqual(
+            dict(Wallet.objects.values_list('pk', 'balance')),
+            {self.wallet.pk: Decimal('115.00'), self.other.pk: Decimal('10.00')},
+        )
+        self.assertEqual(Wallet.reconcile_balances(), [])
+
+
+class ExportTests(QueryBudgetTestCase):
+    """Admin exports stream every matching row in chunks, oldest first."""
+
+    def export(self, path, user=None, **params):
+        response = self.client_for(user or self.data['admin']).get(path, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response
+
+    def read_csv(self, response):
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    @override_settings(EXPORT_CHUNK_SIZE=7)
+    def test_pledges_csv(self):
+        response = self.export('/api/finance/pledges/export/csv/')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="pledge-export-', response['Content-Disposition'])
+        chunks = list(response.streaming_content)
+        pledges = list(Pledge.objects.order_by('created_at', 'pk').select_related('backer'))
+        # A header, then one block per chunk of rows
+        self.assertEqual(len(chunks), 1 + -(-len(pledges) // 7))
+
+        header, *rows = csv.reader(io.StringIO(b''.join(chunks).decode()))
+        self.assertEqual(header[:2], ['id', 'project_id'])
+        self.assertEqual([int(row[0]) for row in rows], [pledge.pk for pledge in pledges])
+        first = dict(zip(header, rows[0]))
+        self.assertEqual(first['backer__username'], pledges[0].backer.username)
+        self.assertEqual(Decimal(first['amount']), pledges[0].amount)
+        self.assertEqual(first['created_at'], pledges[0].created_at.isoformat())
+
+    @override_settings(EXPORT_CHUNK_SIZE=7)
+    async def test_streams_under_asgi(self):
+        token = await sync_to_async(AccessToken.for_user)(self.data['admin'])
+        client = AsyncClient()
+        response = await client.get('/api/finance/pledges/export/csv/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        # An async iterator, so the ASGI handler sends each chunk as it is read
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 1 + -(-await Pledge.objects.acount() // 7))
+        header, *rows = csv.reader(io.StringIO(b''.join(chunks).decode()))
+        self.assertEqual(header[:2], ['id', 'project_id'])
+
+        response = self.client_for(self.data['admin']).get('/api/finance/pledges/export/csv/')
+        self.assertFalse(response.is_async)
+
+    def test_filters(self):
+        project = self.data['project']
+        pledges = Pledge.objects.filter(project=project).order_by('created_at', 'pk')
+        middle = pledges[pledges.count() // 2].created_at
+        rows = self.read_csv(self.export(
+            '/api/finance/pledges/export/csv/', project=project.pk, since=middle.isoformat(),
+        ))[1:]
+        self.assertEqual(
+            [int(row[0]) for row in rows], list(pledges.filter(created_at__gte=middle).values_list('pk', flat=True))
+        )
+        rows = self.read_csv(self.export(
+            '/api/finance/pledges/export/csv/', project=project.pk, until=middle.date().isoformat(),
+        ))[1:]
+        self.assertEqual(
+            [int(row[0]) for row in rows],
+            list(pledges.filter(created_at__date__lte=middle.date()).values_list('pk', flat=True)),
+        )
+
+    def test_invalid_filters(self):
+        client = self.client_for(self.data['admin'])
+        for params in ({'project': 'abc'}, {'since': 'yesterday'}, {'until': '2030-13-01'}):
+            response = client.get('/api/finance/pledges/export/csv/', params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.json())
+
+    def test_admins_only(self):
+        self.assertEqual(self.client_for().get('/api/finance/pledges/export/csv/').status_code, 401)
+        self.assertEqual(
+            self.client_for(self.data['backer']).get('/api/finance/releases/export/csv/').status_code, 403
+        )
+
+    def test_releases_by_project(self):
+        project = self.data['project']
+        rows = self.read_csv(self.export('/api/finance/releases/export/csv/', project=project.pk))
+        self.assertIn('milestone__project_id', rows[0])
+        self.assertEqual(
+            [int(row[0]) for row in rows[1:]],
+            list(Release.objects.filter(milestone__project=project).order_by('released_at', 'pk').values_list(
+                'pk', flat=True)),
+        )
+
+    @skipUnless(pq, 'needs pyarrow')
+    @override_settings(EXPORT_CHUNK_SIZE=50)
+    def test_pledges_parquet(self):
+        response = self.export('/api/finance/pledges/export/parquet/')
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        pledges = Pledge.objects.order_by('created_at', 'pk')
+        self.assertEqual(table.column('id').to_pylist(), list(pledges.values_list('pk', flat=True)))
+        self.assertEqual(table.column('amount').to_pylist(), list(pledges.values_list('amount', flat=True)))
+        self.assertEqual(
+            table.column('created_at').to_pylist(), list(pledges.values_list('created_at', flat=True))
+        )
+
+    def test_parquet_without_pyarrow(self):
+        # A None entry in sys.modules makes the import fail
+        with mock.patch.dict(sys.modules, {'pyarrow': None, 'pyarrow.parquet': None}):
+            response = self.client_for(self.data['admin']).get('/api/finance/pledges/export/parquet/')
+        self.assertEqual(response.status_code, 501)
+        self.assertIn('pyarrow', response.json()['error'])
+
+    @skipUnless(pq, 'needs pyarrow')
+    def test_arrow_types(self):
+        import pyarrow as pa
+
+        self.assertEqual(_arrow_type(pa, TrendingScore._meta.get_field('score')), pa.float64())
+        self.assertEqual(_arrow_type(pa, Pledge._meta.get_field('project')), pa.int64())
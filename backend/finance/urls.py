@@ -1,18 +1,23 @@
 """
 URLs for finance-related endpoints.
 """
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import WalletViewSet, PledgeViewSet, ReleaseViewSet, RefundViewSet
+from .views import WalletViewSet, PledgeViewSet, ReleaseViewSet, RefundViewSet, RefundBatchViewSet
 
 router = DefaultRouter()
 router.register(r'wallets', WalletViewSet, basename='wallet')
 router.register(r'pledges', PledgeViewSet, basename='pledge')
 router.register(r'releases', ReleaseViewSet, basename='release')
 router.register(r'refunds', RefundViewSet, basename='refund')
+router.register(r'refund-batches', RefundBatchViewSet, basename='refund-batch')
 
 urlpatterns = [
     path('', include(router.urls)),
 ]
 
+if settings.ASYNC_READ_VIEWS:
+    from .async_views import PledgeListView
 
+    urlpatterns = [path('pledges/', PledgeListView.as_view())] + urlpatterns
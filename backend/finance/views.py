@@ -1,17 +1,28 @@
 """
 Views for finance-related endpoints.
 """
-from rest_framework import viewsets, status
+from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from drf_spectacular.utils import extend_schema
 from django.db import transaction
+from django.db.models import Prefetch, Q
 from decimal import Decimal
-from .models import Wallet, Pledge, Release, Refund
-from .serializers import WalletSerializer, PledgeSerializer, ReleaseSerializer, RefundSerializer
+from .models import Wallet, Pledge, Release, Refund, RefundBatch
+from .serializers import (
+    WalletSerializer, PledgeSerializer, PortfolioSerializer, ReleaseSerializer, RefundSerializer, RefundBatchSerializer
+)
+from .portfolio import backer_portfolio
+from .refunds import resume_refund_batch, schedule_refund_batch
 from projects.models import Project, Milestone
+from projects.serializers import ProjectListSerializer
 from users.models import Creator
+from config.exports import ExportMixin
+from config.pagination import OptInCursorPagination
+from config.row_serializers import RowListMixin
+from config.throttling import PledgeRateThrottle
+from governance.audit import audit, audited
 
 
 class WalletViewSet(viewsets.ReadOnlyModelViewSet):
@@ -45,11 +56,27 @@ class WalletViewSet(viewsets.ReadOnlyModelViewSet):
         return wallets
 
 
-class PledgeViewSet(viewsets.ModelViewSet):
+def pledge_project_prefetch(lookup='project'):
+    """Prefetch the nested ProjectListSerializer data of pledges in one query."""
+    return Prefetch(lookup, queryset=ProjectListSerializer.prepare_queryset(Project.objects.all()))
+
+
+class PledgeViewSet(ExportMixin, RowListMixin, viewsets.ModelViewSet):
     """ViewSet for Pledge model."""
     queryset = Pledge.objects.all()
     serializer_class = PledgeSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-created_at', '-id')
+    export_columns = (
+        'id', 'project_id', 'project__title', 'backer_id', 'backer__username', 'amount', 'currency', 'status',
+        'payment_reference', 'created_at',
+    )
+
+    def get_throttles(self):
+        if self.action == 'create':
+            return [PledgeRateThrottle()]
+        return super().get_throttles()
 
     def get_queryset(self):
         """Return pledges for the current user or filter by project."""
@@ -57,8 +84,9 @@ class PledgeViewSet(viewsets.ModelViewSet):
         project_id = self.request.query_params.get('project', None)
         if project_id:
             queryset = queryset.filter(project_id=project_id)
-        return queryset
+        return queryset.select_related('backer').prefetch_related(pledge_project_prefetch())
 
+    @audited('pledge.created', 'project_id', 'amount', actor_type='backer')
     @transaction.atomic
     def perform_create(self, serializer):
         """Create pledge and update escrow."""
@@ -70,21 +98,86 @@ class PledgeViewSet(viewsets.ModelViewSet):
         
         # Create pledge
         pledge = serializer.save(backer=self.request.user)
+        pledge.add_to_project_counters()
+        pledge.project.refresh_from_db()
         
         # Note: In a real system, we'd process payment here
         # For now, we just create the pledge record
         # The escrow is represented by the sum of active pledges
 
+    @audited('pledge.updated', 'project_id', 'amount', 'status', actor_type='backer')
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """Update pledge and move the project counters by its change in amount."""
+        previous = Pledge.objects.select_for_update().get(pk=serializer.instance.pk)
+        pledge = serializer.save()
+        # Status is read-only, so an active pledge stays active
+        if pledge.status == 'active':
+            pledge.change_project_counters(previous.amount)
+
+    @audited('pledge.deleted', 'project_id', 'amount', actor_type='backer')
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Delete pledge and drop it from the project counters."""
+        if instance.status == 'active':
+            instance.remove_from_project_counters()
+        instance.delete()
+
+    @extend_schema(
+        summary="Get your backer portfolio",
+        description=(
+            "Per-project summary of your pledges: amounts pledged, still active, refunded and refundable, "
+            "released milestone funds, milestone states and voting participation, plus totals across all "
+            "projects. Computed from a fixed number of grouped queries however many pledges you have."
+        ),
+        responses={200: PortfolioSerializer},
+    )
+    @action(detail=False, methods=['get'])
+    def portfolio(self, request):
+        """Summarise the current user's pledges per project."""
+        return Response(PortfolioSerializer(backer_portfolio(request.user), context={'request': request}).data)
 
-class ReleaseViewSet(viewsets.ModelViewSet):
+    @extend_schema(
+        summary="Cancel a pledge",
+        description="Cancel one of your active pledges. The amount is removed from the project's funding totals.",
+        request=None,
+        responses={200: PledgeSerializer},
+    )
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel an active pledge."""
+        pledge = self.get_object()
+        with transaction.atomic():
+            pledge = Pledge.objects.select_for_update().get(pk=pledge.pk)
+            if pledge.status != 'active':
+                return Response(
+                    {'error': 'Only active pledges can be cancelled'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            pledge.remove_from_project_counters()
+            pledge.status = 'cancelled'
+            pledge.save()
+            audit('pledge.cancelled', pledge, request.user, actor_type='backer', project_id=pledge.project_id, amount=pledge.amount)
+        return Response(PledgeSerializer(pledge, context={'request': request}).data)
+
+
+class ReleaseViewSet(ExportMixin, viewsets.ModelViewSet):
     """ViewSet for Release model."""
     queryset = Release.objects.all()
     serializer_class = ReleaseSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-released_at', '-id')
+    export_columns = (
+        'id', 'milestone_id', 'milestone__project_id', 'amount_released', 'released_to_wallet_id', 'released_at',
+        'tx_reference',
+    )
+    export_date_field = 'released_at'
+    export_project_lookup = 'milestone__project_id'
 
     def get_queryset(self):
         """Return releases filtered by milestone or project."""
-        queryset = Release.objects.all()
+        queryset = Release.objects.select_related('milestone')
         milestone_id = self.request.query_params.get('milestone', None)
         if milestone_id:
             queryset = queryset.filter(milestone_id=milestone_id)
@@ -100,8 +193,9 @@ class ReleaseViewSet(viewsets.ModelViewSet):
     def release_for_milestone(self, request, milestone_id=None):
         """Release funds for an approved milestone."""
         try:
-            milestone = Milestone.objects.get(id=milestone_id)
-        except Milestone.DoesNotExist:
+            # Lock the milestone so concurrent requests cannot both release it
+            milestone = Milestone.objects.select_for_update().get(id=milestone_id)
+        except (Milestone.DoesNotExist, ValueError):
             return Response(
                 {'error': 'Milestone not found'},
                 status=status.HTTP_404_NOT_FOUND
@@ -136,12 +230,15 @@ class ReleaseViewSet(viewsets.ModelViewSet):
         )
 
         # Update wallet balance
-        wallet.balance += amount
-        wallet.save()
+        wallet.credit(amount, 'release', release=release)
 
         # Update milestone status
         milestone.status = 'paid'
         milestone.save()
+        audit(
+            'milestone.released', milestone, request.user,
+            project_id=milestone.project_id, release_id=release.pk, amount=amount, wallet_id=wallet.pk,
+        )
 
         # Check if project should be marked as funded
         project = milestone.project
@@ -158,11 +255,16 @@ class RefundViewSet(viewsets.ModelViewSet):
     queryset = Refund.objects.all()
     serializer_class = RefundSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         """Return refunds for the current user's pledges."""
-        return Refund.objects.filter(pledge__backer=self.request.user)
+        return Refund.objects.filter(pledge__backer=self.request.user).select_related(
+            'pledge__backer', 'milestone'
+        ).prefetch_related(pledge_project_prefetch('pledge__project'))
 
+    @audited('refund.requested', 'pledge_id', 'milestone_id', 'amount', actor_type='backer')
     @transaction.atomic
     def perform_create(self, serializer):
         """Create refund request."""
@@ -186,8 +288,12 @@ class RefundViewSet(viewsets.ModelViewSet):
         elif refund.pledge.project.status in ['failed', 'cancelled']:
             self._process_refund(refund)
 
+    @transaction.atomic
     def _process_refund(self, refund):
         """Process a refund by updating balances."""
+        pledge = Pledge.objects.select_for_update().get(pk=refund.pledge_id)
+        refund.pledge = pledge
+
         # Get backer wallet
         wallet = Wallet.get_or_create_wallet(
             'backer',
@@ -196,12 +302,13 @@ class RefundViewSet(viewsets.ModelViewSet):
         )
         
         # Update wallet balance
-        wallet.balance += refund.amount
-        wallet.save()
+        wallet.credit(refund.amount, 'refund', refund=refund)
         
         # Update pledge status
-        refund.pledge.status = 'refunded'
-        refund.pledge.save()
+        if pledge.status == 'active':
+            pledge.remove_from_project_counters()
+        pledge.status = 'refunded'
+        pledge.save()
         
         # Update refund status
         refund.status = 'processed'
@@ -230,6 +337,56 @@ class RefundViewSet(viewsets.ModelViewSet):
             )
         
         self._process_refund(refund)
+        audit('refund.processed', refund, request.user, pledge_id=refund.pledge_id, amount=refund.amount)
         return Response({'status': 'Refund processed'})
 
 
+class RefundBatchViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet for RefundBatch progress (read-only)."""
+    queryset = RefundBatch.objects.all()
+    serializer_class = RefundBatchSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Admins see every batch; others see batches for projects they created or backed."""
+        user = self.request.user
+        queryset = RefundBatch.objects.all()
+        if not user.is_admin:
+            queryset = queryset.filter(
+                Q(project__creator__user=user) | Q(project__pledges__backer=user)
+            ).distinct()
+        project_id = self.request.query_params.get('project', None)
+        milestone_id = self.request.query_params.get('milestone', None)
+        if project_id:
+            queryset = queryset.filter(project_id=project_id)
+        if milestone_id:
+            queryset = queryset.filter(milestone_id=milestone_id)
+        return queryset
+
+    @extend_schema(
+        summary="Resume a refund batch",
+        description="Requeue a failed refund batch. It continues after the last committed chunk. Only admins can resume batches.",
+        request=None,
+        responses={200: RefundBatchSerializer},
+    )
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        """Resume a failed refund batch (admin action)."""
+        batch = self.get_object()
+
+        if not request.user.is_admin:
+            return Response(
+                {'error': 'Only admins can resume refund batches'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        if not resume_refund_batch(batch.pk):
+            return Response(
+                {'error': 'Only failed refund batches can be resumed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        schedule_refund_batch(batch)
+        audit('refund_batch.resumed', batch, request.user, project_id=batch.project_id)
+        batch.refresh_from_db()
+        return Response(RefundBatchSerializer(batch).data)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Vote, AuditLog
+from .models import Vote, AuditLogArchive, AuditLogHistory
 
 
 @admin.register(Vote)
@@ -9,10 +9,29 @@ class VoteAdmin(admin.ModelAdmin):
     search_fields = ('backer__username', 'milestone__title')
 
 
-@admin.register(AuditLog)
+@admin.register(AuditLogHistory)
 class AuditLogAdmin(admin.ModelAdmin):
     list_display = ('actor_type', 'actor_id', 'action', 'entity_type', 'entity_id', 'created_at')
     list_filter = ('actor_type', 'entity_type', 'created_at')
     search_fields = ('action',)
 
+    # A view over the live table and its partitions; entries come from governance.audit
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AuditLogArchive)
+class AuditLogArchiveAdmin(admin.ModelAdmin):
+    list_display = ('period_start', 'row_count', 'format', 'path', 'archived_at')
+    readonly_fields = ('period_start', 'table_name', 'path', 'format', 'row_count', 'archived_at')
+
+    def has_add_permission(self, request):
+        return False
+
 
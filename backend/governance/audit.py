@@ -0,0 +1,171 @@
+"""
+Buffered audit log writer.
+
+`audit()` records an AuditLog entry without inserting it. Entries made
+inside a transaction join an in-process buffer when it commits (and are
+dropped if it rolls back), so the audit trail only ever describes
+committed changes. The buffer is written with one `bulk_create` when it
+reaches AUDIT_LOG_BUFFER_SIZE entries or every AUDIT_LOG_FLUSH_INTERVAL
+seconds, whichever comes first, on a background thread; requests never
+wait for the insert. Whatever is left is flushed when the process exits.
+
+With AUDIT_LOG_FLUSH_INTERVAL = 0 there is no background thread and a full
+buffer is flushed inline by the request that filled it.
+
+Entries are lost if the process is killed without running exit handlers
+(e.g. SIGKILL or an OOM kill); at most one buffer's worth per process.
+"""
+import atexit
+import functools
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+# Entries kept for a retry when a flush fails, as a multiple of the buffer size
+MAX_BACKLOG_FACTOR = 10
+
+
+class AuditBuffer:
+    """Thread-safe buffer of unsaved AuditLog rows."""
+
+    def __init__(self):
+        self._entries = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @property
+    def buffer_size(self):
+        return getattr(settings, 'AUDIT_LOG_BUFFER_SIZE', 200)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 2.0)
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+            full = len(self._entries) >= self.buffer_size
+        if not self.flush_interval:
+            if full:
+                self.flush()
+            return
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """Insert everything buffered so far. Returns the number of entries written."""
+        with self._flush_lock:
+            with self._lock:
+                entries, self._entries = self._entries, []
+            if not entries:
+                return 0
+            try:
+                AuditLog.objects.bulk_create(entries, batch_size=self.buffer_size)
+            except Exception:
+                logger.exception('Could not write %s audit log entries; keeping them for the next flush', len(entries))
+                with self._lock:
+                    self._entries[:0] = entries
+                    overflow = len(self._entries) - self.buffer_size * MAX_BACKLOG_FACTOR
+                    if overflow > 0:
+                        logger.error('Audit log backlog full; dropping the %s oldest entries', overflow)
+                        del self._entries[:overflow]
+                return 0
+            return len(entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='audit-log-flusher', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                self._wakeup.wait(self.flush_interval or 1.0)
+                self._wakeup.clear()
+                self.flush()
+        finally:
+            connection.close()
+
+
+_buffer = AuditBuffer()
+
+
+def flush_audit_log():
+    """Write all buffered audit entries now. Returns the number written."""
+    return _buffer.flush()
+
+
+atexit.register(flush_audit_log)
+
+
+def actor_type_for(user):
+    if user is None or not user.is_authenticated:
+        return 'system'
+    if user.is_admin or user.is_staff:
+        return 'admin'
+    if user.is_creator:
+        return 'creator'
+    return 'backer'
+
+
+def audit(action, entity, actor=None, actor_type=None, entity_id=None, **metadata):
+    """
+    Record `action` on the model instance `entity`, performed by the user `actor`.
+
+    `actor_type` defaults from the user's role ('system' without a user);
+    pass it when the role differs for this action, e.g. a creator pledging
+    as a backer. `entity_id` overrides the entity's pk, for deleted objects.
+    Extra keyword arguments are stored as metadata.
+    """
+    entry = AuditLog(
+        actor_type=actor_type or actor_type_for(actor),
+        actor_id=actor.pk if actor is not None and actor.is_authenticated else 0,
+        action=action,
+        entity_type=entity._meta.model_name,
+        entity_id=entity_id if entity_id is not None else entity.pk,
+        metadata=json.loads(json.dumps(metadata, cls=DjangoJSONEncoder)),
+        created_at=timezone.now(),
+    )
+    transaction.on_commit(lambda: _buffer.add(entry))
+
+
+def audited(action, *fields, actor_type=None):
+    """
+    Audit a ViewSet's perform_create/perform_update/perform_destroy.
+
+    The entity is the serializer's instance (or the instance passed to
+    perform_destroy) and the actor the request user; `fields` name instance
+    attributes to copy into the metadata.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, target, *args, **kwargs):
+            entity = getattr(target, 'instance', target)
+            entity_id = getattr(entity, 'pk', None)
+            result = method(view, target, *args, **kwargs)
+            entity = getattr(target, 'instance', target)
+            audit(
+                action, entity, view.request.user, actor_type=actor_type,
+                entity_id=entity.pk if entity.pk is not None else entity_id,
+                **{field: getattr(entity, field) for field in fields}
+            )
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,51 @@
+"""
+Archive old months of the audit log to compressed files and drop their partitions.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from governance.partitions import (
+    WRITERS, archivable_months, archive_partition, partition_name, prepare_partitions,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Maintain monthly audit log partitions (create upcoming ones on PostgreSQL, seal finished '
+        'months on SQLite), then archive months older than --keep-months to files and drop them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-months', type=int, default=12,
+            help='Months of history to keep in the database, besides the current one (default: 12).',
+        )
+        parser.add_argument('--format', choices=sorted(WRITERS), default='jsonl', help='Archive format (default: jsonl).')
+        parser.add_argument(
+            '--output-dir', default=None,
+            help='Directory for archive files (default: the AUDIT_LOG_ARCHIVE_DIR setting).',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='List the months that would be archived.')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            months = archivable_months(options['keep_months'])
+            for month in months:
+                self.stdout.write(f'Would archive {partition_name(month)}')
+            self.stdout.write(self.style.SUCCESS(f'{len(months)} month(s) to archive (partitions not yet sealed are not listed).'))
+            return
+
+        prepared = prepare_partitions()
+        if prepared:
+            self.stdout.write('Prepared partitions: ' + ', '.join(f'{month:%Y-%m}' for month in prepared))
+
+        output_dir = options['output_dir'] or settings.AUDIT_LOG_ARCHIVE_DIR
+        archived = 0
+        for month in archivable_months(options['keep_months']):
+            try:
+                archive = archive_partition(month, output_dir, options['format'])
+            except (ValueError, RuntimeError) as exc:
+                raise CommandError(exc)
+            archived += 1
+            self.stdout.write(f'Archived {archive.row_count} entries from {archive.period_start:%Y-%m} to {archive.path}')
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} month(s).'))
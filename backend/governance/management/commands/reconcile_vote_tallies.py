@@ -0,0 +1,33 @@
+"""
+Reconcile the vote tallies stored on milestones against the votes table.
+"""
+from django.core.management.base import BaseCommand
+
+from projects.models import Milestone
+
+
+class Command(BaseCommand):
+    help = 'Recompute milestone vote counts and weighted tallies from votes and fix any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'milestone_ids', nargs='*', type=int,
+            help='Only reconcile these milestones (default: all milestones).',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report mismatched milestones without updating them.',
+        )
+
+    def handle(self, *args, **options):
+        mismatched = Milestone.rebuild_vote_tallies(
+            options['milestone_ids'] or None,
+            dry_run=options['dry_run'],
+        )
+        for milestone in mismatched:
+            self.stdout.write(
+                f'Milestone {milestone.id}: approve={milestone.approve_votes_count} '
+                f'({milestone.approve_weight}), reject={milestone.reject_votes_count} ({milestone.reject_weight})'
+            )
+        verb = 'Found' if options['dry_run'] else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(mismatched)} milestone(s) with stale tallies.'))
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('governance', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['-created_at', '-id'], name='governance__created_c30050_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['backer', '-created_at', '-id'], name='governance__backer__fe68cf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['milestone', '-created_at', '-id'], name='governance__milesto_1d22e5_idx'),
+        ),
+    ]
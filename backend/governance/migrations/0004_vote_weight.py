@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:09
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_vote_weights(apps, schema_editor):
+    Vote = apps.get_model('governance', 'Vote')
+    Pledge = apps.get_model('finance', 'Pledge')
+    for vote in Vote.objects.select_related('milestone').iterator():
+        vote.weight = Pledge.objects.filter(
+            project_id=vote.milestone.project_id,
+            backer_id=vote.backer_id,
+            status='active',
+        ).aggregate(total=Sum('amount'))['total'] or 0
+        vote.save(update_fields=['weight'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_pledge_finance_ple_backer__e0203c_idx_and_more'),
+        ('governance', '0003_auditlog_governance__created_c30050_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vote',
+            name='weight',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(backfill_vote_weights, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,144 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:32
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.utils.timezone
+
+
+# The SQL below is written against the table as of this migration (and the
+# historical model), not governance.partitions, which follows the live model.
+
+def _month_start(month, offset=0):
+    index = month.year * 12 + month.month - 1 + offset
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_audit_log(apps, schema_editor):
+    """On PostgreSQL, rebuild governance_auditlog as a table partitioned by month on created_at."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    AuditLog = apps.get_model('governance', 'AuditLog')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT attidentity FROM pg_attribute WHERE attrelid = 'governance_auditlog'::regclass AND attname = 'id'")
+        identity = cursor.fetchone()[0]
+        cursor.execute('ALTER TABLE governance_auditlog RENAME TO governance_auditlog_legacy')
+        cursor.execute(
+            'CREATE TABLE governance_auditlog (LIKE governance_auditlog_legacy INCLUDING DEFAULTS INCLUDING IDENTITY) '
+            'PARTITION BY RANGE (created_at)'
+        )
+        if not identity:
+            # A serial column: keep its sequence alive once the legacy table is dropped
+            cursor.execute("SELECT pg_get_serial_sequence('governance_auditlog_legacy', 'id')")
+            cursor.execute(f'ALTER SEQUENCE {cursor.fetchone()[0]} OWNED BY governance_auditlog.id')
+        # The partition key has to be part of the primary key
+        cursor.execute('ALTER TABLE governance_auditlog ADD PRIMARY KEY (id, created_at)')
+        cursor.execute('CREATE TABLE governance_auditlog_default PARTITION OF governance_auditlog DEFAULT')
+        # A partition for every month with rows, this month and the next two;
+        # ensure_partitions adds later months as they come
+        cursor.execute(
+            "SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC')::date FROM governance_auditlog_legacy"
+        )
+        months = {_month_start(row[0]) for row in cursor.fetchall()}
+        this_month = _month_start(timezone.now().astimezone(dt_timezone.utc))
+        months.update(_month_start(this_month, offset) for offset in range(3))
+        for month in sorted(months):
+            cursor.execute(
+                f'CREATE TABLE governance_auditlog_p{month:%Y%m} PARTITION OF governance_auditlog '
+                'FOR VALUES FROM (%s) TO (%s)',
+                [month, _month_start(month, 1)],
+            )
+        cursor.execute('INSERT INTO governance_auditlog SELECT * FROM governance_auditlog_legacy')
+        cursor.execute('DROP TABLE governance_auditlog_legacy')
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence('governance_auditlog', 'id'), COALESCE(MAX(id), 0) + 1, false) "
+            'FROM governance_auditlog'
+        )
+    for index in AuditLog._meta.indexes:
+        schema_editor.add_index(AuditLog, index)
+
+
+def create_history_view(apps, schema_editor):
+    """Create the history view over the live table and, on SQLite, any sealed months."""
+    AuditLog = apps.get_model('governance', 'AuditLog')
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in AuditLog._meta.concrete_fields)
+    tables = ['governance_auditlog']
+    if connection.vendor != 'postgresql':
+        # PostgreSQL partitions are already part of the parent table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' "
+                "AND name GLOB 'governance_auditlog_p[0-9][0-9][0-9][0-9][0-9][0-9]' ORDER BY name"
+            )
+            tables += [row[0] for row in cursor.fetchall()]
+    select = ' UNION ALL '.join(f'SELECT {columns} FROM {quote(table)}' for table in tables)
+    schema_editor.execute('DROP VIEW IF EXISTS governance_auditlog_history')
+    schema_editor.execute(f'CREATE VIEW governance_auditlog_history AS {select}')
+
+
+def drop_history_view(apps, schema_editor):
+    schema_editor.execute('DROP VIEW IF EXISTS governance_auditlog_history')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('governance', '0005_auditlog_created_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditLogHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actor_type', models.CharField(choices=[('admin', 'Admin'), ('creator', 'Creator'), ('backer', 'Backer'), ('system', 'System')], max_length=20)),
+                ('actor_id', models.PositiveIntegerField()),
+                ('action', models.CharField(max_length=255)),
+                ('entity_type', models.CharField(max_length=50)),
+                ('entity_id', models.PositiveIntegerField()),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+            ],
+            options={
+                'verbose_name': 'audit log entry',
+                'verbose_name_plural': 'audit log',
+                'db_table': 'governance_auditlog_history',
+                'ordering': ['-created_at', '-id'],
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AuditLogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField(unique=True)),
+                ('table_name', models.CharField(max_length=63)),
+                ('path', models.CharField(max_length=500)),
+                ('format', models.CharField(choices=[('jsonl', 'Gzipped JSON Lines'), ('parquet', 'Parquet')], max_length=10)),
+                ('row_count', models.PositiveIntegerField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-period_start'],
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='auditlog',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['entity_type', '-created_at', '-id'], name='governance__entity__cf59ab_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['actor_type', '-created_at', '-id'], name='governance__actor_t_81c927_idx'),
+        ),
+        migrations.RunPython(partition_audit_log, migrations.RunPython.noop),
+        migrations.RunPython(create_history_view, drop_history_view),
+    ]
@@ -2,6 +2,7 @@
 Governance models for voting and audit logs.
 """
 from django.db import models
+from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from users.models import User
@@ -18,18 +19,24 @@ class Vote(models.Model):
     milestone = models.ForeignKey(Milestone, on_delete=models.CASCADE, related_name='votes')
     backer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='votes')
     decision = models.CharField(max_length=10, choices=DECISION_CHOICES)
+    # Backer's active pledged amount in the project when the vote was cast
+    weight = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ['milestone', 'backer']
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['backer', '-created_at', '-id']),
+            models.Index(fields=['milestone', '-created_at', '-id']),
+        ]
 
     def __str__(self):
         return f"{self.backer.username} - {self.decision} for {self.milestone.title}"
 
 
-class AuditLog(models.Model):
-    """Audit log for tracking system actions."""
+class AuditLogBase(models.Model):
+    """Fields shared by the audit log table and its history view."""
     ACTOR_TYPE_CHOICES = [
         ('admin', 'Admin'),
         ('creator', 'Creator'),
@@ -43,12 +50,59 @@ class AuditLog(models.Model):
     entity_type = models.CharField(max_length=50)
     entity_id = models.PositiveIntegerField()
     metadata = models.JSONField(default=dict, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the action happens; entries are inserted later in batches
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
-        ordering = ['-created_at']
+        abstract = True
+        ordering = ['-created_at', '-id']
 
     def __str__(self):
         return f"{self.actor_type} {self.actor_id} - {self.action}"
 
 
+class AuditLog(AuditLogBase):
+    """
+    Audit log for tracking system actions.
+
+    Partitioned by month (see governance.partitions); write here, but read
+    through AuditLogHistory, which also covers sealed SQLite partitions.
+    """
+
+    class Meta(AuditLogBase.Meta):
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['entity_type', '-created_at', '-id']),
+            models.Index(fields=['actor_type', '-created_at', '-id']),
+        ]
+
+
+class AuditLogHistory(AuditLogBase):
+    """Read-only view over the live audit log and every retained monthly partition."""
+
+    class Meta(AuditLogBase.Meta):
+        managed = False
+        db_table = 'governance_auditlog_history'
+        verbose_name = 'audit log entry'
+        verbose_name_plural = 'audit log'
+
+
+class AuditLogArchive(models.Model):
+    """A month of audit log entries moved out of the database into a compressed file."""
+    FORMAT_CHOICES = [
+        ('jsonl', 'Gzipped JSON Lines'),
+        ('parquet', 'Parquet'),
+    ]
+
+    period_start = models.DateField(unique=True)
+    table_name = models.CharField(max_length=63)
+    path = models.CharField(max_length=500)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    row_count = models.PositiveIntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-period_start']
+
+    def __str__(self):
+        return f"{self.period_start:%Y-%m} -> {self.path}"
@@ -0,0 +1,306 @@
+"""
+Monthly partitions for the audit log.
+
+On PostgreSQL `governance_auditlog` is a natively partitioned table (range
+on created_at) with one partition per month, `governance_auditlog_pYYYYMM`,
+and a default partition that catches rows for months that have none yet.
+`ensure_partitions` creates the current and upcoming months' partitions
+and moves any matching rows out of the default partition.
+
+SQLite has no partitioning, so the live table takes every insert and
+`seal_closed_months` moves each finished month into its own
+`governance_auditlog_pYYYYMM` table with the same indexes (table per
+period).
+
+On both backends reads go through the `governance_auditlog_history` view
+(AuditLogHistory), which covers the live table and every partition, and
+`archive_partition` streams a month to a compressed file and then detaches
+and drops it, so queries only ever touch retained history.
+"""
+import gzip
+import json
+import os
+import re
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.apps.registry import Apps
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .models import AuditLog, AuditLogArchive
+
+PARENT = AuditLog._meta.db_table
+HISTORY_VIEW = 'governance_auditlog_history'
+DEFAULT_PARTITION = f'{PARENT}_default'
+PARTITION_RE = re.compile(rf'^{PARENT}_p(\d{{4}})(\d{{2}})$')
+CHUNK_SIZE = 5000
+
+
+def month_start(value):
+    """First day of the (UTC) month containing `value`, as a date."""
+    if isinstance(value, datetime):
+        value = value.astimezone(dt_timezone.utc)
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month):
+    """Aware UTC datetimes [start, end) covering `month`."""
+    start = datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+    end_month = add_months(month, 1)
+    return start, datetime(end_month.year, end_month.month, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(month):
+    return f'{PARENT}_p{month:%Y%m}'
+
+
+def _columns():
+    return [field.column for field in AuditLog._meta.concrete_fields]
+
+
+def _quoted_columns():
+    return ', '.join(connection.ops.quote_name(column) for column in _columns())
+
+
+def list_partitions():
+    """Months that currently have a partition table, oldest first."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                """
+                SELECT child.relname FROM pg_inherits
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                WHERE parent.relname = %s
+                """,
+                [PARENT],
+            )
+        else:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE %s",
+                [f'{PARENT}_p%'],
+            )
+        names = [row[0] for row in cursor.fetchall()]
+    months = []
+    for name in names:
+        match = PARTITION_RE.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def rebuild_history_view():
+    """(Re)create the history view over the live table and, on SQLite, every sealed month."""
+    columns = _quoted_columns()
+    tables = [PARENT]
+    if connection.vendor != 'postgresql':
+        # PostgreSQL partitions are already part of the parent table
+        tables += [partition_name(month) for month in list_partitions()]
+    select = ' UNION ALL '.join(
+        f'SELECT {columns} FROM {connection.ops.quote_name(table)}' for table in tables
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP VIEW IF EXISTS {HISTORY_VIEW}')
+        cursor.execute(f'CREATE VIEW {HISTORY_VIEW} AS {select}')
+
+
+def _partition_model(month):
+    """An unregistered copy of AuditLog stored in the month's partition table."""
+    table = partition_name(month)
+    attrs = {
+        '__module__': __name__,
+        'Meta': type('Meta', (), {
+            'apps': Apps(),
+            'app_label': AuditLog._meta.app_label,
+            'db_table': table,
+            'indexes': [
+                models.Index(fields=index.fields, name=f'auditlog_p{month:%Y%m}_{number}')
+                for number, index in enumerate(AuditLog._meta.indexes)
+            ],
+        }),
+    }
+    for field in AuditLog._meta.local_fields:
+        attrs[field.name] = field.clone()
+    return type(f'AuditLogPartition{month:%Y%m}', (models.Model,), attrs)
+
+
+def _create_partition_table(month):
+    # The SQLite schema editor refuses to run inside a transaction, so collect
+    # its DDL and execute that instead
+    editor = connection.schema_editor(collect_sql=True)
+    editor.deferred_sql = []
+    editor.create_model(_partition_model(month))
+    with connection.cursor() as cursor:
+        for statement in editor.collected_sql + [str(sql) for sql in editor.deferred_sql]:
+            cursor.execute(statement.rstrip(';'))
+
+
+def _insert_select_sql(table, queryset):
+    # INSERT ... SELECT built from a queryset so dates are adapted per backend
+    sql, params = queryset.values_list(*[field.attname for field in AuditLog._meta.concrete_fields]).query.sql_with_params()
+    return f'INSERT INTO {connection.ops.quote_name(table)} ({_quoted_columns()}) {sql}', params
+
+
+@transaction.atomic
+def ensure_partitions(now=None, ahead=2):
+    """
+    Create PostgreSQL partitions for this month, the next `ahead` months and
+    any month that has rows in the default partition. Returns the months created.
+    """
+    if connection.vendor != 'postgresql':
+        return []
+    current = month_start(now or timezone.now())
+    existing = set(list_partitions())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC')::date FROM {DEFAULT_PARTITION}"
+        )
+        stranded = {row[0] for row in cursor.fetchall()}
+        wanted = stranded | {add_months(current, offset) for offset in range(ahead + 1)}
+        created = []
+        for month in sorted(wanted - existing):
+            table = partition_name(month)
+            start, end = month_bounds(month)
+            # Build the table outside the parent, move the month's rows over from
+            # the default partition, then attach it (attaching builds its indexes)
+            cursor.execute(f'CREATE TABLE {table} (LIKE {PARENT} INCLUDING DEFAULTS)')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s RETURNING *) '
+                f'INSERT INTO {table} SELECT * FROM moved',
+                [start, end],
+            )
+            cursor.execute(f'ALTER TABLE {PARENT} ATTACH PARTITION {table} FOR VALUES FROM (%s) TO (%s)', [start, end])
+            created.append(month)
+    return created
+
+
+def seal_closed_months(now=None):
+    """
+    On SQLite, move every finished month out of the live table into its own
+    partition table. Returns the months sealed.
+    """
+    if connection.vendor == 'postgresql':
+        return []
+    current_start, _ = month_bounds(month_start(now or timezone.now()))
+    sealed = []
+    while True:
+        oldest = AuditLog.objects.filter(created_at__lt=current_start).order_by('created_at').values_list(
+            'created_at', flat=True
+        ).first()
+        if oldest is None:
+            break
+        month = month_start(oldest)
+        start, end = month_bounds(month)
+        with transaction.atomic():
+            if month not in list_partitions():
+                _create_partition_table(month)
+            rows = AuditLog.objects.filter(created_at__gte=start, created_at__lt=end)
+            with connection.cursor() as cursor:
+                cursor.execute(*_insert_select_sql(partition_name(month), rows))
+            rows.delete()
+        sealed.append(month)
+    if sealed:
+        rebuild_history_view()
+    return sealed
+
+
+def prepare_partitions(now=None):
+    """Run the backend's partition maintenance: ensure upcoming months on PostgreSQL, seal closed ones on SQLite."""
+    if connection.vendor == 'postgresql':
+        return ensure_partitions(now)
+    return seal_closed_months(now)
+
+
+def archivable_months(keep_months, now=None):
+    """Partitioned months older than the newest `keep_months` months."""
+    cutoff = add_months(month_start(now or timezone.now()), -keep_months)
+    return [month for month in list_partitions() if month < cutoff]
+
+
+def _iter_rows(month):
+    fields = [field.attname for field in AuditLog._meta.concrete_fields]
+    return _partition_model(month).objects.order_by('id').values(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _write_jsonl(path, rows):
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8') as out:
+        for row in rows:
+            row['created_at'] = row['created_at'].isoformat()
+            out.write(json.dumps(row, separators=(',', ':')) + '\n')
+            count += 1
+    return count
+
+
+def _write_parquet(path, rows):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError('Parquet archives need pyarrow; install it or use the jsonl format')
+
+    schema = pa.schema([
+        ('id', pa.int64()), ('actor_type', pa.string()), ('actor_id', pa.int64()), ('action', pa.string()),
+        ('entity_type', pa.string()), ('entity_id', pa.int64()), ('metadata', pa.string()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+    ])
+    count = 0
+    batch = []
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for row in rows:
+            row['metadata'] = json.dumps(row['metadata'])
+            batch.append(row)
+            if len(batch) == CHUNK_SIZE:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+WRITERS = {'jsonl': ('.jsonl.gz', _write_jsonl), 'parquet': ('.parquet', _write_parquet)}
+
+
+def archive_partition(month, directory, fmt='jsonl'):
+    """
+    Stream a month's partition to a compressed file in `directory`, then detach and drop it.
+
+    The file is written under a temporary name and renamed once complete,
+    and the partition is only dropped if the file holds every row.
+    Returns the AuditLogArchive record.
+    """
+    extension, write = WRITERS[fmt]
+    table = partition_name(month)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, table + extension)
+    partial = path + '.partial'
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Block inserts into the month while it is copied out
+                cursor.execute(f'LOCK TABLE {table} IN SHARE MODE')
+            cursor.execute(f'SELECT COUNT(*) FROM {table}')
+            expected = cursor.fetchone()[0]
+        written = write(partial, _iter_rows(month))
+        if written != expected:
+            os.remove(partial)
+            raise RuntimeError(f'Archived {written} of {expected} rows from {table}; partition kept')
+        os.replace(partial, path)
+
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'ALTER TABLE {PARENT} DETACH PARTITION {table}')
+            cursor.execute(f'DROP TABLE {table}')
+        if connection.vendor != 'postgresql':
+            rebuild_history_view()
+        return AuditLogArchive.objects.create(
+            period_start=month, table_name=table, path=path, format=fmt, row_count=written,
+        )
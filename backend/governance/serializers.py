@@ -7,14 +7,21 @@ from projects.serializers import MilestoneSerializer
 
 
 class VoteSerializer(serializers.ModelSerializer):
-    """Serializer for Vote model."""
-    milestone = MilestoneSerializer(read_only=True)
+    """Serializer for Vote model.
+
+    Accepts a milestone id on write and renders the nested milestone on read.
+    """
     backer_username = serializers.CharField(source='backer.username', read_only=True)
 
     class Meta:
         model = Vote
-        fields = ('id', 'milestone', 'backer', 'backer_username', 'decision', 'created_at')
-        read_only_fields = ('id', 'created_at')
+        fields = ('id', 'milestone', 'backer', 'backer_username', 'decision', 'weight', 'created_at')
+        read_only_fields = ('id', 'backer', 'weight', 'created_at')
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['milestone'] = MilestoneSerializer(instance.milestone, context=self.context).data
+        return data
 
 
 class AuditLogSerializer(serializers.ModelSerializer):
@@ -0,0 +1,386 @@
+"""
+Query budgets for governance endpoints and tests for the audit log writer and partitions.
+"""
+import csv
+import gzip
+import io
+import json
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models.query import QuerySet
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from config.testing import QueryBudgetTestCase
+from finance.models import Pledge, Refund, RefundBatch, Release, Wallet
+from finance.refunds import claim_refund_batch, process_refund_batch, process_refund_chunk
+from governance.audit import audit, flush_audit_log
+from governance.models import AuditLog, AuditLogArchive, AuditLogHistory, Vote
+from governance.partitions import archivable_months, archive_partition, list_partitions, seal_closed_months
+from projects.models import Milestone, Project
+from users.models import Creator, User
+
+
+class GovernanceQueryBudgetTests(QueryBudgetTestCase):
+    """Fixed query budgets for the governance API, independent of page size."""
+
+    def test_vote_list(self):
+        self.assertQueryBudget('/api/governance/votes/', 2, user=self.data['backer'], min_results=50)
+
+    def test_vote_list_for_milestone(self):
+        self.assertQueryBudget(
+            f"/api/governance/votes/?milestone={self.data['milestone'].pk}", 2,
+            user=self.data['backer'], min_results=1,
+        )
+
+    def test_audit_log_list(self):
+        self.assertQueryBudget('/api/governance/audit-logs/', 2, user=self.data['admin'], min_results=50)
+
+    def test_audit_log_list_cursor(self):
+        self.assertQueryBudget('/api/governance/audit-logs/?pagination=cursor', 1, user=self.data['admin'], min_results=50)
+
+
+@override_settings(AUDIT_LOG_FLUSH_INTERVAL=0)
+class VoteChangeTests(APITestCase):
+    """Casting, editing or withdrawing a vote keeps the milestone's tallies in step with its votes."""
+
+    def setUp(self):
+        creator = User.objects.create_user('maker', email='maker@example.com', password='pw', is_creator=True)
+        now = timezone.now()
+        project = Project.objects.create(
+            creator=Creator.objects.create(user=creator, display_name='Maker'),
+            title='Lamp', description='A lamp', goal_amount=Decimal('1000'), status='active',
+            start_date=now, end_date=now + timedelta(days=30),
+        )
+        self.milestone = Milestone.objects.create(
+            project=project, title='Prototype', description='', target_amount=Decimal('500'), order_index=0,
+            status='voting',
+        )
+        self.backers = [
+            User.objects.create_user(f'fan{i}', email=f'fan{i}@example.com', password='pw') for i in range(4)
+        ]
+        # Two votes each way, so the milestone stays open until one changes
+        self.votes = []
+        for backer, decision in zip(self.backers, ('approve', 'reject', 'approve', 'reject')):
+            vote = Vote.objects.create(milestone=self.milestone, backer=backer, decision=decision, weight=Decimal('25'))
+            self.milestone.update_vote_tallies(added=(decision, vote.weight))
+            self.votes.append(vote)
+
+    def tearDown(self):
+        flush_audit_log()
+
+    def assertTalliesMatchVotes(self):
+        self.assertEqual(Milestone.rebuild_vote_tallies(dry_run=True), [])
+
+    def test_edit(self):
+        self.client.force_authenticate(self.backers[0])
+        response = self.client.patch(f'/api/governance/votes/{self.votes[0].pk}/', {'decision': 'reject'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTalliesMatchVotes()
+        self.milestone.refresh_from_db()
+        self.assertEqual((self.milestone.approve_votes_count, self.milestone.reject_votes_count), (1, 3))
+        self.assertEqual(self.milestone.status, 'rejected')
+
+    def test_delete(self):
+        self.client.force_authenticate(self.backers[1])
+        self.assertEqual(self.client.delete(f'/api/governance/votes/{self.votes[1].pk}/').status_code, 204)
+        self.assertTalliesMatchVotes()
+        self.milestone.refresh_from_db()
+        self.assertEqual(self.milestone.approve_weight, Decimal('50'))
+        self.assertEqual(self.milestone.reject_weight, Decimal('25'))
+        # The remaining votes now decide the milestone, which closes it to changes
+        self.assertEqual(self.milestone.status, 'approved')
+        self.client.force_authenticate(self.backers[0])
+        self.assertEqual(self.client.delete(f'/api/governance/votes/{self.votes[0].pk}/').status_code, 400)
+        self.assertTalliesMatchVotes()
+
+    def late_backer(self):
+        """A backer with an active pledge who has not voted yet."""
+        backer = User.objects.create_user('latecomer', email='late@example.com', password='pw')
+        Pledge.objects.create(project=self.milestone.project, backer=backer, amount=Decimal('40'))
+        return backer
+
+    def test_vote_again(self):
+        backer = self.late_backer()
+        self.client.force_authenticate(backer)
+        vote = Vote.objects.create(milestone=self.milestone, backer=backer, decision='reject', weight=Decimal('40'))
+        self.milestone.update_vote_tallies(added=('reject', vote.weight))
+        response = self.client.post('/api/governance/votes/', {'milestone': self.milestone.pk, 'decision': 'approve'})
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Vote.objects.filter(backer=backer).count(), 1)
+        self.assertTalliesMatchVotes()
+        self.milestone.refresh_from_db()
+        self.assertEqual((self.milestone.approve_votes_count, self.milestone.reject_votes_count), (3, 2))
+
+    def test_concurrent_first_votes(self):
+        backer = self.late_backer()
+        original_get = QuerySet.get
+        raced = []
+
+        def racing_get(queryset, *args, **kwargs):
+            if queryset.model is Vote and not raced:
+                raced.append(True)
+                # Another request from the same backer commits its first vote between this read and the insert
+                Vote.objects.create(milestone=self.milestone, backer=backer, decision='approve', weight=Decimal('40'))
+                self.milestone.update_vote_tallies(added=('approve', Decimal('40')))
+                raise Vote.DoesNotExist
+            return original_get(queryset, *args, **kwargs)
+
+        self.client.force_authenticate(backer)
+        with mock.patch.object(QuerySet, 'get', racing_get):
+            response = self.client.post('/api/governance/votes/', {'milestone': self.milestone.pk, 'decision': 'reject'})
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertTrue(raced)
+        self.assertEqual(Vote.objects.get(backer=backer).decision, 'reject')
+        # The losing request replaced the winner's vote rather than counting a second one
+        self.assertTalliesMatchVotes()
+        self.milestone.refresh_from_db()
+        self.assertEqual((self.milestone.approve_votes_count, self.milestone.reject_votes_count), (2, 3))
+
+    def test_reconcile_vote_tallies(self):
+        other = Milestone.objects.create(
+            project=self.milestone.project, title='Ship', description='', target_amount=Decimal('100'), order_index=1,
+        )
+        Milestone.objects.filter(pk__in=[self.milestone.pk, other.pk]).update(
+            approve_votes_count=9, approve_weight=Decimal('900'), reject_votes_count=0, reject_weight=0,
+        )
+
+        out = io.StringIO()
+        call_command('reconcile_vote_tallies', '--dry-run', stdout=out)
+        self.assertIn('Found 2 milestone(s) with stale tallies.', out.getvalue())
+        self.assertIn(f'Milestone {self.milestone.pk}: approve=2 (50', out.getvalue())
+        self.assertEqual(Milestone.objects.get(pk=other.pk).approve_votes_count, 9)
+
+        out = io.StringIO()
+        call_command('reconcile_vote_tallies', str(other.pk), stdout=out)
+        self.assertIn('Fixed 1 milestone(s)', out.getvalue())
+        other.refresh_from_db()
+        self.assertEqual((other.approve_votes_count, other.approve_weight, other.reject_votes_count), (0, 0, 0))
+        self.assertEqual(Milestone.objects.get(pk=self.milestone.pk).approve_votes_count, 9)
+
+        call_command('reconcile_vote_tallies', stdout=io.StringIO())
+        self.assertTalliesMatchVotes()
+        self.milestone.refresh_from_db()
+        self.assertEqual(
+            (self.milestone.approve_votes_count, self.milestone.approve_weight,
+             self.milestone.reject_votes_count, self.milestone.reject_weight),
+            (2, Decimal('50'), 2, Decimal('50')),
+        )
+
+    def test_only_own_vote(self):
+        self.client.force_authenticate(self.backers[0])
+        url = f'/api/governance/votes/{self.votes[1].pk}/?milestone={self.milestone.pk}'
+        self.assertEqual(self.client.patch(url, {'decision': 'approve'}).status_code, 403)
+        self.assertEqual(self.client.delete(url).status_code, 403)
+        self.assertTalliesMatchVotes()
+
+
+@override_settings(AUDIT_LOG_FLUSH_INTERVAL=0)
+class MilestoneRejectionTests(APITestCase):
+    """A rejected milestone fails its project and refunds the unreleased escrow."""
+
+    def setUp(self):
+        creator = User.objects.create_user('maker', email='maker@example.com', password='pw', is_creator=True)
+        now = timezone.now()
+        self.project = Project.objects.create(
+            creator=Creator.objects.create(user=creator, display_name='Maker'),
+            title='Lamp', description='A lamp', goal_amount=Decimal('1000'), status='active',
+            start_date=now, end_date=now + timedelta(days=30),
+        )
+        paid, self.milestone, self.later = [
+            Milestone.objects.create(
+                project=self.project, title=title, description='', target_amount=Decimal('300'),
+                order_index=index, status=status,
+            )
+            for index, (title, status) in enumerate((('Design', 'paid'), ('Prototype', 'voting'), ('Launch', 'pending')))
+        ]
+        Release.objects.create(
+            milestone=paid, amount_released=Decimal('300'),
+            released_to_wallet=Wallet.objects.create(owner_type='creator', owner_id=creator.pk),
+        )
+        self.backers = [
+            User.objects.create_user(f'fan{i}', email=f'fan{i}@example.com', password='pw') for i in range(2)
+        ]
+        self.pledges = [
+            Pledge.objects.create(project=self.project, backer=backer, amount=amount)
+            for backer, amount in zip(self.backers, (Decimal('600'), Decimal('400')))
+        ]
+        Project.rebuild_funding_counters([self.project.pk])
+
+    def tearDown(self):
+        flush_audit_log()
+
+    def reject(self):
+        self.client.force_authenticate(self.backers[0])
+        response = self.client.post('/api/governance/votes/', {'milestone': self.milestone.pk, 'decision': 'reject'})
+        self.assertEqual(response.status_code, 201)
+
+    def test_project_fails(self):
+        self.reject()
+        self.project.refresh_from_db()
+        self.later.refresh_from_db()
+        self.assertEqual(self.project.status, 'failed')
+        self.assertEqual(self.later.status, 'cancelled')
+        # No new escrow flows into the failed project
+        self.client.force_authenticate(self.backers[1])
+        response = self.client.post('/api/finance/pledges/', {'project': self.project.pk, 'amount': '50.00'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unreleased_escrow_refunded_pro_rata(self):
+        self.reject()
+        batch = RefundBatch.objects.get(project=self.project)
+        self.assertEqual(batch.refund_pool, Decimal('700'))
+        process_refund_batch(batch.pk)
+        refunds = dict(Refund.objects.values_list('pledge__backer', 'amount'))
+        self.assertEqual(refunds, {self.backers[0].pk: Decimal('420.00'), self.backers[1].pk: Decimal('280.00')})
+        self.assertFalse(Pledge.objects.filter(project=self.project, status='active').exists())
+
+    def test_counters_follow_each_chunk(self):
+        Pledge.objects.create(project=self.project, backer=self.backers[0], amount=Decimal('100'))
+        Project.rebuild_funding_counters([self.project.pk])
+        self.reject()
+        batch = RefundBatch.objects.get(project=self.project)
+        self.assertTrue(claim_refund_batch(batch.pk))
+
+        project = Project.objects.filter(pk=self.project.pk)
+        counters = []
+        with mock.patch.object(Project, 'rebuild_funding_counters') as rebuild:
+            while process_refund_chunk(batch.pk, chunk_size=1):
+                counters.append(project.values_list('total_pledged', 'active_pledge_count', 'backers_count').get())
+        rebuild.assert_not_called()
+        # The first backer still counts until their second pledge is refunded
+        self.assertEqual(counters, [(Decimal('500'), 2, 2), (Decimal('100'), 1, 1), (0, 0, 0)])
+        # Nothing for a rebuild to correct
+        self.assertEqual(Project.rebuild_funding_counters([self.project.pk]), 1)
+        self.assertEqual(project.values_list('total_pledged', 'active_pledge_count', 'backers_count').get(), (0, 0, 0))
+
+@override_settings(AUDIT_LOG_FLUSH_INTERVAL=0, AUDIT_LOG_BUFFER_SIZE=3)
+class BufferedAuditLogTests(APITestCase):
+
+    def setUp(self):
+        flush_audit_log()
+        AuditLog.objects.all().delete()
+        creator = User.objects.create_user('maker', email='maker@example.com', password='pw', is_creator=True)
+        self.backer = User.objects.create_user('fan', email='fan@example.com', password='pw')
+        now = timezone.now()
+        self.project = Project.objects.create(
+            creator=Creator.objects.create(user=creator, display_name='Maker'),
+            title='Lamp', description='A lamp', goal_amount=Decimal('1000'), status='active',
+            start_date=now, end_date=now + timedelta(days=30),
+        )
+        self.client.force_authenticate(self.backer)
+
+    def tearDown(self):
+        flush_audit_log()
+
+    def pledge(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/finance/pledges/', {'project': self.project.pk, 'amount': '25.00'})
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def test_entries_are_buffered_until_flush(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.pledge()
+        self.assertFalse(any('governance_auditlog' in query['sql'] for query in queries.captured_queries))
+        self.assertFalse(AuditLog.objects.exists())
+
+        self.assertEqual(flush_audit_log(), 1)
+        entry = AuditLog.objects.get()
+        self.assertEqual(
+            (entry.action, entry.actor_type, entry.actor_id, entry.entity_type, entry.entity_id),
+            ('pledge.created', 'backer', self.backer.pk, 'pledge', response.data['id']),
+        )
+        self.assertEqual(entry.metadata, {'project_id': self.project.pk, 'amount': '25.00'})
+
+    def test_full_buffer_is_written_in_one_insert(self):
+        self.pledge()
+        self.pledge()
+        self.assertFalse(AuditLog.objects.exists())
+        self.pledge()
+        self.assertEqual(AuditLog.objects.filter(action='pledge.created').count(), 3)
+
+    def test_rolled_back_actions_are_not_audited(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    audit('project.activated', self.project, self.backer)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(flush_audit_log(), 0)
+
+    def test_entries_keep_the_time_of_the_action(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            audit('project.activated', self.project)
+        recorded = timezone.now()
+        flush_audit_log()
+        entry = AuditLog.objects.get()
+        self.assertLessEqual(entry.created_at, recorded)
+        self.assertEqual(entry.actor_type, 'system')
+
+
+class AuditLogPartitionTests(APITestCase):
+    now = datetime(2026, 3, 15, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        AuditLog.objects.bulk_create([
+            AuditLog(
+                actor_type='system', actor_id=0, action='test.event', entity_type=entity_type,
+                entity_id=day, created_at=self.now - timedelta(days=day),
+            )
+            for day in range(0, 120, 3)
+            for entity_type in ('pledge', 'vote')
+        ])
+        self.admin = User.objects.create_user('root', email='root@example.com', is_admin=True, is_staff=True)
+
+    def test_sealing_moves_finished_months_out_of_the_live_table(self):
+        sealed = seal_closed_months(self.now)
+        self.assertEqual([f'{month:%Y-%m}' for month in sealed], ['2025-11', '2025-12', '2026-01', '2026-02'])
+        self.assertEqual(list_partitions(), sealed)
+        self.assertTrue(all(entry.created_at >= datetime(2026, 3, 1, tzinfo=dt_timezone.utc) for entry in AuditLog.objects.all()))
+        self.assertEqual(AuditLogHistory.objects.count(), 80)
+
+        # Filters and ordering span the live table and every sealed month
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/governance/audit-logs/?entity_type=vote&pagination=cursor')
+        self.assertEqual(response.status_code, 200)
+        created = [entry['created_at'] for entry in response.data['results']]
+        self.assertEqual(created, sorted(created, reverse=True))
+        self.assertEqual({entry['entity_type'] for entry in response.data['results']}, {'vote'})
+
+    def test_archiving_writes_the_month_to_a_file_and_drops_it(self):
+        seal_closed_months(self.now)
+        months = archivable_months(keep_months=2, now=self.now)
+        self.assertEqual([f'{month:%Y-%m}' for month in months], ['2025-11', '2025-12'])
+
+        with tempfile.TemporaryDirectory() as directory:
+            archive = archive_partition(months[0], directory)
+            with gzip.open(archive.path, 'rt') as archived:
+                rows = [json.loads(line) for line in archived]
+
+        self.assertEqual(len(rows), archive.row_count)
+        self.assertTrue(all(row['created_at'].startswith('2025-11') for row in rows))
+        self.assertNotIn(months[0], list_partitions())
+        self.assertEqual(AuditLogHistory.objects.count(), 80 - archive.row_count)
+        self.assertEqual(AuditLogArchive.objects.get().period_start, months[0])
+
+
+class VoteExportTests(QueryBudgetTestCase):
+
+    def test_votes_csv_by_project(self):
+        project = self.data['project']
+        response = self.client_for(self.data['admin']).get('/api/governance/votes/export/csv/', {'project': project.pk})
+        self.assertEqual(response.status_code, 200)
+        header, *rows = csv.reader(io.StringIO(b''.join(response.streaming_content).decode()))
+        self.assertEqual(header[-1], 'created_at')
+        votes = Vote.objects.filter(milestone__project=project).order_by('created_at', 'pk')
+        self.assertEqual([int(row[0]) for row in rows], list(votes.values_list('pk', flat=True)))
+        self.assertEqual({row[header.index('decision')] for row in rows}, set(votes.values_list('decision', flat=True)))
@@ -1,23 +1,42 @@
 """
 Views for governance-related endpoints.
 """
-from rest_framework import viewsets, status
+from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from drf_spectacular.utils import extend_schema
 from django.db import transaction
-from .models import Vote, AuditLog
+from django.db.models import Sum
+from .audit import audit
+from .models import Vote, AuditLogHistory
 from .serializers import VoteSerializer, AuditLogSerializer
 from projects.models import Milestone
 from finance.models import Pledge
+from finance.refunds import fail_project_for_rejected_milestone, start_refund_batch, schedule_refund_batch
+from config.exports import ExportMixin
+from config.pagination import OptInCursorPagination
+from config.throttling import VoteRateThrottle
 
 
-class VoteViewSet(viewsets.ModelViewSet):
+class VoteViewSet(ExportMixin, viewsets.ModelViewSet):
     """ViewSet for Vote model."""
     queryset = Vote.objects.all()
     serializer_class = VoteSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-created_at', '-id')
+    export_columns = (
+        'id', 'milestone_id', 'milestone__project_id', 'backer_id', 'backer__username', 'decision', 'weight',
+        'created_at',
+    )
+    export_project_lookup = 'milestone__project_id'
+
+    def get_throttles(self):
+        if self.action == 'create':
+            return [VoteRateThrottle()]
+        return super().get_throttles()
 
     def get_queryset(self):
         """Return votes for the current user or filter by milestone."""
@@ -25,7 +44,7 @@ class VoteViewSet(viewsets.ModelViewSet):
         milestone_id = self.request.query_params.get('milestone', None)
         if milestone_id:
             queryset = Vote.objects.filter(milestone_id=milestone_id)
-        return queryset
+        return queryset.select_related('milestone', 'backer')
 
     @extend_schema(
         summary="Vote on a milestone",
@@ -46,31 +65,84 @@ class VoteViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Create vote and check if milestone should be approved/rejected."""
         milestone = serializer.validated_data['milestone']
-        
+
         # Validate milestone is in voting status
         if milestone.status != 'voting':
             raise serializers.ValidationError('Milestone is not open for voting')
-        
-        # Validate backer has an active pledge for this project
-        has_pledge = Pledge.objects.filter(
+
+        # Validate backer has an active pledge for this project; the pledged
+        # amount is the vote's weight
+        weight = Pledge.objects.filter(
             project=milestone.project,
             backer=self.request.user,
             status='active'
-        ).exists()
-        
-        if not has_pledge:
+        ).aggregate(total=Sum('amount'))['total']
+
+        if weight is None:
             raise serializers.ValidationError('You must have an active pledge to vote')
-        
-        # Create or update vote
-        vote, created = Vote.objects.update_or_create(
+
+        # Create the vote, or lock the existing one and swap its tally for
+        # the new one. A concurrent first vote that loses the insert finds
+        # the winner's row here and replaces what the winner counted.
+        decision = serializer.validated_data['decision']
+        vote, created = Vote.objects.select_for_update().get_or_create(
             milestone=milestone,
             backer=self.request.user,
-            defaults={'decision': serializer.validated_data['decision']}
+            defaults={'decision': decision, 'weight': weight}
         )
-        
+        previous = None
+        if not created:
+            previous = (vote.decision, vote.weight)
+            vote.decision, vote.weight = decision, weight
+            vote.save(update_fields=['decision', 'weight'])
+        serializer.instance = vote
+        milestone.update_vote_tallies(added=(decision, weight), removed=previous)
+        audit(
+            'vote.cast' if created else 'vote.changed', vote, self.request.user, actor_type='backer',
+            milestone_id=milestone.pk, decision=decision, weight=weight,
+        )
+
         # Check voting results
         self._check_voting_results(milestone)
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """Change your vote's decision and move its weight between the tallies."""
+        vote = Vote.objects.select_for_update().get(pk=serializer.instance.pk)
+        self._check_can_change(vote)
+        milestone = serializer.validated_data.get('milestone', vote.milestone)
+        if milestone.pk != vote.milestone_id:
+            raise serializers.ValidationError('A vote cannot be moved to another milestone')
+        previous = (vote.decision, vote.weight)
+        vote = serializer.save()
+        vote.milestone.update_vote_tallies(added=(vote.decision, vote.weight), removed=previous)
+        audit(
+            'vote.changed', vote, self.request.user, actor_type='backer',
+            milestone_id=vote.milestone_id, decision=vote.decision, weight=vote.weight,
+        )
+        self._check_voting_results(vote.milestone)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Withdraw your vote and take it out of the tallies."""
+        vote = Vote.objects.select_for_update().get(pk=instance.pk)
+        self._check_can_change(vote)
+        vote_id = vote.pk
+        vote.delete()
+        vote.milestone.update_vote_tallies(removed=(vote.decision, vote.weight))
+        audit(
+            'vote.withdrawn', vote, self.request.user, actor_type='backer', entity_id=vote_id,
+            milestone_id=vote.milestone_id, decision=vote.decision, weight=vote.weight,
+        )
+        self._check_voting_results(vote.milestone)
+
+    def _check_can_change(self, vote):
+        """Only the backer may change a vote, and only while its milestone is open for voting."""
+        if vote.backer_id != self.request.user.pk:
+            raise PermissionDenied('You can only change your own vote')
+        if vote.milestone.status != 'voting':
+            raise serializers.ValidationError('Milestone is not open for voting')
+
     def _check_voting_results(self, milestone):
         """Check if milestone should be approved or rejected based on votes."""
         approve_count = milestone.approve_votes_count
@@ -82,40 +154,39 @@ class VoteViewSet(viewsets.ModelViewSet):
         if total_votes == 0:
             return
         
-        # Get all backers who have pledged
-        total_backers = Pledge.objects.filter(
-            project=milestone.project,
-            status='active'
-        ).values('backer').distinct().count()
-        
         # Simple rule: if approve > reject, approve
         # Could also add threshold like "at least 50% of backers voted"
+        # (see milestone.project.backers_count) or compare approve_weight/reject_weight
         if approve_count > reject_count:
             milestone.status = 'approved'
             milestone.save()
+            audit('milestone.approved', milestone, project_id=milestone.project_id)
         elif reject_count > approve_count:
             milestone.status = 'rejected'
             milestone.save()
+            audit('milestone.rejected', milestone, project_id=milestone.project_id)
             # Trigger refund logic for rejected milestone
             self._handle_rejected_milestone(milestone)
 
     def _handle_rejected_milestone(self, milestone):
-        """Handle refunds when a milestone is rejected."""
-        # This could trigger automatic refunds for future milestones
-        # For now, we just mark it as rejected
-        # Backers can manually request refunds
-        pass
+        """Fail the project and refund its backers' unreleased escrow in a batch."""
+        project = fail_project_for_rejected_milestone(milestone)
+        batch, created = start_refund_batch(project, milestone)
+        if created:
+            schedule_refund_batch(batch)
 
 
 class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
-    """ViewSet for AuditLog model (read-only for admins)."""
-    queryset = AuditLog.objects.all()
+    """ViewSet for AuditLog model (read-only for admins), across all retained partitions."""
+    queryset = AuditLogHistory.objects.all()
     serializer_class = AuditLogSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         """Filter audit logs by entity type if provided."""
-        queryset = AuditLog.objects.all()
+        queryset = AuditLogHistory.objects.all()
         entity_type = self.request.query_params.get('entity_type', None)
         actor_type = self.request.query_params.get('actor_type', None)
         
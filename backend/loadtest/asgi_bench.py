@@ -0,0 +1,96 @@
+"""
+Sync vs async read views under ASGI at a fixed worker count.
+
+`compare_read_views` starts uvicorn twice against the current database,
+once with ASYNC_READ_VIEWS off (every request runs a sync DRF view on a
+thread) and once with it on, and drives each with the `read` scenario at
+several client counts. Everything else is the same: the same workers, the
+same data and the same endpoints.
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .harness import run_load
+
+MODES = ('sync', 'async')
+
+
+def _wait_for_port(port, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'uvicorn exited with status {process.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'uvicorn did not start listening on port {port} within {timeout}s')
+
+
+@contextmanager
+def asgi_server(port, workers=1, async_views=True, startup_timeout=30):
+    """Run `uvicorn config.asgi:application` in a subprocess and yield its base URL."""
+    env = {**os.environ, 'ASYNC_READ_VIEWS': 'True' if async_views else 'False'}
+    process = subprocess.Popen(
+        [
+            sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+            '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers),
+            '--no-access-log', '--log-level', 'warning',
+        ],
+        cwd=settings.BASE_DIR, env=env,
+    )
+    try:
+        _wait_for_port(port, process, startup_timeout)
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def compare_read_views(targets, concurrency=(1, 10, 50, 100), workers=1, duration=10, warmup=2, port=8765):
+    """
+    Benchmark both modes at each client count. Returns a list of
+    {'mode', 'clients', 'workers', **total summary} rows.
+    """
+    rows = []
+    for mode in MODES:
+        with asgi_server(port, workers=workers, async_views=mode == 'async') as base_url:
+            for clients in concurrency:
+                report = run_load(
+                    base_url, clients=clients, duration=duration, warmup=warmup, mix={'read': 1}, targets=targets,
+                )
+                summary = {key: value for key, value in report['total'].items() if key != 'histogram'}
+                rows.append({'mode': mode, 'clients': clients, 'workers': workers, **summary})
+    return rows
+
+
+def format_comparison(rows):
+    """Render `compare_read_views` rows as a table with the async/sync throughput ratio."""
+    lines = [
+        f'{"clients":>7} {"mode":>5} {"req/s":>9} {"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8} {"max ms":>8} {"errors":>6}',
+    ]
+    by_key = {(row['mode'], row['clients']): row for row in rows}
+    for clients in sorted({row['clients'] for row in rows}):
+        for mode in MODES:
+            row = by_key.get((mode, clients))
+            if row is None:
+                continue
+            lines.append(
+                f"{clients:>7} {mode:>5} {row['throughput']:>9.1f} {row['p50_ms']:>8.1f} {row['p90_ms']:>8.1f} "
+                f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} {row['errors']:>6}"
+            )
+        sync, async_ = by_key.get(('sync', clients)), by_key.get(('async', clients))
+        if sync and async_ and sync['throughput']:
+            lines.append(f'{"":>7} {"":>5} {async_["throughput"] / sync["throughput"]:>8.2f}x async/sync throughput')
+    return '\n'.join(lines)
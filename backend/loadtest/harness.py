@@ -0,0 +1,352 @@
+"""
+Closed-loop HTTP load driver for the backend API.
+
+Each client thread keeps one keep-alive connection to the server under test
+and repeatedly runs a scenario picked from a weighted mix:
+
+- browse: anonymous project list page, project detail, stats and milestones,
+  then the backer's own pledges and votes
+- pledge: a backer pledges to an active project
+- vote: a backer votes on a milestone open for voting in a project they back
+- release: a creator releases funds for an approved milestone
+- read: only the endpoints with async views (project list and detail,
+  milestones, the backer's pledges); not in the default mix
+
+Targets are read from the database the server uses (seed it with
+`seed_load_data`), and clients authenticate with access tokens minted
+in-process, so password hashing does not dominate the run. Vote and release
+targets are consumed (a vote decides the milestone under the majority rule
+and a release can only happen once); once a pool is exhausted the scenario
+runs a browse instead and the report counts it as skipped.
+
+Latencies are recorded per endpoint (path with ids replaced by `{id}`).
+"""
+import http.client
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+
+from django.db.models import Count
+from rest_framework_simplejwt.tokens import AccessToken
+
+from finance.models import Pledge
+from projects.models import Milestone, Project
+from users.models import User
+
+DEFAULT_MIX = {'browse': 70, 'pledge': 15, 'vote': 10, 'release': 5}
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+PERCENTILES = (50, 90, 99)
+
+_ID_RE = re.compile(r'/\d+(?=/|$)')
+
+
+def parse_mix(value):
+    """Parse 'browse=70,pledge=15' into a weight dict."""
+    mix = {}
+    for part in filter(None, value.split(',')):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f'Unknown scenario {name!r}; choose from {", ".join(SCENARIOS)}')
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError('The scenario mix needs at least one positive weight')
+    return mix
+
+
+class LatencyStats:
+    """Latency samples and status codes for one endpoint."""
+
+    def __init__(self):
+        self.samples = []
+        self.statuses = defaultdict(int)
+
+    def add(self, elapsed_ms, status):
+        self.samples.append(elapsed_ms)
+        self.statuses[status] += 1
+
+    def merge(self, other):
+        self.samples.extend(other.samples)
+        for status, count in other.statuses.items():
+            self.statuses[status] += count
+
+    @property
+    def errors(self):
+        return sum(count for status, count in self.statuses.items() if not 200 <= status < 400)
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        # Nearest-rank
+        index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def histogram(self):
+        """Return [(upper bound ms or None, count)] over BUCKETS_MS."""
+        counts = [0] * (len(BUCKETS_MS) + 1)
+        for sample in self.samples:
+            for index, bound in enumerate(BUCKETS_MS):
+                if sample <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return list(zip(BUCKETS_MS + (None,), counts))
+
+    def summary(self, elapsed):
+        return {
+            'requests': len(self.samples),
+            'errors': self.errors,
+            'statuses': dict(sorted(self.statuses.items())),
+            'throughput': len(self.samples) / elapsed if elapsed else 0.0,
+            'mean_ms': sum(self.samples) / len(self.samples) if self.samples else 0.0,
+            **{f'p{pct}_ms': self.percentile(pct) for pct in PERCENTILES},
+            'max_ms': max(self.samples, default=0.0),
+            'histogram': [
+                {'le_ms': bound, 'count': count} for bound, count in self.histogram()
+            ],
+        }
+
+
+class Targets:
+    """Ids the scenarios act on, loaded once from the database."""
+
+    def __init__(self, max_users=200):
+        self.project_ids = list(Project.objects.filter(status__in=['active', 'funded']).values_list('pk', flat=True))
+        self.active_project_ids = list(Project.objects.filter(status='active').values_list('pk', flat=True))
+        self.backer_ids = list(
+            User.objects.filter(is_creator=False, pledges__status='active')
+            .annotate(pledge_count=Count('pledges')).order_by('-pledge_count')
+            .values_list('pk', flat=True)[:max_users]
+        )
+        if not self.project_ids or not self.backer_ids:
+            raise ValueError('No projects with backers to load test against; run seed_load_data first')
+
+        # One (milestone, backer) per voting milestone: the first vote decides it
+        votes = deque()
+        seen = set()
+        pledges = Pledge.objects.filter(
+            status='active', project__milestones__status='voting',
+        ).values_list('project__milestones', 'backer_id')
+        for milestone_id, backer_id in pledges:
+            if milestone_id not in seen:
+                seen.add(milestone_id)
+                votes.append((milestone_id, backer_id))
+        self.votes = votes
+        self.releases = deque(
+            Milestone.objects.filter(status='approved', releases__isnull=True)
+            .values_list('pk', 'project__creator__user_id')
+        )
+        self._lock = threading.Lock()
+        self._tokens = {}
+
+    def pop(self, pool):
+        with self._lock:
+            return pool.popleft() if pool else None
+
+    def token(self, user_id):
+        with self._lock:
+            if user_id not in self._tokens:
+                self._tokens[user_id] = str(AccessToken.for_user(User(pk=user_id)))
+            return self._tokens[user_id]
+
+
+class Client:
+    """One keep-alive HTTP connection that records every request it makes."""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self._connect = lambda: connection_class(parts.hostname, parts.port, timeout=timeout)
+        self.prefix = parts.path.rstrip('/')
+        self.connection = self._connect()
+        self.stats = defaultdict(LatencyStats)
+        self.recording = True
+
+    def request(self, method, path, token=None, body=None):
+        """Send a request and return (status, parsed JSON body or None); status 0 is a transport error."""
+        headers = {'Accept': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            content = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = self._connect()
+            content, status = b'', 0
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if self.recording:
+            self.stats[f'{method} {_ID_RE.sub("/{id}", path.split("?")[0])}'].add(elapsed_ms, status)
+        try:
+            return status, json.loads(content) if content else None
+        except ValueError:
+            return status, None
+
+    def close(self):
+        self.connection.close()
+
+
+def browse(client, targets, rng):
+    project_id = rng.choice(targets.project_ids)
+    page = rng.randint(1, max(1, len(targets.project_ids) // 20))
+    client.request('GET', f'/api/projects/?page={page}')
+    client.request('GET', f'/api/projects/{project_id}/')
+    client.request('GET', f'/api/projects/{project_id}/stats/')
+    client.request('GET', f'/api/projects/milestones/?project={project_id}')
+    token = targets.token(rng.choice(targets.backer_ids))
+    client.request('GET', '/api/finance/pledges/', token=token)
+    client.request('GET', '/api/governance/votes/', token=token)
+    return True
+
+
+def read(client, targets, rng):
+    project_id = rng.choice(targets.project_ids)
+    page = rng.randint(1, max(1, len(targets.project_ids) // 20))
+    client.request('GET', f'/api/projects/?page={page}')
+    client.request('GET', f'/api/projects/{project_id}/')
+    client.request('GET', f'/api/projects/milestones/?project={project_id}')
+    client.request('GET', '/api/finance/pledges/', token=targets.token(rng.choice(targets.backer_ids)))
+    return True
+
+
+def pledge(client, targets, rng):
+    if not targets.active_project_ids:
+        return False
+    client.request(
+        'POST', '/api/finance/pledges/', token=targets.token(rng.choice(targets.backer_ids)),
+        body={'project': rng.choice(targets.active_project_ids), 'amount': f'{rng.uniform(10, 500):.2f}'},
+    )
+    return True
+
+
+def vote(client, targets, rng):
+    target = targets.pop(targets.votes)
+    if target is None:
+        return False
+    milestone_id, backer_id = target
+    client.request(
+        'POST', '/api/governance/votes/', token=targets.token(backer_id),
+        body={'milestone': milestone_id, 'decision': 'approve' if rng.random() > 0.1 else 'reject'},
+    )
+    return True
+
+
+def release(client, targets, rng):
+    target = targets.pop(targets.releases)
+    if target is None:
+        return False
+    milestone_id, creator_user_id = target
+    client.request('POST', f'/api/finance/releases/milestone/{milestone_id}/', token=targets.token(creator_user_id))
+    return True
+
+
+SCENARIOS = {'browse': browse, 'pledge': pledge, 'vote': vote, 'release': release, 'read': read}
+
+
+def run_load(base_url, clients=10, duration=30, warmup=0, mix=None, think_time=0, seed=0, targets=None):
+    """
+    Drive `clients` concurrent clients for `duration` seconds and return a report dict.
+
+    Requests made during the first `warmup` seconds are sent but not recorded.
+    `think_time` is a pause in seconds between scenarios.
+    """
+    mix = mix or DEFAULT_MIX
+    targets = targets or Targets()
+    names = [name for name in mix if mix[name] > 0]
+    weights = [mix[name] for name in names]
+    scenario_counts = defaultdict(int)
+    counts_lock = threading.Lock()
+    started = time.monotonic()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+    workers = []
+
+    def work(index):
+        rng = random.Random(seed * 1000 + index)
+        client = Client(base_url)
+        workers[index] = client
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                client.recording = now >= measure_from
+                name = rng.choices(names, weights)[0]
+                ran = SCENARIOS[name](client, targets, rng)
+                if not ran:
+                    browse(client, targets, rng)
+                if client.recording:
+                    with counts_lock:
+                        scenario_counts[name if ran else f'{name} (skipped)'] += 1
+                if think_time:
+                    time.sleep(think_time)
+        finally:
+            client.close()
+
+    workers.extend([None] * clients)
+    threads = [threading.Thread(target=work, args=(index,), daemon=True) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - measure_from
+
+    endpoints = defaultdict(LatencyStats)
+    total = LatencyStats()
+    for client in workers:
+        for label, stats in client.stats.items():
+            endpoints[label].merge(stats)
+            total.merge(stats)
+    return {
+        'base_url': base_url,
+        'clients': clients,
+        'duration': round(elapsed, 3),
+        'mix': mix,
+        'scenarios': dict(sorted(scenario_counts.items())),
+        'total': total.summary(elapsed),
+        'endpoints': {label: endpoints[label].summary(elapsed) for label in sorted(endpoints)},
+    }
+
+
+def format_report(report, bar_width=40):
+    """Render a run report as a plain-text table plus per-endpoint histograms."""
+    lines = [
+        f"{report['clients']} clients for {report['duration']:.1f}s against {report['base_url']}",
+        'Scenarios: ' + ', '.join(f'{name} {count}' for name, count in report['scenarios'].items()),
+        '',
+        f'{"endpoint":<48} {"reqs":>7} {"errors":>6} {"req/s":>8} '
+        + ' '.join(f'{f"p{pct} ms":>8}' for pct in PERCENTILES) + f' {"max ms":>8}',
+    ]
+    rows = list(report['endpoints'].items()) + [('TOTAL', report['total'])]
+    for label, summary in rows:
+        lines.append(
+            f"{label:<48} {summary['requests']:>7} {summary['errors']:>6} {summary['throughput']:>8.1f} "
+            + ' '.join(f"{summary[f'p{pct}_ms']:>8.1f}" for pct in PERCENTILES)
+            + f" {summary['max_ms']:>8.1f}"
+        )
+    for label, summary in report['endpoints'].items():
+        lines.extend(['', f'{label}  (statuses: {summary["statuses"]})'])
+        peak = max((bucket['count'] for bucket in summary['histogram']), default=0) or 1
+        for bucket in summary['histogram']:
+            bound = f"<= {bucket['le_ms']} ms" if bucket['le_ms'] is not None else f'> {BUCKETS_MS[-1]} ms'
+            bar = '#' * round(bucket['count'] / peak * bar_width)
+            lines.append(f'  {bound:>12} {bucket["count"]:>7} {bar}')
+    return '\n'.join(lines)
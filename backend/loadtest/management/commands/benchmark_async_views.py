@@ -0,0 +1,51 @@
+"""
+Compare the sync and async read views under uvicorn at a fixed worker count.
+"""
+import importlib.util
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from loadtest.asgi_bench import compare_read_views, format_comparison
+from loadtest.harness import Targets
+
+
+class Command(BaseCommand):
+    help = 'Serve the API with uvicorn with and without async read views and compare latency and throughput.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='uvicorn worker processes in both runs (default: 1).')
+        parser.add_argument(
+            '--concurrency', default='1,10,50,100',
+            help='Comma-separated concurrent client counts to measure (default: %(default)s).',
+        )
+        parser.add_argument('--duration', type=float, default=10, help='Measured seconds per level (default: 10).')
+        parser.add_argument('--warmup', type=float, default=2, help='Unmeasured seconds per level (default: 2).')
+        parser.add_argument('--port', type=int, default=8765, help='Port for the servers (default: 8765).')
+        parser.add_argument('--json', dest='json_path', help='Also write the rows as JSON to this file.')
+
+    def handle(self, *args, **options):
+        if importlib.util.find_spec('uvicorn') is None:
+            raise CommandError('This benchmark needs uvicorn (pip install -r requirements.txt)')
+        try:
+            concurrency = [int(value) for value in options['concurrency'].split(',') if value.strip()]
+            targets = Targets(max_users=max(50, max(concurrency) * 5))
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        try:
+            rows = compare_read_views(
+                targets,
+                concurrency=concurrency,
+                workers=options['workers'],
+                duration=options['duration'],
+                warmup=options['warmup'],
+                port=options['port'],
+            )
+        except RuntimeError as exc:
+            raise CommandError(exc)
+        self.stdout.write(f"{options['workers']} uvicorn worker(s), read scenario\n")
+        self.stdout.write(format_comparison(rows))
+        if options['json_path']:
+            with open(options['json_path'], 'w') as out:
+                json.dump(rows, out, indent=2)
@@ -0,0 +1,39 @@
+"""
+Compare model serializers with the row serializers and fast JSON renderer on large lists.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from loadtest.serializer_bench import CASES, compare_serializers, format_comparison
+
+
+class Command(BaseCommand):
+    help = 'Time serializing and rendering project and pledge lists with DRF serializers and with RowSerializer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', default='100,1000,10000',
+            help='Comma-separated list sizes to measure (default: %(default)s).',
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement; the best is kept (default: 5).')
+        parser.add_argument(
+            '--case', action='append', choices=sorted(CASES),
+            help='Only measure this list (repeatable; default: all).',
+        )
+        parser.add_argument('--json', dest='json_path', help='Also write the rows as JSON to this file.')
+
+    def handle(self, *args, **options):
+        try:
+            row_counts = [int(value) for value in options['rows'].split(',') if value.strip()]
+        except ValueError as exc:
+            raise CommandError(exc)
+        results = compare_serializers(
+            row_counts, repeat=max(1, options['repeat']), cases=tuple(options['case'] or CASES),
+        )
+        self.stdout.write(format_comparison(results))
+        if not all(row['identical'] for row in results):
+            raise CommandError('The row serializers rendered different bytes; see the identical column')
+        if options['json_path']:
+            with open(options['json_path'], 'w') as out:
+                json.dump(results, out, indent=2)
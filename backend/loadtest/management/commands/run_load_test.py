@@ -0,0 +1,59 @@
+"""
+Drive a mixed read/write workload against a running server and report latencies.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from loadtest.harness import DEFAULT_MIX, format_report, parse_mix, run_load, Targets
+
+
+class Command(BaseCommand):
+    help = 'Run concurrent browse/pledge/vote/release clients against a server and print latency histograms.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url', default='http://127.0.0.1:8000',
+            help='Server under test; it must use the same database as this command (default: %(default)s).',
+        )
+        parser.add_argument('--clients', type=int, default=10, help='Concurrent clients (default: 10).')
+        parser.add_argument('--duration', type=float, default=30, help='Measured seconds (default: 30).')
+        parser.add_argument('--warmup', type=float, default=5, help='Unmeasured seconds before that (default: 5).')
+        parser.add_argument(
+            '--mix', default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+            help='Scenario weights (default: %(default)s).',
+        )
+        parser.add_argument(
+            '--think-time', type=float, default=0,
+            help='Seconds each client pauses between scenarios (default: 0, closed loop).',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for scenario choice (default: 0).')
+        parser.add_argument('--json', dest='json_path', help='Also write the full report as JSON to this file.')
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+            targets = Targets(max_users=max(50, options['clients'] * 5))
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        self.stdout.write(
+            f"Targets: {len(targets.project_ids)} projects, {len(targets.backer_ids)} backers, "
+            f"{len(targets.votes)} open votes, {len(targets.releases)} pending releases"
+        )
+        report = run_load(
+            options['base_url'],
+            clients=options['clients'],
+            duration=options['duration'],
+            warmup=options['warmup'],
+            mix=mix,
+            think_time=options['think_time'],
+            seed=options['seed'],
+            targets=targets,
+        )
+        self.stdout.write(format_report(report))
+        if options['json_path']:
+            with open(options['json_path'], 'w') as out:
+                json.dump(report, out, indent=2)
+        if not report['total']['requests']:
+            raise CommandError('No requests completed; is the server running at --base-url?')
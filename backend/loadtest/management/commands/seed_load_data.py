@@ -0,0 +1,32 @@
+"""
+Seed the database with a realistic marketplace for load testing.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from users.models import User
+from loadtest.seed import PASSWORD, seed_load_data
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create creators, backers, projects, pledges, milestones and votes for load tests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=int, default=1,
+            help='Multiplier on the base volume of 50 creators, 500 backers and 200 projects (default: 1).',
+        )
+        parser.add_argument(
+            '--prefix', default='load',
+            help='Username prefix for the seeded users; use a new one to seed the same database again.',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42).')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Users prefixed {prefix!r} already exist; pass another --prefix or use a fresh database.')
+        counts = seed_load_data(scale=options['scale'], prefix=prefix, seed=options['seed'])
+        self.stdout.write(self.style.SUCCESS(
+            'Seeded ' + ', '.join(f'{count} {name}' for name, count in counts.items())
+            + f'. Users log in as {prefix}-backer-N / {prefix}-creator-N with password {PASSWORD!r}.'
+        ))
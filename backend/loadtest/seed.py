@@ -0,0 +1,167 @@
+"""
+Seed the backend database for load tests.
+
+Volumes and distributions follow `ds_pipeline/data_generator.py` (50
+creators, 500 backers and 200 projects per unit of scale; log-normal
+goals; Poisson(5) pledges per project of 1-50% of the goal each; 3-5
+milestones per pledged project; 90% approval votes) so load tests and the
+data-science pipeline see the same shape of marketplace. Everything is
+bulk-inserted, then the denormalized counters, vote tallies and search
+index are rebuilt in one pass each.
+
+Milestone states are chosen so every write scenario has targets: funded
+projects have their first milestone approved and awaiting release and the
+second open for voting, and active projects with pledges have their first
+milestone open for voting.
+"""
+import math
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from finance.models import Pledge
+from governance.models import Vote
+from projects.cache import bump_list_generation
+from projects.models import Milestone, Project
+from projects.search import rebuild_index
+from projects.trending import rebuild_scores
+from users.models import Creator, User
+
+NUM_CREATORS = 50
+NUM_BACKERS = 500
+NUM_PROJECTS = 200
+AVG_PLEDGES_PER_PROJECT = 5
+PASSWORD = 'loadtest'
+
+TITLE_WORDS = (
+    'Open', 'Solar', 'Modular', 'Smart', 'Urban', 'Portable', 'Quiet', 'Adaptive',
+    'Garden', 'Drone', 'Keyboard', 'Board game', 'Camera', 'Bike', 'Speaker', 'Lamp',
+)
+
+
+def _poisson(rng, lam):
+    # Knuth's method; fine for the small means used here
+    limit, count, product = math.exp(-lam), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+def _money(value):
+    return Decimal(value).quantize(Decimal('0.01'))
+
+
+@transaction.atomic
+def seed_load_data(scale=1, prefix='load', seed=42):
+    """
+    Bulk-create a marketplace of `scale` units and return row counts.
+
+    Usernames are `<prefix>-creator-N` / `<prefix>-backer-N`, all with
+    the password PASSWORD.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password(PASSWORD)
+
+    creator_users = User.objects.bulk_create([
+        User(username=f'{prefix}-creator-{i}', email=f'{prefix}-creator-{i}@example.com',
+             password=password, is_creator=True)
+        for i in range(NUM_CREATORS * scale)
+    ])
+    backers = User.objects.bulk_create([
+        User(username=f'{prefix}-backer-{i}', email=f'{prefix}-backer-{i}@example.com', password=password)
+        for i in range(NUM_BACKERS * scale)
+    ])
+    creators = Creator.objects.bulk_create([
+        Creator(user=user, display_name=f'Studio {user.username}') for user in creator_users
+    ])
+
+    projects = []
+    for i in range(NUM_PROJECTS * scale):
+        created_at = now - timedelta(days=rng.uniform(0, 365))
+        projects.append(Project(
+            creator=rng.choice(creators),
+            title=f'{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_WORDS).lower()} project {i}',
+            description=f'Load test campaign {i}. ' * 10,
+            goal_amount=_money(rng.lognormvariate(10, 1)),
+            status='active',
+            start_date=created_at,
+            end_date=created_at + timedelta(days=rng.randint(30, 90)),
+        ))
+    projects = Project.objects.bulk_create(projects)
+
+    pledges = []
+    for project in projects:
+        count = min(_poisson(rng, AVG_PLEDGES_PER_PROJECT), len(backers))
+        for backer in rng.sample(backers, k=count):
+            amount = _money(float(project.goal_amount) * rng.uniform(0.01, 0.5))
+            pledges.append(Pledge(project=project, backer=backer, amount=amount))
+    pledges = Pledge.objects.bulk_create(pledges)
+
+    # {project_id: {backer_id: pledged amount}}
+    pledged = {project.pk: {} for project in projects}
+    for pledge in pledges:
+        pledged[pledge.project_id][pledge.backer_id] = pledge.amount
+    funding = {project_id: sum(amounts.values(), Decimal(0)) for project_id, amounts in pledged.items()}
+
+    for project in projects:
+        if funding[project.pk] >= project.goal_amount:
+            project.status = 'funded'
+        elif project.end_date < now:
+            project.status = 'failed'
+    Project.objects.bulk_update(projects, ['status'])
+
+    milestones = []
+    for project in projects:
+        if not funding[project.pk]:
+            continue
+        count = rng.randint(3, 5)
+        for index in range(1, count + 1):
+            if project.status == 'funded':
+                status = {1: 'approved', 2: 'voting'}.get(index, 'pending')
+            elif project.status == 'active':
+                status = 'voting' if index == 1 else 'pending'
+            else:
+                status = 'pending'
+            milestones.append(Milestone(
+                project=project,
+                title=f'Milestone {index}',
+                description=f'Deliverables for stage {index} of {project.title}',
+                target_amount=_money(funding[project.pk] / count),
+                order_index=index,
+                status=status,
+                due_date=project.end_date + timedelta(days=index * 30),
+            ))
+    milestones = Milestone.objects.bulk_create(milestones)
+
+    # Approved milestones carry the votes that approved them
+    votes = Vote.objects.bulk_create([
+        Vote(
+            milestone=milestone,
+            backer_id=backer_id,
+            decision='approve' if rng.random() > 0.1 else 'reject',
+            weight=amount,
+        )
+        for milestone in milestones if milestone.status == 'approved'
+        for backer_id, amount in pledged[milestone.project_id].items()
+    ])
+
+    Project.rebuild_funding_counters([project.pk for project in projects])
+    Milestone.rebuild_vote_tallies([milestone.pk for milestone in milestones])
+    rebuild_scores()
+    transaction.on_commit(rebuild_index)
+    transaction.on_commit(bump_list_generation)
+
+    return {
+        'creators': len(creators),
+        'backers': len(backers),
+        'projects': len(projects),
+        'pledges': len(pledges),
+        'milestones': len(milestones),
+        'votes': len(votes),
+    }
@@ -0,0 +1,95 @@
+"""
+Model serializers with JSONRenderer vs RowSerializer with FastJSONRenderer.
+
+`compare_serializers` renders the newest N projects (ProjectListSerializer)
+and pledges (PledgeSerializer, with nested projects) both ways at each N,
+against the current database, and checks that the bytes match. Each path
+is timed in two stages: query plus serialization, then rendering. The best
+of `repeat` runs is kept.
+
+Seed enough rows first: `seed_load_data --scale 50` gives 10,000 projects
+and about 50,000 pledges.
+"""
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from config.renderers import FastJSONRenderer
+from config.row_serializers import RowSerializer
+from finance.models import Pledge
+from finance.serializers import PledgeSerializer
+from finance.views import pledge_project_prefetch
+from projects.models import Project
+from projects.serializers import ProjectListSerializer
+
+CASES = {
+    'projects': (ProjectListSerializer, lambda: ProjectListSerializer.prepare_queryset(Project.objects.all())),
+    'pledges': (PledgeSerializer, lambda: Pledge.objects.select_related('backer').prefetch_related(pledge_project_prefetch())),
+}
+
+
+def _serializer_path(serializer_class, queryset):
+    data = serializer_class(queryset, many=True).data
+    return data, JSONRenderer()
+
+
+def _row_path(serializer_class, queryset):
+    rows = RowSerializer(serializer_class())
+    return rows.to_representation(rows.values(queryset)), FastJSONRenderer()
+
+
+PATHS = {'serializer': _serializer_path, 'rows': _row_path}
+
+
+def _run(path, serializer_class, queryset):
+    started = time.perf_counter()
+    data, renderer = path(serializer_class, queryset)
+    serialized = time.perf_counter()
+    content = renderer.render(data)
+    finished = time.perf_counter()
+    return content, (serialized - started) * 1000, (finished - serialized) * 1000
+
+
+def compare_serializers(row_counts=(100, 1000, 10000), repeat=5, cases=tuple(CASES)):
+    """
+    Time both paths for each case and row count. Returns a list of
+    {'case', 'rows', 'path', 'serialize_ms', 'render_ms', 'total_ms', 'identical'} rows.
+    """
+    results = []
+    for case in cases:
+        serializer_class, make_queryset = CASES[case]
+        available = make_queryset().count()
+        for count in row_counts:
+            count = min(count, available)
+            contents = {}
+            for name, path in PATHS.items():
+                best = None
+                for _ in range(repeat):
+                    content, serialize_ms, render_ms = _run(path, serializer_class, make_queryset()[:count])
+                    if best is None or serialize_ms + render_ms < best[0] + best[1]:
+                        best = (serialize_ms, render_ms)
+                contents[name] = content
+                results.append({
+                    'case': case, 'rows': count, 'path': name, 'serialize_ms': best[0], 'render_ms': best[1],
+                    'total_ms': best[0] + best[1],
+                })
+            for row in results[-len(PATHS):]:
+                row['identical'] = contents['rows'] == contents['serializer']
+    return results
+
+
+def format_comparison(results):
+    """Render `compare_serializers` rows as a table with the speedup of the row path."""
+    lines = [
+        f'{"case":>8} {"rows":>6} {"path":>10} {"serialize ms":>12} {"render ms":>10} {"total ms":>9} {"identical":>9}',
+    ]
+    by_key = {(row['case'], row['rows'], row['path']): row for row in results}
+    for row in results:
+        lines.append(
+            f"{row['case']:>8} {row['rows']:>6} {row['path']:>10} {row['serialize_ms']:>12.1f} "
+            f"{row['render_ms']:>10.1f} {row['total_ms']:>9.1f} {str(row['identical']):>9}"
+        )
+        baseline = by_key.get((row['case'], row['rows'], 'serializer'))
+        if row['path'] == 'rows' and baseline and row['total_ms']:
+            lines.append(f'{"":>8} {"":>6} {"":>10} {baseline["total_ms"] / row["total_ms"]:>11.2f}x faster')
+    return '\n'.join(lines)
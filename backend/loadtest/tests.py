@@ -0,0 +1,56 @@
+"""
+Tests for the load-test seeder and harness.
+"""
+from django.test import LiveServerTestCase, TestCase, override_settings
+
+from finance.models import Pledge
+from governance.audit import flush_audit_log
+from loadtest.harness import LatencyStats, Targets, parse_mix, run_load
+from loadtest.seed import NUM_PROJECTS, seed_load_data
+from projects.models import Milestone, Project
+
+
+class SeedLoadDataTests(TestCase):
+
+    def test_seeded_marketplace_has_targets_for_every_scenario(self):
+        counts = seed_load_data(scale=1, prefix='t')
+        self.assertEqual(counts['projects'], NUM_PROJECTS)
+        self.assertTrue(Project.objects.filter(status='active').exists())
+        self.assertTrue(Milestone.objects.filter(status='voting').exists())
+        self.assertTrue(Milestone.objects.filter(status='approved').exists())
+        # Funding counters are rebuilt from the bulk-inserted pledges
+        project = Pledge.objects.first().project
+        self.assertEqual(project.active_pledge_count, project.pledges.count())
+
+
+class LatencyStatsTests(TestCase):
+
+    def test_percentiles_and_histogram(self):
+        stats = LatencyStats()
+        for elapsed in range(1, 101):
+            stats.add(float(elapsed), 200)
+        stats.add(9000.0, 500)
+        self.assertEqual(stats.percentile(50), 51.0)
+        self.assertEqual(stats.errors, 1)
+        histogram = dict(stats.histogram())
+        self.assertEqual(histogram[10], 5)
+        self.assertEqual(histogram[None], 1)
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix('browse=3,vote=1'), {'browse': 3.0, 'vote': 1.0})
+        with self.assertRaises(ValueError):
+            parse_mix('browse=1,teleport=2')
+
+
+@override_settings(PROJECTS_RESPONSE_CACHE={'ENABLED': False}, AUDIT_LOG_FLUSH_INTERVAL=0)
+class RunLoadTests(LiveServerTestCase):
+
+    def test_short_run_reports_every_endpoint(self):
+        seed_load_data(scale=1, prefix='live')
+        # One client: the live server shares a single SQLite connection
+        report = run_load(self.live_server_url, clients=1, duration=1.5, warmup=0, targets=Targets())
+        self.assertGreater(report['total']['requests'], 0)
+        self.assertEqual(report['total']['errors'], 0, report['endpoints'])
+        self.assertIn('GET /api/projects/{id}/', report['endpoints'])
+        # Write scenarios were audited; write their entries before the test database goes away
+        self.assertGreater(flush_audit_log(), 0)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Project, Milestone, Update
+from .models import Project, Milestone, Update, TrendingScore
 
 
 @admin.register(Project)
@@ -7,7 +7,10 @@ class ProjectAdmin(admin.ModelAdmin):
     list_display = ('title', 'creator', 'status', 'goal_amount', 'total_pledged', 'created_at')
     list_filter = ('status', 'created_at')
     search_fields = ('title', 'description', 'creator__display_name')
-    readonly_fields = ('total_pledged', 'progress_percentage', 'created_at', 'updated_at')
+    readonly_fields = (
+        'total_pledged', 'active_pledge_count', 'backers_count',
+        'progress_percentage', 'created_at', 'updated_at',
+    )
 
 
 @admin.register(Milestone)
@@ -24,3 +27,8 @@ class UpdateAdmin(admin.ModelAdmin):
     search_fields = ('title', 'project__title', 'content')
 
 
+@admin.register(TrendingScore)
+class TrendingScoreAdmin(admin.ModelAdmin):
+    list_display = ('project', 'score', 'pledge_velocity', 'backer_growth', 'funding_ratio', 'decayed_at')
+    search_fields = ('project__title',)
+    readonly_fields = ('project', 'score', 'pledge_velocity', 'backer_growth', 'funding_ratio', 'decayed_at')
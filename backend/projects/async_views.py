@@ -0,0 +1,98 @@
+"""
+Async versions of the hot project read endpoints (see config.async_views).
+
+They mirror ProjectViewSet.list/retrieve and MilestoneViewSet.list, including
+the conditional GET, response cache and replica pinning behaviour.
+"""
+from django.utils.cache import get_conditional_response
+from rest_framework import status
+from rest_framework.response import Response
+
+from config.async_views import AsyncReadView
+from config.db_router import primary_if_changed_since
+from .cache import aget_list_generation, aget_project_version, project_validators
+from .response_cache import get_response_cache
+from .views import MilestoneViewSet, ProjectViewSet
+
+
+async def aconditional_project_response(request, project_id, build_response):
+    """Async version of views.conditional_project_response; `build_response` is a coroutine function."""
+    try:
+        project_id = int(project_id)
+    except (TypeError, ValueError):
+        return await build_response(None)
+
+    version = await aget_project_version(project_id)
+    if version is None:
+        return await build_response(None)
+    etag, last_modified = project_validators(version, request)
+    conditional = get_conditional_response(request, etag=etag, last_modified=version['modified'])
+    if conditional is not None and conditional.status_code == status.HTTP_304_NOT_MODIFIED:
+        return Response(
+            status=status.HTTP_304_NOT_MODIFIED,
+            headers={'ETag': etag, 'Last-Modified': last_modified}
+        )
+
+    with primary_if_changed_since(version['modified']):
+        response = await build_response(version)
+    if response.status_code == status.HTTP_200_OK:
+        response['ETag'], response['Last-Modified'] = project_validators(version, request)
+    return response
+
+
+async def acached_anonymous_response(request, generation, build_response):
+    """Async version of views.cached_anonymous_response; `build_response` is a coroutine function."""
+    response_cache = get_response_cache()
+    if response_cache is None or request.user.is_authenticated:
+        return await build_response()
+
+    built = {}
+
+    async def build():
+        response = built['response'] = await build_response()
+        return response.data if response.status_code == status.HTTP_200_OK else None
+
+    data, state = await response_cache.afetch(response_cache.make_key(request, generation), build)
+    response = built.get('response')
+    if response is None:
+        return Response(data, headers={'X-Cache': state})
+    if response.status_code == status.HTTP_200_OK:
+        response['X-Cache'] = state
+    return response
+
+
+class ProjectListView(AsyncReadView):
+    """GET /api/projects/"""
+    viewset = ProjectViewSet
+    actions = {'get': 'list', 'post': 'create'}
+
+    async def get(self, request):
+        generation = await aget_list_generation()
+        with primary_if_changed_since(generation / 1e9):
+            return await acached_anonymous_response(request, f'list:{generation}', self.list)
+
+
+class ProjectDetailView(AsyncReadView):
+    """GET /api/projects/<pk>/"""
+    viewset = ProjectViewSet
+    actions = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+
+    async def get(self, request, pk):
+        async def build_response(version):
+            if version is None:
+                return await self.retrieve()
+            return await acached_anonymous_response(request, f'project:{pk}:{version["version"]}', self.retrieve)
+
+        return await aconditional_project_response(request, pk, build_response)
+
+
+class MilestoneListView(AsyncReadView):
+    """GET /api/projects/milestones/"""
+    viewset = MilestoneViewSet
+    actions = {'get': 'list', 'post': 'create'}
+
+    async def get(self, request):
+        project_id = request.query_params.get('project', '')
+        if not project_id.isdigit():
+            return await self.list()
+        return await aconditional_project_response(request, project_id, lambda version: self.list())
@@ -0,0 +1,143 @@
+"""
+Cache helpers for project read endpoints.
+
+A project's version lives in its `version` column, so every worker agrees
+on it. The receivers in `projects.signals` move it on whenever something
+that feeds a project read changes, and per-project cache entries are keyed
+by it, so a bump orphans them everywhere at once.
+"""
+import hashlib
+import math
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, models
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.http import http_date, quote_etag
+
+from .models import Project
+
+STATS_KEY = 'projects:stats:{project_id}:{version}'
+LIST_GENERATION_KEY = 'projects:list-generation'
+NS = 10 ** 9
+
+
+def stats_cache_key(project_id, version):
+    return STATS_KEY.format(project_id=project_id, version=version['version'])
+
+
+def get_project_stats(project_id, version):
+    """Return the cached stats payload for a project at `version`, or None."""
+    return cache.get(stats_cache_key(project_id, version))
+
+
+def set_project_stats(project_id, version, stats):
+    cache.set(stats_cache_key(project_id, version), stats, settings.PROJECT_STATS_CACHE_TIMEOUT)
+
+
+def _days_remaining(end_date, now):
+    """ProjectSerializer's days_remaining, and the moment it last changed (None if never)."""
+    if not end_date:
+        return 0, None
+    if end_date < now:
+        return 0, end_date - timedelta(days=1)
+    days = (end_date - now).days
+    return days, end_date - timedelta(days=days + 1)
+
+
+def _project_version(row):
+    if row is None:
+        return None
+    version, end_date = row
+    modified = version // NS
+    # days_remaining moves with the clock, not with writes, so it is part of the version
+    days_remaining, ticked_at = _days_remaining(end_date, timezone.now())
+    if ticked_at is not None:
+        modified = max(modified, math.ceil(ticked_at.timestamp()))
+    return {'version': f'{version}.{days_remaining}', 'modified': modified}
+
+
+def _version_row(project_id):
+    # Always the primary: a lagging replica would hand out the version from before a write
+    return Project.objects.using(DEFAULT_DB_ALIAS).filter(pk=project_id).values_list('version', 'end_date').order_by()
+
+
+def get_project_version(project_id):
+    """
+    Return the project's version as {'version': str, 'modified': epoch seconds}, or None if it does not exist.
+
+    The version changes whenever the project, its creator, milestones,
+    pledges, updates or votes change, and when its days_remaining ticks down.
+    """
+    return _project_version(_version_row(project_id).first())
+
+
+async def aget_project_version(project_id):
+    """Async version of get_project_version."""
+    return _project_version(await _version_row(project_id).afirst())
+
+
+def bump_project_versions(projects):
+    """Move every project in the `projects` queryset on to a new version."""
+    # Clock-based so a version never repeats. Last-Modified has one-second
+    # resolution, so a second change within the same second still has to
+    # move it forward a whole second.
+    following = (F('version') / NS + 1) * NS
+    projects.update(version=Greatest(
+        Value(time.time_ns()), following, output_field=models.BigIntegerField()
+    ))
+
+
+def get_list_generation():
+    """
+    Return the generation shared by every project list response.
+
+    Changes to what list entries show (a project's own fields, its creator's
+    name, its milestone count) move this on, since the project may appear in
+    any list page or filter. Pledge totals in cached lists are left to expire
+    with the response cache TIMEOUT, so pledges and votes do not retire every
+    list at once.
+    """
+    generation = cache.get(LIST_GENERATION_KEY)
+    if generation is None:
+        generation = time.time_ns()
+        if not cache.add(LIST_GENERATION_KEY, generation, None):
+            generation = cache.get(LIST_GENERATION_KEY) or generation
+    return generation
+
+
+async def aget_list_generation():
+    """Async version of get_list_generation."""
+    generation = await cache.aget(LIST_GENERATION_KEY)
+    if generation is None:
+        generation = time.time_ns()
+        if not await cache.aadd(LIST_GENERATION_KEY, generation, None):
+            generation = await cache.aget(LIST_GENERATION_KEY) or generation
+    return generation
+
+
+def bump_list_generation():
+    cache.set(LIST_GENERATION_KEY, time.time_ns(), None)
+
+
+def project_validators(version, request):
+    """
+    Build (ETag, Last-Modified) header values for a project read.
+
+    The ETag is strong: it covers the project version, the full path with
+    query string (so ?fields= variants differ) and the negotiated media type.
+    """
+    variant = f"{request.get_full_path()}|{getattr(request, 'accepted_media_type', '')}"
+    digest = hashlib.sha1(variant.encode()).hexdigest()[:16]
+    return quote_etag(f"{version['version']}-{digest}"), http_date(version['modified'])
+
+
+def invalidate_project(project_id, lists=True):
+    """Move a project to a new version, dropping every cached read of it, and of every list unless `lists` is off."""
+    bump_project_versions(Project.objects.filter(pk=project_id))
+    if lists:
+        bump_list_generation()
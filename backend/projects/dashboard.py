@@ -0,0 +1,89 @@
+"""
+Creator dashboard: funding and milestone figures for all of a creator's projects.
+
+`creator_dashboard` runs four queries however many projects the creator
+has: the projects with their stored funding counters, milestone counts and
+target amounts grouped by project and status, releases grouped by
+project, and the creator's distinct active backers.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+
+from .models import Milestone, Project
+
+ZERO = Decimal('0.00')
+MILESTONE_STATES = tuple(status for status, _ in Milestone.STATUS_CHOICES)
+PROJECT_STATES = tuple(status for status, _ in Project.STATUS_CHOICES)
+
+
+def _milestone_histograms(creator):
+    """Per-project milestone counts by status, and approved milestones' target amounts awaiting release."""
+    counts = defaultdict(lambda: dict.fromkeys(MILESTONE_STATES, 0))
+    pending_release = defaultdict(lambda: ZERO)
+    for row in Milestone.objects.filter(project__creator=creator).order_by().values('project_id', 'status').annotate(
+        count=Count('id'), target=Sum('target_amount'),
+    ):
+        counts[row['project_id']][row['status']] = row['count']
+        if row['status'] == 'approved':
+            pending_release[row['project_id']] = row['target'] or ZERO
+    return counts, pending_release
+
+
+def _released_totals(creator):
+    from finance.models import Release
+
+    return {
+        row['milestone__project_id']: row['total']
+        for row in Release.objects.filter(milestone__project__creator=creator).order_by().values(
+            'milestone__project_id'
+        ).annotate(total=Sum('amount_released'))
+    }
+
+
+def creator_dashboard(creator):
+    """
+    Summarise `creator`'s projects for CreatorDashboardSerializer.
+    Returns {'totals', 'projects'}, newest project first.
+
+    Funding figures come from the projects' stored counters. A milestone's
+    pending release is its target amount once approved, until the release
+    marks it paid; `in_escrow` is what is pledged and not yet released.
+    """
+    from finance.models import Pledge
+
+    projects = list(Project.objects.filter(creator=creator).only(
+        'id', 'title', 'status', 'currency', 'goal_amount', 'end_date', 'created_at',
+        'total_pledged', 'active_pledge_count', 'backers_count',
+    ))
+    milestone_counts, pending_release = _milestone_histograms(creator)
+    released = _released_totals(creator)
+
+    entries = []
+    for project in projects:
+        project_released = released.get(project.pk) or ZERO
+        entries.append({
+            'project': project,
+            'milestones': {'total': sum(milestone_counts[project.pk].values()), **milestone_counts[project.pk]},
+            'pending_release': pending_release[project.pk],
+            'released': project_released,
+            'in_escrow': max(project.total_pledged - project_released, ZERO),
+        })
+
+    totals = {
+        'projects': len(projects),
+        'projects_by_status': dict.fromkeys(PROJECT_STATES, 0),
+        'total_pledged': sum((project.total_pledged for project in projects), ZERO),
+        'pledges': sum(project.active_pledge_count for project in projects),
+        'backers': Pledge.objects.filter(project__creator=creator, status='active').values('backer').distinct().count()
+        if projects else 0,
+        'milestones': dict.fromkeys(('total',) + MILESTONE_STATES, 0),
+    }
+    for project, entry in zip(projects, entries):
+        totals['projects_by_status'][project.status] += 1
+        for status, count in entry['milestones'].items():
+            totals['milestones'][status] += count
+    for field in ('pending_release', 'released', 'in_escrow'):
+        totals[field] = sum((entry[field] for entry in entries), ZERO)
+    return {'totals': totals, 'projects': entries}
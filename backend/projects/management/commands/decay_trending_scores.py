@@ -0,0 +1,40 @@
+"""
+Decay trending scores to the present, or rebuild them from pledge history.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.trending import CHUNK_SIZE, decay_scores, rebuild_scores
+
+
+class Command(BaseCommand):
+    help = 'Decay trending project scores and drop projects that are no longer active.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Recompute every score from pledge history instead of decaying the stored ones.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help=f'Scores decayed per transaction (default: {CHUNK_SIZE}).',
+        )
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep running, decaying every this many seconds (default: run once and exit).',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = rebuild_scores()
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt trending scores for {count} project(s).'))
+            return
+        while True:
+            decayed, removed = decay_scores(chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Decayed {decayed} trending score(s), removed {removed} inactive project(s).'
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,21 @@
+"""
+Rebuild the denormalized funding counters on projects from active pledges.
+"""
+from django.core.management.base import BaseCommand
+
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Recompute total_pledged, active_pledge_count and backers_count for projects.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'project_ids', nargs='*', type=int,
+            help='Only rebuild these projects (default: all projects).',
+        )
+
+    def handle(self, *args, **options):
+        project_ids = options['project_ids'] or None
+        count = Project.rebuild_funding_counters(project_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt funding counters for {count} project(s).'))
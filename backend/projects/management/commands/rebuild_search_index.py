@@ -0,0 +1,17 @@
+"""
+Rebuild the project full-text search index.
+"""
+from django.core.management.base import BaseCommand
+
+from projects.search import get_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Re-index every project title and description for full-text search.'
+
+    def handle(self, *args, **options):
+        if get_backend() is None:
+            self.stdout.write(self.style.WARNING('The configured database has no full-text search backend.'))
+            return
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} project(s).'))
@@ -0,0 +1,33 @@
+"""
+Close active projects whose end date has passed: fail those below goal, mark the rest goal_reached.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.sweeper import CHUNK_SIZE, sweep_expired_projects
+
+
+class Command(BaseCommand):
+    help = 'Mark expired projects goal_reached or, below goal, failed with refund batches enqueued.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help=f'Projects closed per transaction (default: {CHUNK_SIZE}).',
+        )
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep running, sweeping every this many seconds (default: sweep once and exit).',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            failed, reached = sweep_expired_projects(chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Failed {len(failed)} expired project(s), refunds queued for process_refund_batches; '
+                f'marked {len(reached)} goal_reached.'
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:05
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_funding_counters(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Pledge = apps.get_model('finance', 'Pledge')
+    rows = (
+        Pledge.objects.filter(status='active')
+        .values('project')
+        .annotate(total=Sum('amount'), pledges=Count('id'), backers=Count('backer', distinct=True))
+    )
+    for row in rows:
+        Project.objects.filter(pk=row['project']).update(
+            total_pledged=row['total'] or 0,
+            active_pledge_count=row['pledges'],
+            backers_count=row['backers'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_milestone_onchain_milestone_id'),
+        ('finance', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='active_pledge_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='backers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='total_pledged',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(backfill_funding_counters, migrations.RunPython.noop),
+    ]
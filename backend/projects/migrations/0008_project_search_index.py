@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:20
+
+from django.db import migrations
+
+SEARCH_TABLE = 'projects_project_search'
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+            f"title, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        insert = f'INSERT INTO {SEARCH_TABLE} (rowid, title, description) VALUES (%s, %s, %s)'
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE TABLE {SEARCH_TABLE} ('
+            f'project_id bigint PRIMARY KEY REFERENCES projects_project (id) ON DELETE CASCADE, '
+            f'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(f'CREATE INDEX {SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)')
+        insert = (
+            f"INSERT INTO {SEARCH_TABLE} (project_id, document) VALUES "
+            f"(%s, setweight(to_tsvector('english', %s), 'A') || setweight(to_tsvector('english', %s), 'B'))"
+        )
+    else:
+        return
+
+    Project = apps.get_model('projects', 'Project')
+    with schema_editor.connection.cursor() as cursor:
+        for row in Project.objects.order_by().values_list('id', 'title', 'description').iterator():
+            cursor.execute(insert, list(row))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_project_active_pledge_count_project_backers_count_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:09
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_vote_tallies(apps, schema_editor):
+    Milestone = apps.get_model('projects', 'Milestone')
+    Vote = apps.get_model('governance', 'Vote')
+    rows = Vote.objects.values('milestone').annotate(
+        approve_votes_count=Count('id', filter=Q(decision='approve')),
+        reject_votes_count=Count('id', filter=Q(decision='reject')),
+        approve_weight=Sum('weight', filter=Q(decision='approve')),
+        reject_weight=Sum('weight', filter=Q(decision='reject')),
+    )
+    for row in rows:
+        Milestone.objects.filter(pk=row['milestone']).update(
+            approve_votes_count=row['approve_votes_count'],
+            reject_votes_count=row['reject_votes_count'],
+            approve_weight=row['approve_weight'] or 0,
+            reject_weight=row['reject_weight'] or 0,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('governance', '0004_vote_weight'),
+        ('projects', '0009_project_projects_pr_created_35e83e_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='milestone',
+            name='approve_votes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='milestone',
+            name='approve_weight',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='milestone',
+            name='reject_votes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='milestone',
+            name='reject_weight',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(backfill_vote_tallies, migrations.RunPython.noop),
+    ]
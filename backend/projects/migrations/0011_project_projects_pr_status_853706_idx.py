@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_milestone_approve_votes_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', 'end_date'], name='projects_pr_status_853706_idx'),
+        ),
+    ]
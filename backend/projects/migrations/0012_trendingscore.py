@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_project_projects_pr_status_853706_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending_score', serialize=False, to='projects.project')),
+                ('pledge_velocity', models.FloatField(default=0)),
+                ('backer_growth', models.FloatField(default=0)),
+                ('funding_ratio', models.FloatField(default=0)),
+                ('score', models.FloatField(default=0)),
+                ('decayed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-score', 'project_id'],
+                'indexes': [models.Index(fields=['-score', 'project'], name='projects_tr_score_375fe6_idx')],
+            },
+        ),
+    ]
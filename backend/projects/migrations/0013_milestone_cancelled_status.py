@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_trendingscore'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='milestone',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('voting', 'Voting'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('paid', 'Paid'), ('cancelled', 'Cancelled')], default='pending', max_length=20),
+        ),
+    ]
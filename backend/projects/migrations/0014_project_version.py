@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:25
+
+from django.db import migrations, models
+import time
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0013_milestone_cancelled_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='version',
+            field=models.BigIntegerField(default=time.time_ns, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0014_project_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='project',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('active', 'Active'), ('goal_reached', 'Goal reached'), ('funded', 'Funded'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='draft', max_length=20),
+        ),
+    ]
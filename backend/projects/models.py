@@ -1,8 +1,12 @@
 """
 Project and milestone models for the crowdfunding platform.
 """
+import time
+
 from django.db import models
+from django.db.models import Count, F, Q, Sum
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from users.models import User, Creator
 
 
@@ -11,6 +15,8 @@ class Project(models.Model):
     STATUS_CHOICES = [
         ('draft', 'Draft'),
         ('active', 'Active'),
+        # Past its end date with the goal met; funded once every milestone is paid
+        ('goal_reached', 'Goal reached'),
         ('funded', 'Funded'),
         ('failed', 'Failed'),
         ('cancelled', 'Cancelled'),
@@ -33,30 +39,71 @@ class Project(models.Model):
     ]
     deployment_wallet_type = models.CharField(max_length=20, choices=DEPLOYMENT_WALLET_TYPE_CHOICES, blank=True, null=True)
     chain_id = models.CharField(max_length=20, blank=True, null=True)
+    # Denormalized funding counters, maintained by the pledge create/refund/cancel
+    # paths in finance. Rebuild with `manage.py rebuild_project_counters`.
+    total_pledged = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    active_pledge_count = models.PositiveIntegerField(default=0, editable=False)
+    backers_count = models.PositiveIntegerField(default=0, editable=False)
+    # Validator for cached and conditional reads, in nanoseconds since the epoch;
+    # moved on by projects.cache.invalidate_project after every related write
+    version = models.BigIntegerField(default=time.time_ns, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+            # Deadline sweeper: active projects past their end date
+            models.Index(fields=['status', 'end_date']),
+        ]
 
     def __str__(self):
         return self.title
 
-    @property
-    def total_pledged(self):
-        """Calculate total pledged amount from active pledges."""
+    @classmethod
+    def rebuild_funding_counters(cls, project_ids=None):
+        """Recompute funding counters from active pledges. Returns the number of projects updated."""
         from finance.models import Pledge
-        return Pledge.objects.filter(
-            project=self,
-            status='active'
-        ).aggregate(total=models.Sum('amount'))['total'] or 0
+        pledges = Pledge.objects.filter(status='active')
+        projects = cls.objects.all()
+        if project_ids is not None:
+            pledges = pledges.filter(project_id__in=project_ids)
+            projects = projects.filter(pk__in=project_ids)
+
+        totals = {
+            row['project']: row
+            for row in pledges.values('project').annotate(
+                total=Sum('amount'),
+                pledges=Count('id'),
+                backers=Count('backer', distinct=True),
+            )
+        }
+
+        updated = []
+        for project in projects.only('id', 'total_pledged', 'active_pledge_count', 'backers_count'):
+            row = totals.get(project.id, {})
+            project.total_pledged = row.get('total') or 0
+            project.active_pledge_count = row.get('pledges', 0)
+            project.backers_count = row.get('backers', 0)
+            updated.append(project)
+
+        cls.objects.bulk_update(
+            updated, ['total_pledged', 'active_pledge_count', 'backers_count'], batch_size=500
+        )
+        return len(updated)
+
+    @staticmethod
+    def funding_progress(total_pledged, goal_amount):
+        """Funding progress percentage for the given amounts, capped at 100."""
+        if goal_amount == 0:
+            return 0
+        return min(100, (float(total_pledged) / float(goal_amount)) * 100)
 
     @property
     def progress_percentage(self):
         """Calculate funding progress percentage."""
-        if self.goal_amount == 0:
-            return 0
-        return min(100, (float(self.total_pledged) / float(self.goal_amount)) * 100)
+        return self.funding_progress(self.total_pledged, self.goal_amount)
 
 
 class Milestone(models.Model):
@@ -67,6 +114,7 @@ class Milestone(models.Model):
         ('approved', 'Approved'),
         ('rejected', 'Rejected'),
         ('paid', 'Paid'),
+        ('cancelled', 'Cancelled'),
     ]
 
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='milestones')
@@ -78,24 +126,82 @@ class Milestone(models.Model):
     due_date = models.DateTimeField(null=True, blank=True)
     is_activated = models.BooleanField(default=False)
     onchain_milestone_id = models.PositiveIntegerField(null=True, blank=True, help_text='ID of milestone on blockchain')
+    # Vote tallies, maintained inside the vote transaction in governance.
+    # Reconcile with `manage.py reconcile_vote_tallies`.
+    approve_votes_count = models.PositiveIntegerField(default=0, editable=False)
+    reject_votes_count = models.PositiveIntegerField(default=0, editable=False)
+    approve_weight = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    reject_weight = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['order_index']
         unique_together = ['project', 'order_index']
 
+    TALLY_FIELDS = {
+        'approve': ('approve_votes_count', 'approve_weight'),
+        'reject': ('reject_votes_count', 'reject_weight'),
+    }
+
     def __str__(self):
         return f"{self.project.title} - {self.title}"
 
-    @property
-    def approve_votes_count(self):
-        """Count approve votes for this milestone."""
-        return self.votes.filter(decision='approve').count()
-
-    @property
-    def reject_votes_count(self):
-        """Count reject votes for this milestone."""
-        return self.votes.filter(decision='reject').count()
+    def update_vote_tallies(self, added=None, removed=None):
+        """
+        Apply a vote change to the tallies with a single F-expression update.
+
+        `added` and `removed` are (decision, weight) pairs for the vote being
+        counted and the previous vote being replaced.
+        """
+        deltas = {}
+        for change, sign in ((added, 1), (removed, -1)):
+            if change is None:
+                continue
+            decision, weight = change
+            count_field, weight_field = self.TALLY_FIELDS[decision]
+            deltas[count_field] = deltas.get(count_field, 0) + sign
+            deltas[weight_field] = deltas.get(weight_field, 0) + sign * weight
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        Milestone.objects.filter(pk=self.pk).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+        self.refresh_from_db(fields=list(deltas))
+
+    @classmethod
+    def rebuild_vote_tallies(cls, milestone_ids=None, dry_run=False):
+        """Recompute vote tallies from votes. Returns the milestones whose stored tallies were wrong."""
+        from governance.models import Vote
+        votes = Vote.objects.all()
+        milestones = cls.objects.all()
+        if milestone_ids is not None:
+            votes = votes.filter(milestone_id__in=milestone_ids)
+            milestones = milestones.filter(pk__in=milestone_ids)
+
+        tallies = {
+            row['milestone']: row
+            for row in votes.values('milestone').annotate(
+                approve_votes_count=Count('id', filter=Q(decision='approve')),
+                reject_votes_count=Count('id', filter=Q(decision='reject')),
+                approve_weight=Sum('weight', filter=Q(decision='approve')),
+                reject_weight=Sum('weight', filter=Q(decision='reject')),
+            )
+        }
+
+        fields = ['approve_votes_count', 'reject_votes_count', 'approve_weight', 'reject_weight']
+        mismatched = []
+        for milestone in milestones.only('id', *fields):
+            row = tallies.get(milestone.id, {})
+            expected = {field: row.get(field) or 0 for field in fields}
+            if any(getattr(milestone, field) != value for field, value in expected.items()):
+                for field, value in expected.items():
+                    setattr(milestone, field, value)
+                mismatched.append(milestone)
+
+        if not dry_run:
+            cls.objects.bulk_update(mismatched, fields, batch_size=500)
+        return mismatched
 
 
 class Update(models.Model):
@@ -113,3 +219,28 @@ class Update(models.Model):
         return f"{self.project.title} - {self.title}"
 
 
+class TrendingScore(models.Model):
+    """
+    Momentum of an active project, ranked by `score` (see projects.trending).
+
+    `pledge_velocity` and `backer_growth` are exponentially decayed sums of
+    pledged amounts and of new backers, valid as of `decayed_at`. Pledges
+    add to them as they arrive and `manage.py decay_trending_scores`
+    decays every row periodically.
+    """
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='trending_score')
+    pledge_velocity = models.FloatField(default=0)
+    backer_growth = models.FloatField(default=0)
+    funding_ratio = models.FloatField(default=0)
+    score = models.FloatField(default=0)
+    decayed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-score', 'project_id']
+        indexes = [
+            # Top-k reads walk this index
+            models.Index(fields=['-score', 'project']),
+        ]
+
+    def __str__(self):
+        return f"Trending score {self.score:.3f} for project {self.project_id}"
@@ -0,0 +1,273 @@
+"""
+Read-through response cache for anonymous project reads.
+
+Responses are looked up in a small in-process LRU first and then in a
+shared Django cache. Keys embed a generation that `projects.cache` moves on
+every relevant write (the project version for details, a list generation
+for lists), so invalidation is a counter bump and stale entries simply stop
+being addressed until they expire.
+
+Rebuilds are coalesced so that an expiring hot entry is recomputed by one
+worker rather than by every request that notices it (see ResponseCache.fetch).
+
+Configure with the PROJECTS_RESPONSE_CACHE setting; BACKEND may point at
+any class with the same `make_key`/`fetch`/`afetch`/`stats` interface.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+DEFAULTS = {
+    'BACKEND': 'projects.response_cache.ResponseCache',
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 60,
+    'LOCAL_MAX_ENTRIES': 512,
+    'LOCAL_TIMEOUT': 5,
+    # Seconds past TIMEOUT during which a stale entry is still served while
+    # one worker rebuilds it (stale-while-revalidate). 0 disables.
+    'STALE_TIMEOUT': 30,
+    # Single-flight rebuild lock: how long it may be held, and how long other
+    # workers wait for its result when there is nothing stale to serve.
+    'LOCK_TIMEOUT': 10,
+    'WAIT_TIMEOUT': 2.0,
+    'POLL_INTERVAL': 0.05,
+}
+
+HIT = 'HIT'
+STALE = 'STALE'
+COALESCED = 'COALESCED'
+MISS = 'MISS'
+
+
+class LocalLRU:
+    """Thread-safe LRU of (expires_at, value) pairs."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ResponseCache:
+    """
+    Two-level (local LRU + shared cache) store for rendered response data.
+
+    Misses are single-flight: the worker that wins a lock in the shared cache
+    rebuilds the entry, while the others serve the stale copy if there is one
+    or wait briefly for the winner's result before building it themselves.
+    """
+
+    key_prefix = 'projects:response'
+
+    def __init__(self, options):
+        self.shared = caches[options['CACHE_ALIAS']]
+        self.timeout = options['TIMEOUT']
+        self.stale_timeout = options['STALE_TIMEOUT']
+        self.local_timeout = min(options['LOCAL_TIMEOUT'], self.timeout)
+        self.lock_timeout = options['LOCK_TIMEOUT']
+        self.wait_timeout = options['WAIT_TIMEOUT']
+        self.poll_interval = options['POLL_INTERVAL']
+        self.local = LocalLRU(options['LOCAL_MAX_ENTRIES'])
+        self._counts = {
+            'local_hits': 0, 'shared_hits': 0, 'stale_hits': 0, 'coalesced_hits': 0, 'misses': 0,
+        }
+        self._counts_lock = threading.Lock()
+
+    def make_key(self, request, generation):
+        """Key on path, sorted query parameters, media type and generation."""
+        params = sorted(
+            (name, value)
+            for name in request.query_params
+            for value in request.query_params.getlist(name)
+        )
+        media_type = getattr(request, 'accepted_media_type', '')
+        return f'{self.key_prefix}:{generation}:{media_type}:{request.path}?{urlencode(params)}'
+
+    def _count(self, name):
+        with self._counts_lock:
+            self._counts[name] += 1
+
+    def _is_fresh(self, entry):
+        return entry['fresh_until'] > time.time()
+
+    def _get_entry(self, key):
+        """Return (entry, from_local) for `key`, or (None, False)."""
+        entry = self.local.get(key)
+        if entry is not None and self._is_fresh(entry):
+            return entry, True
+        entry = self.shared.get(key)
+        if entry is not None and self._is_fresh(entry):
+            self.local.set(key, entry, self.local_timeout)
+        return entry, False
+
+    def set(self, key, data):
+        entry = {'data': data, 'fresh_until': time.time() + self.timeout}
+        self.shared.set(key, entry, self.timeout + self.stale_timeout)
+        self.local.set(key, entry, self.local_timeout)
+
+    def _wait_for(self, key):
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            entry = self.shared.get(key)
+            if entry is not None and self._is_fresh(entry):
+                return entry
+            if self.shared.get(f'{key}:lock') is None:
+                # The rebuild finished without caching anything (or gave up)
+                return None
+        return None
+
+    def fetch(self, key, build):
+        """
+        Return (data, state) for `key`, calling `build` at most once.
+
+        `build` returns the data to cache, or None if the result must not be
+        cached; in that case (None, MISS) is returned. `state` is one of HIT,
+        STALE, COALESCED or MISS.
+        """
+        entry, from_local = self._get_entry(key)
+        if entry is not None and self._is_fresh(entry):
+            self._count('local_hits' if from_local else 'shared_hits')
+            return entry['data'], HIT
+
+        lock_key = f'{key}:lock'
+        if self.shared.add(lock_key, 1, self.lock_timeout):
+            try:
+                self._count('misses')
+                data = build()
+                if data is not None:
+                    self.set(key, data)
+                return data, MISS
+            finally:
+                self.shared.delete(lock_key)
+
+        if entry is not None:
+            self._count('stale_hits')
+            return entry['data'], STALE
+
+        entry = self._wait_for(key)
+        if entry is not None:
+            self._count('coalesced_hits')
+            return entry['data'], COALESCED
+
+        self._count('misses')
+        data = build()
+        if data is not None:
+            self.set(key, data)
+        return data, MISS
+
+    async def _aget_entry(self, key):
+        entry = self.local.get(key)
+        if entry is not None and self._is_fresh(entry):
+            return entry, True
+        entry = await self.shared.aget(key)
+        if entry is not None and self._is_fresh(entry):
+            self.local.set(key, entry, self.local_timeout)
+        return entry, False
+
+    async def aset(self, key, data):
+        entry = {'data': data, 'fresh_until': time.time() + self.timeout}
+        await self.shared.aset(key, entry, self.timeout + self.stale_timeout)
+        self.local.set(key, entry, self.local_timeout)
+
+    async def _await_for(self, key):
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            entry = await self.shared.aget(key)
+            if entry is not None and self._is_fresh(entry):
+                return entry
+            if await self.shared.aget(f'{key}:lock') is None:
+                return None
+        return None
+
+    async def afetch(self, key, build):
+        """Async version of `fetch`; `build` is a coroutine function."""
+        entry, from_local = await self._aget_entry(key)
+        if entry is not None and self._is_fresh(entry):
+            self._count('local_hits' if from_local else 'shared_hits')
+            return entry['data'], HIT
+
+        lock_key = f'{key}:lock'
+        if await self.shared.aadd(lock_key, 1, self.lock_timeout):
+            try:
+                self._count('misses')
+                data = await build()
+                if data is not None:
+                    await self.aset(key, data)
+                return data, MISS
+            finally:
+                await self.shared.adelete(lock_key)
+
+        if entry is not None:
+            self._count('stale_hits')
+            return entry['data'], STALE
+
+        entry = await self._await_for(key)
+        if entry is not None:
+            self._count('coalesced_hits')
+            return entry['data'], COALESCED
+
+        self._count('misses')
+        data = await build()
+        if data is not None:
+            await self.aset(key, data)
+        return data, MISS
+
+    def stats(self):
+        with self._counts_lock:
+            counts = dict(self._counts)
+        lookups = sum(counts.values())
+        counts['hit_ratio'] = (lookups - counts['misses']) / lookups if lookups else 0.0
+        counts['local_entries'] = len(self.local)
+        return counts
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the configured response cache, or None if it is disabled."""
+    global _response_cache
+    options = {**DEFAULTS, **getattr(settings, 'PROJECTS_RESPONSE_CACHE', {})}
+    if not options['ENABLED']:
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = import_string(options['BACKEND'])(options)
+    return _response_cache
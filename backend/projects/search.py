@@ -0,0 +1,164 @@
+"""
+Full-text search over project titles and descriptions.
+
+The index lives in the `projects_project_search` table, keyed by project id:
+an FTS5 virtual table on SQLite and a weighted tsvector with a GIN index on
+PostgreSQL (see migration 0008). Rows are refreshed from `projects.signals`
+on every project save and can be rebuilt with `manage.py rebuild_search_index`.
+
+`search_projects` filters a queryset against the index in SQL, so other
+filters, ordering and pagination apply to every match, not to a capped list
+of ids.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'projects_project_search'
+POSTGRES_CONFIG = 'english'
+# Queries longer than this are truncated to keep MATCH/tsquery cheap
+MAX_TERMS = 16
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _terms(query):
+    return _TERM_RE.findall(query.lower())[:MAX_TERMS]
+
+
+class SQLiteSearchBackend:
+    """FTS5 index using the project id as rowid."""
+
+    def index(self, cursor, project_id, title, description):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [project_id])
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, description) VALUES (%s, %s, %s)',
+            [project_id, title, description],
+        )
+
+    def remove(self, cursor, project_id):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [project_id])
+
+    def clear(self, cursor):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    # bm25 scores better matches lower
+    rank_descending = False
+
+    def _match(self, terms):
+        # Every term must match, each as a prefix
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def matching_ids(self, terms):
+        return f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [self._match(terms)]
+
+    def rank(self, terms, id_column):
+        # Titles weigh 10x descriptions
+        return (
+            f'SELECT bm25({SEARCH_TABLE}, 10.0, 1.0) FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s AND rowid = {id_column}',
+            [self._match(terms)],
+        )
+
+
+class PostgresSearchBackend:
+    """tsvector index with titles weighted A and descriptions weighted B."""
+
+    def index(self, cursor, project_id, title, description):
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (project_id, document) VALUES ('
+            f'%s, setweight(to_tsvector(%s, %s), \'A\') || setweight(to_tsvector(%s, %s), \'B\')) '
+            f'ON CONFLICT (project_id) DO UPDATE SET document = EXCLUDED.document',
+            [project_id, POSTGRES_CONFIG, title, POSTGRES_CONFIG, description],
+        )
+
+    def remove(self, cursor, project_id):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE project_id = %s', [project_id])
+
+    def clear(self, cursor):
+        cursor.execute(f'TRUNCATE {SEARCH_TABLE}')
+
+    rank_descending = True
+
+    def _tsquery(self, terms):
+        return ' & '.join(f'{term}:*' for term in terms)
+
+    def matching_ids(self, terms):
+        return (
+            f'SELECT project_id FROM {SEARCH_TABLE} WHERE document @@ to_tsquery(%s, %s)',
+            [POSTGRES_CONFIG, self._tsquery(terms)],
+        )
+
+    def rank(self, terms, id_column):
+        return (
+            f'SELECT ts_rank(document, to_tsquery(%s, %s)) FROM {SEARCH_TABLE} WHERE project_id = {id_column}',
+            [POSTGRES_CONFIG, self._tsquery(terms)],
+        )
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend(),
+    'postgresql': PostgresSearchBackend(),
+}
+
+
+def get_backend():
+    """Return the search backend for the default database, or None if unsupported."""
+    return BACKENDS.get(connection.vendor)
+
+
+def index_project(project):
+    backend = get_backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        backend.index(cursor, project.pk, project.title, project.description)
+
+
+def remove_project(project_id):
+    backend = get_backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        backend.remove(cursor, project_id)
+
+
+def rebuild_index(batch_size=1000):
+    """Re-index every project and retire the cached project lists. Returns the number of projects indexed."""
+    from .cache import bump_list_generation
+    from .models import Project
+
+    backend = get_backend()
+    if backend is None:
+        return 0
+    count = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        backend.clear(cursor)
+        rows = Project.objects.order_by().values_list('id', 'title', 'description')
+        for project_id, title, description in rows.iterator(chunk_size=batch_size):
+            backend.index(cursor, project_id, title, description)
+            count += 1
+    # Cached search results were computed from the old index
+    bump_list_generation()
+    return count
+
+
+def search_projects(queryset, query):
+    """
+    Filter a Project queryset to the projects matching `query`, best match first.
+
+    Returns None when the database has no search index or the query has no
+    searchable terms, so callers can fall back to a plain substring filter.
+    """
+    backend = get_backend()
+    terms = _terms(query)
+    if backend is None or not terms:
+        return None
+    quote = connection.ops.quote_name
+    id_column = f'{quote(queryset.model._meta.db_table)}.{quote(queryset.model._meta.pk.column)}'
+    rank = RawSQL(*backend.rank(terms, id_column), output_field=FloatField())
+    return queryset.filter(pk__in=RawSQL(*backend.matching_ids(terms))).order_by(
+        rank.desc() if backend.rank_descending else rank.asc(), '-pk'
+    )
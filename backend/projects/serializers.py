@@ -1,27 +1,155 @@
 """
 Serializers for project-related endpoints.
 """
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
+from config.row_serializers import RowValue
 from .models import Project, Milestone, Update
 from users.serializers import CreatorSerializer
 
 
-class MilestoneSerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    """
+    Serializer mixin for sparse fieldsets and expansion control.
+
+    `fields` keeps only the named fields. `expand` names which of
+    `Meta.expandable_fields` (nested relations) to include; when it is
+    given, unlisted relations are left out. Both default to None, which
+    keeps every field.
+
+    `prepare_queryset` applies the same selection to a queryset so
+    unrequested relations are not loaded and unused columns are deferred.
+    The Meta options it reads are:
+
+    - `select_related` / `prefetch_related`: field name -> lookups it needs
+    - `annotations`: field name -> {alias: expression} it reads
+    - `field_columns`: field name -> model columns it reads (defaults to
+      the field name itself when that is a concrete model field)
+    - `required_columns`: columns always loaded, e.g. the pagination key
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        keep = self.select_fields(fields, expand)
+        for name in set(self.fields) - set(keep):
+            self.fields.pop(name)
+
+    @classmethod
+    def select_fields(cls, fields=None, expand=None):
+        """Return the serializer field names kept for the given selection."""
+        names = list(cls.Meta.fields)
+        if expand is not None:
+            expandable = getattr(cls.Meta, 'expandable_fields', ())
+            names = [name for name in names if name not in expandable or name in expand]
+        if fields is not None:
+            selected = [name for name in names if name in fields]
+            names = selected or names
+        return names
+
+    @classmethod
+    def prepare_queryset(cls, queryset, fields=None, expand=None):
+        meta = cls.Meta
+        model_fields = {field.name for field in meta.model._meta.concrete_fields}
+        select_related = getattr(meta, 'select_related', {})
+        prefetch_related = getattr(meta, 'prefetch_related', {})
+        annotations = getattr(meta, 'annotations', {})
+        field_columns = getattr(meta, 'field_columns', {})
+
+        columns = set(getattr(meta, 'required_columns', ('id',)))
+        for name in cls.select_fields(fields, expand):
+            if name in select_related:
+                queryset = queryset.select_related(*select_related[name])
+            if name in prefetch_related:
+                queryset = queryset.prefetch_related(*prefetch_related[name])
+            if name in annotations:
+                queryset = queryset.annotate(**annotations[name])
+            if name in field_columns:
+                columns.update(field_columns[name])
+            elif name in model_fields:
+                columns.add(name)
+        if fields is not None:
+            queryset = queryset.only(*columns)
+        return queryset
+
+
+def milestones_count_subquery():
+    """Per-project milestone count as a correlated subquery (keeps the default ordering, unlike a GROUP BY)."""
+    counts = Milestone.objects.filter(project=OuterRef('pk')).order_by().values('project').annotate(
+        total=Count('id')
+    ).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class MilestoneSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Milestone model."""
-    approve_votes_count = serializers.ReadOnlyField()
-    reject_votes_count = serializers.ReadOnlyField()
 
     class Meta:
         model = Milestone
         fields = (
             'id', 'project', 'title', 'description', 'target_amount',
             'order_index', 'status', 'due_date', 'is_activated', 'onchain_milestone_id', 'created_at',
-            'approve_votes_count', 'reject_votes_count'
+            'approve_votes_count', 'reject_votes_count', 'approve_weight', 'reject_weight'
         )
         read_only_fields = ('id', 'created_at', 'status', 'is_activated')
 
 
-class UpdateSerializer(serializers.ModelSerializer):
+class MilestonePlanItemSerializer(serializers.ModelSerializer):
+    """One milestone in a bulk plan; the project comes from the URL."""
+
+    class Meta:
+        model = Milestone
+        fields = ('title', 'description', 'target_amount', 'order_index', 'due_date')
+
+
+class MilestonePlanSerializer(serializers.Serializer):
+    """
+    Validate a whole milestone plan for one project.
+
+    Pass the project in `context['project']`. Existing milestones are read
+    once, then every item is checked in a single pass for order_index
+    clashes (within the plan and against the project) and the combined
+    target amount is checked against the project's goal.
+    """
+    milestones = MilestonePlanItemSerializer(many=True, allow_empty=False)
+
+    def validate_milestones(self, items):
+        project = self.context['project']
+        existing = Milestone.objects.filter(project=project).values_list('order_index', 'target_amount')
+        taken = set()
+        total = 0
+        for order_index, target_amount in existing:
+            taken.add(order_index)
+            total += target_amount
+
+        planned = set()
+        errors = []
+        for item in items:
+            order_index = item['order_index']
+            if order_index in taken:
+                errors.append({'order_index': [f'Order index {order_index} is already used in this project.']})
+            elif order_index in planned:
+                errors.append({'order_index': [f'Order index {order_index} appears more than once in the plan.']})
+            else:
+                errors.append({})
+            planned.add(order_index)
+            total += item['target_amount']
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        if total > project.goal_amount:
+            raise serializers.ValidationError(
+                f'Milestone targets total {total}, which exceeds the project goal of {project.goal_amount}.'
+            )
+        return items
+
+    def create(self, validated_data):
+        project = self.context['project']
+        return Milestone.objects.bulk_create(
+            Milestone(project=project, **item) for item in validated_data['milestones']
+        )
+
+
+class UpdateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Update model."""
     created_by_username = serializers.CharField(source='created_by.username', read_only=True)
 
@@ -29,16 +157,17 @@ class UpdateSerializer(serializers.ModelSerializer):
         model = Update
         fields = ('id', 'project', 'title', 'content', 'created_at', 'created_by', 'created_by_username')
         read_only_fields = ('id', 'created_at', 'created_by')
+        select_related = {'created_by_username': ('created_by',)}
+        field_columns = {'created_by_username': ('created_by',)}
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Project model."""
     creator = CreatorSerializer(read_only=True)
     milestones = MilestoneSerializer(many=True, read_only=True)
     updates = UpdateSerializer(many=True, read_only=True)
     total_pledged = serializers.ReadOnlyField()
     progress_percentage = serializers.ReadOnlyField()
-    backers_count = serializers.SerializerMethodField()
     days_remaining = serializers.SerializerMethodField()
 
     class Meta:
@@ -51,9 +180,16 @@ class ProjectSerializer(serializers.ModelSerializer):
             'deployment_wallet_type', 'chain_id', 'backers_count', 'days_remaining'
         )
         read_only_fields = ('id', 'created_at', 'updated_at', 'status')
-
-    def get_backers_count(self, obj):
-        return obj.pledges.filter(status='active').values('backer').distinct().count()
+        expandable_fields = ('creator', 'milestones', 'updates')
+        select_related = {'creator': ('creator__user',)}
+        prefetch_related = {'milestones': ('milestones',), 'updates': ('updates__created_by',)}
+        field_columns = {
+            'progress_percentage': ('total_pledged', 'goal_amount'),
+            'days_remaining': ('end_date',),
+            'milestones': (),
+            'updates': (),
+        }
+        required_columns = ('id', 'created_at')
 
     def get_days_remaining(self, obj):
         from django.utils import timezone
@@ -66,7 +202,7 @@ class ProjectSerializer(serializers.ModelSerializer):
         return delta.days
 
 
-class ProjectListSerializer(serializers.ModelSerializer):
+class ProjectListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Lightweight serializer for project lists."""
     creator_display_name = serializers.CharField(source='creator.display_name', read_only=True)
     total_pledged = serializers.ReadOnlyField()
@@ -81,8 +217,77 @@ class ProjectListSerializer(serializers.ModelSerializer):
             'creator_display_name', 'total_pledged', 'progress_percentage',
             'milestones_count'
         )
+        select_related = {'creator_display_name': ('creator',)}
+        annotations = {'milestones_count': {'milestones_total': milestones_count_subquery()}}
+        field_columns = {
+            'creator_display_name': ('creator',),
+            'progress_percentage': ('total_pledged', 'goal_amount'),
+            'milestones_count': (),
+        }
+        required_columns = ('id', 'created_at')
+        row_fields = {
+            'creator_display_name': 'creator__display_name',
+            'progress_percentage': RowValue(Project.funding_progress, 'total_pledged', 'goal_amount'),
+            'milestones_count': 'milestones_total',
+        }
 
     def get_milestones_count(self, obj):
+        if hasattr(obj, 'milestones_total'):
+            return obj.milestones_total
         return obj.milestones.count()
 
 
+TRENDING_FIELDS = ('score', 'pledge_velocity', 'backer_growth', 'funding_ratio')
+
+
+class TrendingProjectSerializer(ProjectListSerializer):
+    """Project list entry with its trending score components."""
+    score = serializers.FloatField(source='trending_score.score', read_only=True)
+    pledge_velocity = serializers.FloatField(source='trending_score.pledge_velocity', read_only=True)
+    backer_growth = serializers.FloatField(source='trending_score.backer_growth', read_only=True)
+    funding_ratio = serializers.FloatField(source='trending_score.funding_ratio', read_only=True)
+
+    class Meta(ProjectListSerializer.Meta):
+        fields = ProjectListSerializer.Meta.fields + TRENDING_FIELDS
+        select_related = {
+            **ProjectListSerializer.Meta.select_related,
+            **{name: ('trending_score',) for name in TRENDING_FIELDS},
+        }
+        field_columns = {**ProjectListSerializer.Meta.field_columns, **{name: () for name in TRENDING_FIELDS}}
+
+
+class CreatorDashboardProjectSerializer(serializers.Serializer):
+    """One project on the creator dashboard."""
+    id = serializers.IntegerField(source='project.id')
+    title = serializers.CharField(source='project.title')
+    status = serializers.CharField(source='project.status')
+    currency = serializers.CharField(source='project.currency')
+    goal_amount = serializers.DecimalField(source='project.goal_amount', max_digits=12, decimal_places=2)
+    total_pledged = serializers.DecimalField(source='project.total_pledged', max_digits=12, decimal_places=2)
+    progress_percentage = serializers.FloatField(source='project.progress_percentage')
+    pledges = serializers.IntegerField(source='project.active_pledge_count')
+    backers = serializers.IntegerField(source='project.backers_count')
+    end_date = serializers.DateTimeField(source='project.end_date')
+    milestones = serializers.DictField(child=serializers.IntegerField())
+    pending_release = serializers.DecimalField(max_digits=14, decimal_places=2)
+    released = serializers.DecimalField(max_digits=14, decimal_places=2)
+    in_escrow = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class CreatorDashboardTotalsSerializer(serializers.Serializer):
+    """Dashboard totals across all of a creator's projects."""
+    projects = serializers.IntegerField()
+    projects_by_status = serializers.DictField(child=serializers.IntegerField())
+    total_pledged = serializers.DecimalField(max_digits=14, decimal_places=2)
+    pledges = serializers.IntegerField()
+    backers = serializers.IntegerField(help_text='Distinct backers with an active pledge in any of the projects')
+    milestones = serializers.DictField(child=serializers.IntegerField())
+    pending_release = serializers.DecimalField(max_digits=14, decimal_places=2)
+    released = serializers.DecimalField(max_digits=14, decimal_places=2)
+    in_escrow = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class CreatorDashboardSerializer(serializers.Serializer):
+    """Serializer for the creator dashboard (see projects.dashboard)."""
+    totals = CreatorDashboardTotalsSerializer()
+    projects = CreatorDashboardProjectSerializer(many=True)
@@ -0,0 +1,87 @@
+"""
+Signal receivers that keep project caches, the search index and trending scores in step with writes.
+
+Invalidation is deferred to transaction commit so a concurrent read cannot
+re-cache data from before the write became visible.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import bump_list_generation, bump_project_versions, invalidate_project
+from .models import Project, Milestone, Update
+from .search import index_project, remove_project
+from .trending import drop_scores
+
+
+def _invalidate_on_commit(project_id, lists=True):
+    transaction.on_commit(lambda: invalidate_project(project_id, lists=lists))
+
+
+@receiver([post_save, post_delete], sender=Project)
+def project_changed(sender, instance, **kwargs):
+    _invalidate_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=Project)
+def project_saved_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_project(instance)
+
+
+@receiver(post_save, sender=Project)
+def project_saved_trending(sender, instance, raw=False, **kwargs):
+    if not raw and instance.status != 'active':
+        drop_scores([instance.pk])
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted_index(sender, instance, **kwargs):
+    remove_project(instance.pk)
+
+
+# Lists show a project's milestone count but not its milestones, updates or
+# votes. Its pledge total is left to the response cache TIMEOUT.
+
+@receiver([post_save, post_delete], sender=Milestone)
+def milestone_changed(sender, instance, created=True, **kwargs):
+    # post_delete passes no `created`, and a deletion changes the count too
+    _invalidate_on_commit(instance.project_id, lists=created)
+
+
+@receiver([post_save, post_delete], sender=Update)
+def update_changed(sender, instance, **kwargs):
+    _invalidate_on_commit(instance.project_id, lists=False)
+
+
+@receiver([post_save, post_delete], sender='finance.Pledge')
+def pledge_changed(sender, instance, **kwargs):
+    _invalidate_on_commit(instance.project_id, lists=False)
+
+
+@receiver([post_save, post_delete], sender='governance.Vote')
+def vote_changed(sender, instance, **kwargs):
+    project_id = Milestone.objects.filter(pk=instance.milestone_id).values_list('project_id', flat=True).first()
+    if project_id is not None:
+        _invalidate_on_commit(project_id, lists=False)
+
+
+def _invalidate_creator_projects_on_commit(projects):
+    def invalidate():
+        bump_project_versions(projects)
+        bump_list_generation()
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender='users.Creator')
+def creator_changed(sender, instance, raw=False, **kwargs):
+    # Project reads embed the creator profile
+    if not raw:
+        _invalidate_creator_projects_on_commit(Project.objects.filter(creator_id=instance.pk))
+
+
+@receiver(post_save, sender='users.User')
+def user_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    # ...and the creator's user; logins only touch last_login, which no project read shows
+    if not raw and instance.is_creator and set(update_fields or ()) != {'last_login'}:
+        _invalidate_creator_projects_on_commit(Project.objects.filter(creator__user_id=instance.pk))
@@ -0,0 +1,105 @@
+"""
+Deadline sweeper: closes active projects whose end date has passed.
+
+Expired projects are found through the (status, end_date) index and closed
+in chunks, each chunk in its own transaction with conditional bulk
+UPDATEs, so re-running is harmless and concurrent sweepers split the work
+(on PostgreSQL rows locked by another sweeper are skipped). Projects below
+goal are failed and get a refund batch, created idempotently; the rest are
+marked goal_reached, and become funded only once the release path has paid
+every milestone. Either way they leave the index range the next run scans.
+
+Run it with `manage.py sweep_expired_projects` from a scheduler, or set
+PROJECT_SWEEPER_INTERVAL to run it on a thread inside the web process.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import invalidate_project
+from .models import Project
+from .trending import drop_scores
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 200
+
+
+def expired_projects(now=None):
+    """Active projects past their end date."""
+    return Project.objects.filter(status='active', end_date__lte=now or timezone.now())
+
+
+def sweep_expired_projects(now=None, chunk_size=CHUNK_SIZE, process_refunds=False):
+    """
+    Close expired projects and enqueue refunds for those that missed their goal.
+
+    Returns the ids of the projects failed and of those that reached their goal.
+    Refund batches are left pending for `manage.py process_refund_batches`
+    unless `process_refunds` is set, in which case they are scheduled as
+    soon as each chunk commits.
+    """
+    from finance.refunds import schedule_refund_batch, start_refund_batch
+
+    now = now or timezone.now()
+    failed, goal_reached = [], []
+    while True:
+        with transaction.atomic():
+            rows = list(
+                expired_projects(now)
+                .select_for_update(skip_locked=True)
+                .order_by('end_date')
+                .values_list('id', 'total_pledged', 'goal_amount')[:chunk_size]
+            )
+            if not rows:
+                break
+            ids = [pk for pk, _, _ in rows]
+            reached = [pk for pk, total_pledged, goal_amount in rows if total_pledged >= goal_amount]
+            missed = [pk for pk in ids if pk not in reached]
+            # Only rows still active change, so a project is closed exactly once
+            Project.objects.filter(pk__in=reached, status='active').update(status='goal_reached', updated_at=now)
+            Project.objects.filter(pk__in=missed, status='active').update(status='failed', updated_at=now)
+            for project in Project.objects.filter(pk__in=missed, status='failed'):
+                batch, created = start_refund_batch(project)
+                if created and process_refunds:
+                    schedule_refund_batch(batch)
+            # The bulk updates send no post_save, so drop the scores and caches here
+            drop_scores(ids)
+            transaction.on_commit(lambda ids=ids: [invalidate_project(pk) for pk in ids])
+        failed.extend(missed)
+        goal_reached.extend(reached)
+    return failed, goal_reached
+
+
+def _sweep_forever(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            failed, reached = sweep_expired_projects(process_refunds=True)
+            if failed or reached:
+                logger.info(
+                    'Deadline sweeper failed %d and closed %d expired project(s) that reached their goal',
+                    len(failed), len(reached),
+                )
+        except Exception:
+            logger.exception('Deadline sweeper run failed')
+        finally:
+            connection.close()
+
+
+_scheduler = None
+
+
+def start_scheduler(interval=None):
+    """Start the in-process sweeper thread if PROJECT_SWEEPER_INTERVAL (seconds) is set. Returns the thread."""
+    global _scheduler
+    interval = interval if interval is not None else getattr(settings, 'PROJECT_SWEEPER_INTERVAL', 0)
+    if not interval or _scheduler is not None:
+        return _scheduler
+    _scheduler = threading.Thread(target=_sweep_forever, args=(interval,), name='project-sweeper', daemon=True)
+    _scheduler.start()
+    return _scheduler
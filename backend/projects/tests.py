@@ -0,0 +1,768 @@
+"""
+Query budgets for project, milestone and update endpoints, and tests for trending scores.
+"""
+import asyncio
+import io
+import json
+import threading
+import time
+from unittest import mock
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from config.testing import QueryBudgetTestCase, call_async_view
+from finance.models import Pledge, RefundBatch
+from governance.audit import flush_audit_log
+from governance.models import Vote
+from users.models import Creator, User
+from .async_views import MilestoneListView, ProjectDetailView, ProjectListView
+from .cache import get_list_generation, get_project_version
+from .models import Milestone, Project, TrendingScore
+from .response_cache import COALESCED, DEFAULTS as RESPONSE_CACHE_DEFAULTS, HIT, MISS, STALE, ResponseCache
+from .search import rebuild_index, remove_project
+from .sweeper import expired_projects, sweep_expired_projects
+from .trending import decay_scores, rebuild_scores, record_pledge, top_project_ids
+
+
+class ProjectQueryBudgetTests(QueryBudgetTestCase):
+    """Fixed query budgets for the projects API, independent of page size."""
+
+    def test_project_list(self):
+        self.assertQueryBudget('/api/projects/', 2, min_results=50)
+
+    def test_project_list_cursor(self):
+        self.assertQueryBudget('/api/projects/?pagination=cursor', 1, min_results=50)
+
+    def test_project_list_search(self):
+        # COUNT and page, each filtered against the search index
+        self.assertQueryBudget('/api/projects/?search=solar', 2, min_results=5)
+
+    def test_project_list_sparse_fields(self):
+        self.assertQueryBudget('/api/projects/?fields=id,title,milestones_count', 2, min_results=50)
+
+    def test_project_detail(self):
+        # version, project + creator, milestones, updates + authors
+        self.assertQueryBudget(f"/api/projects/{self.data['project'].pk}/", 5, page_sizes=())
+
+    def test_project_stats(self):
+        self.assertQueryBudget(f"/api/projects/{self.data['project'].pk}/stats/", 2, page_sizes=())
+
+    def test_my_projects(self):
+        self.assertQueryBudget('/api/projects/my_projects/', 4, user=self.data['creator'], page_sizes=())
+
+    def test_creator_dashboard(self):
+        # creator profile, projects, milestones, releases, distinct backers
+        self.assertQueryBudget('/api/projects/dashboard/', 5, user=self.data['creator'], page_sizes=())
+
+    def test_project_trending(self):
+        # top-k ids off the score index, projects + creators + scores
+        self.assertQueryBudget('/api/projects/trending/?limit=50', 2, page_sizes=(), min_results=40)
+
+    def test_milestone_list(self):
+        self.assertQueryBudget('/api/projects/milestones/', 2, min_results=50)
+
+    def test_milestone_list_for_project(self):
+        self.assertQueryBudget(f"/api/projects/milestones/?project={self.data['project'].pk}", 3, min_results=4)
+
+    def test_update_list(self):
+        self.assertQueryBudget('/api/projects/updates/', 2, min_results=50)
+
+
+class AsyncProjectReadTests(QueryBudgetTestCase):
+    """The async read views return what the sync ViewSets return."""
+
+    def assertSameAsSync(self, view, path, user=None, **kwargs):
+        cache.clear()
+        expected = self.client_for(user).get(path)
+        cache.clear()
+        response = call_async_view(view, path, user=user, **kwargs)
+        self.assertEqual(response.status_code, expected.status_code, path)
+        self.assertEqual(json.loads(response.content), expected.json(), path)
+        return response
+
+    def test_project_list(self):
+        view = ProjectListView.as_view()
+        for query in ('', '?page=2', '?status=active', '?fields=id,title,milestones_count', '?search=solar',
+                      '?pagination=cursor', '?page=999'):
+            self.assertSameAsSync(view, f'/api/projects/{query}')
+        self.assertSameAsSync(view, '/api/projects/', user=self.data['backer'])
+
+    def test_project_detail(self):
+        pk = self.data['project'].pk
+        view = ProjectDetailView.as_view()
+        self.assertSameAsSync(view, f'/api/projects/{pk}/', pk=str(pk))
+        self.assertSameAsSync(view, f'/api/projects/{pk}/?expand=milestones', pk=str(pk))
+        self.assertSameAsSync(view, '/api/projects/999999/', pk='999999')
+
+    def test_milestone_list(self):
+        view = MilestoneListView.as_view()
+        self.assertSameAsSync(view, '/api/projects/milestones/')
+        self.assertSameAsSync(view, f"/api/projects/milestones/?project={self.data['project'].pk}")
+
+    def test_conditional_get(self):
+        pk = self.data['project'].pk
+        view = ProjectDetailView.as_view()
+        response = call_async_view(view, f'/api/projects/{pk}/', pk=str(pk))
+        self.assertEqual(response.status_code, 200)
+        response = call_async_view(view, f'/api/projects/{pk}/', pk=str(pk), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(PROJECTS_RESPONSE_CACHE={'ENABLED': True})
+    def test_anonymous_response_cache(self):
+        view = ProjectListView.as_view()
+        first = call_async_view(view, '/api/projects/')
+        second = call_async_view(view, '/api/projects/')
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(first.content, second.content)
+
+    def test_other_methods_and_renderers_use_the_sync_view(self):
+        view = ProjectListView.as_view()
+        response = call_async_view(view, '/api/projects/', method='post', data={'title': 'x'})
+        self.assertEqual(response.status_code, 401)
+        response = call_async_view(
+            view, '/api/projects/', method='post', user=self.data['creator'],
+            data={
+                'title': 'Async', 'description': 'Created through the async route', 'goal_amount': '100.00',
+                'start_date': '2030-01-01T00:00:00Z', 'end_date': '2030-02-01T00:00:00Z',
+            },
+        )
+        self.assertEqual(response.status_code, 201, response.render().content)
+        response = call_async_view(view, '/api/projects/', headers={'Accept': 'text/html'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+
+
+class ResponseCacheTests(SimpleTestCase):
+    """Only the lock holder rebuilds a missing entry; everyone else waits for it or serves a stale copy."""
+
+    key = 'projects:response:test'
+
+    def setUp(self):
+        cache.clear()
+
+    def make_cache(self, **options):
+        return ResponseCache({**RESPONSE_CACHE_DEFAULTS, 'WAIT_TIMEOUT': 5.0, 'POLL_INTERVAL': 0.01, **options})
+
+    def blocking_build(self, data):
+        """A build that signals `started` and then waits for `release`, counting its calls."""
+        started, release, calls = threading.Event(), threading.Event(), []
+
+        def build():
+            calls.append(data)
+            started.set()
+            self.assertTrue(release.wait(5))
+            return data
+        return build, started, release, calls
+
+    def in_thread(self, function, *args):
+        results = []
+        thread = threading.Thread(target=lambda: results.append(function(*args)))
+        thread.start()
+        return thread, results
+
+    def test_hit_after_miss(self):
+        response_cache = self.make_cache()
+        self.assertEqual(response_cache.fetch(self.key, lambda: {'n': 1}), ({'n': 1}, MISS))
+        self.assertEqual(response_cache.fetch(self.key, lambda: {'n': 2}), ({'n': 1}, HIT))
+        # Uncacheable results are returned but not stored
+        self.assertEqual(response_cache.fetch('other', lambda: None), (None, MISS))
+        self.assertEqual(response_cache.fetch('other', lambda: {'n': 3}), ({'n': 3}, MISS))
+
+    def test_waiters_are_coalesced(self):
+        response_cache = self.make_cache()
+        build, started, release, calls = self.blocking_build({'n': 1})
+        holder, holder_result = self.in_thread(response_cache.fetch, self.key, build)
+        self.assertTrue(started.wait(5))
+
+        waiters = [self.in_thread(response_cache.fetch, self.key, build) for _ in range(3)]
+        release.set()
+        for thread, _ in [(holder, holder_result), *waiters]:
+            thread.join(5)
+        self.assertEqual(holder_result, [({'n': 1}, MISS)])
+        self.assertEqual([result for _, result in waiters], [[({'n': 1}, COALESCED)]] * 3)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(response_cache.stats()['coalesced_hits'], 3)
+
+    def test_stale_entry_served_during_rebuild(self):
+        # With no fresh period every entry is stale as soon as it is stored
+        response_cache = self.make_cache(TIMEOUT=0, STALE_TIMEOUT=30)
+        response_cache.set(self.key, {'n': 1})
+        build, started, release, calls = self.blocking_build({'n': 2})
+        holder, holder_result = self.in_thread(response_cache.fetch, self.key, build)
+        self.assertTrue(started.wait(5))
+
+        self.assertEqual(response_cache.fetch(self.key, build), ({'n': 1}, STALE))
+        release.set()
+        holder.join(5)
+        self.assertEqual(holder_result, [({'n': 2}, MISS)])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get(self.key)['data'], {'n': 2})
+
+    def test_lock_released_when_build_raises(self):
+        response_cache = self.make_cache()
+
+        def broken():
+            raise RuntimeError('database down')
+        with self.assertRaises(RuntimeError):
+            response_cache.fetch(self.key, broken)
+        self.assertIsNone(cache.get(f'{self.key}:lock'))
+        self.assertEqual(response_cache.fetch(self.key, lambda: {'n': 1}), ({'n': 1}, MISS))
+
+    def test_waiters_build_when_the_lock_holder_vanishes(self):
+        # A worker that died holding the lock leaves it until LOCK_TIMEOUT
+        response_cache = self.make_cache(LOCK_TIMEOUT=1, WAIT_TIMEOUT=0.05)
+        cache.add(f'{self.key}:lock', 1, 1)
+        self.assertEqual(response_cache.fetch(self.key, lambda: {'n': 1}), ({'n': 1}, MISS))
+        with mock.patch('time.time', return_value=time.time() + 2):
+            self.assertIsNone(cache.get(f'{self.key}:lock'))
+            self.assertTrue(cache.add(f'{self.key}:lock', 1, 1))
+
+    async def test_async_waiters_are_coalesced(self):
+        response_cache = self.make_cache()
+        release, calls = asyncio.Event(), []
+
+        async def build():
+            calls.append(1)
+            await release.wait()
+            return {'n': 1}
+
+        holder = asyncio.ensure_future(response_cache.afetch(self.key, build))
+        while not calls:
+            await asyncio.sleep(0.01)
+        waiters = [asyncio.ensure_future(response_cache.afetch(self.key, build)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        release.set()
+        self.assertEqual(await holder, ({'n': 1}, MISS))
+        self.assertEqual(await asyncio.gather(*waiters), [({'n': 1}, COALESCED)] * 3)
+        self.assertEqual(calls, [1])
+
+    async def test_async_stale_and_raising_build(self):
+        response_cache = self.make_cache(TIMEOUT=0, STALE_TIMEOUT=30)
+        await response_cache.aset(self.key, {'n': 1})
+        release = asyncio.Event()
+
+        async def build():
+            await release.wait()
+            raise RuntimeError('database down')
+
+        holder = asyncio.ensure_future(response_cache.afetch(self.key, build))
+        while await cache.aget(f'{self.key}:lock') is None:
+            await asyncio.sleep(0.01)
+        self.assertEqual(await response_cache.afetch(self.key, build), ({'n': 1}, STALE))
+        release.set()
+        with self.assertRaises(RuntimeError):
+            await holder
+        self.assertIsNone(await cache.aget(f'{self.key}:lock'))
+
+        async def rebuild():
+            return {'n': 2}
+        self.assertEqual(await response_cache.afetch(self.key, rebuild), ({'n': 2}, MISS))
+
+
+class SparseFieldsetTests(QueryBudgetTestCase):
+    """?fields= keeps only the named keys and ?expand= decides which nested relations are rendered."""
+
+    relations = {'creator', 'milestones', 'updates'}
+
+    def setUp(self):
+        super().setUp()
+        self.url = f"/api/projects/{self.data['project'].pk}/"
+        self.all_keys = set(self.client.get(self.url).data)
+
+    def keys(self, query):
+        response = self.client.get(f'{self.url}?{query}')
+        self.assertEqual(response.status_code, 200)
+        return set(response.data)
+
+    def test_fields(self):
+        self.assertEqual(self.keys('fields=id,title,status'), {'id', 'title', 'status'})
+        results = self.client.get('/api/projects/?fields=id,title,milestones_count').data['results']
+        self.assertTrue(results)
+        for row in results:
+            self.assertEqual(set(row), {'id', 'title', 'milestones_count'})
+        milestones = self.client.get('/api/projects/milestones/?fields=id,status').data['results']
+        self.assertTrue(milestones)
+        self.assertEqual({key for row in milestones for key in row}, {'id', 'status'})
+
+    def test_relations_need_expanding(self):
+        self.assertTrue(self.relations <= self.all_keys)
+        self.assertEqual(self.keys('expand=') & self.relations, set())
+        self.assertEqual(self.keys('expand=milestones') & self.relations, {'milestones'})
+        self.assertEqual(self.keys('expand=milestones') | self.relations, self.all_keys)
+        # A relation named in fields still has to be expanded
+        self.assertEqual(self.keys('fields=id,milestones&expand='), {'id'})
+        self.assertEqual(self.keys('fields=id,milestones&expand=milestones'), {'id', 'milestones'})
+
+    def test_unknown_names(self):
+        # Unknown names are ignored; a selection of nothing known keeps every field
+        self.assertEqual(self.keys('fields=id,bogus'), {'id'})
+        self.assertEqual(self.keys('fields=bogus'), self.all_keys)
+        self.assertEqual(self.keys('expand=bogus') & self.relations, set())
+        self.assertEqual(self.keys('fields=,,id,'), {'id'})
+
+
+class ProjectVersionTests(QueryBudgetTestCase):
+    """ETags come from the database, so every worker validates them the same way."""
+
+    def setUp(self):
+        self.project = self.data['project']
+        self.url = f'/api/projects/{self.project.pk}/'
+        self.etag = self.client.get(self.url)['ETag']
+
+    def assertNotModified(self, expected=True):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code == 304, expected)
+
+    def test_shared_between_workers(self):
+        # A worker with an empty cache of its own still recognises the ETag
+        cache.clear()
+        self.assertNotModified()
+
+    def test_creator_profile_change(self):
+        creator = self.project.creator
+        creator.display_name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            creator.save()
+        self.assertNotModified(False)
+
+    def test_stats_key(self):
+        url = f'/api/projects/{self.project.pk}/stats/'
+        expected = self.client.get(url).json()
+        # Another spelling of the same id is served from the same entry
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(f'/api/projects/00{self.project.pk}/stats/').json(), expected)
+        for pk in ('abc', '999999'):
+            self.assertEqual(self.client.get(f'/api/projects/{pk}/stats/').status_code, 404)
+
+    def test_days_remaining(self):
+        later = timezone.now() + timedelta(days=1, minutes=1)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertNotModified(False)
+
+
+class ListGenerationTests(QueryBudgetTestCase):
+    """Only changes to what list entries show retire the cached project lists."""
+
+    def assertListsRetired(self, write, expected=True):
+        generation = get_list_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        self.assertEqual(get_list_generation() != generation, expected)
+
+    def test_project_change(self):
+        project = self.data['project']
+        project.title = 'Renamed'
+        self.assertListsRetired(project.save)
+
+    def test_new_milestone(self):
+        milestone = self.data['milestone']
+        self.assertListsRetired(lambda: Milestone.objects.create(
+            project=milestone.project, title='Extra', description='', target_amount=Decimal('1'), order_index=99,
+        ))
+
+    def test_milestone_status(self):
+        milestone = self.data['milestone']
+        milestone.status = 'voting'
+        self.assertListsRetired(milestone.save, expected=False)
+
+    def test_vote(self):
+        vote = Vote.objects.filter(milestone=self.data['milestone']).first()
+        vote.decision = 'reject' if vote.decision == 'approve' else 'approve'
+        self.assertListsRetired(vote.save, expected=False)
+
+
+class ProjectSearchTests(APITestCase):
+    """Search filters against the index in SQL, so other filters see every match."""
+
+    def setUp(self):
+        creator = Creator.objects.create(
+            user=User.objects.create_user('maker', email='maker@example.com', password='pw', is_creator=True),
+            display_name='Maker',
+        )
+        now = timezone.now()
+        fields = dict(creator=creator, goal_amount=Decimal('1000'), start_date=now, end_date=now + timedelta(days=30))
+        Project.objects.bulk_create(
+            [Project(title=f'Solar lamp {i}', description='A solar lamp', status='active', **fields) for i in range(600)]
+            # Only mentioned in the description, so it ranks below every title match
+            + [Project(title='Lantern', description='Runs on solar power', status='funded', **fields)]
+        )
+        rebuild_index()
+
+    def test_filter_beyond_top_matches(self):
+        response = self.client.get('/api/projects/?search=solar&status=funded')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([project['title'] for project in response.json()['results']], ['Lantern'])
+        self.assertEqual(self.client.get('/api/projects/?search=solar').json()['count'], 601)
+
+    def test_best_match_first(self):
+        titles = [project['title'] for project in self.client.get('/api/projects/?search=solar&page_size=100').json()['results']]
+        self.assertTrue(all(title.startswith('Solar lamp') for title in titles))
+        self.assertEqual(self.client.get('/api/projects/?search=lantern').json()['results'][0]['title'], 'Lantern')
+
+    def search(self, query):
+        return [project['title'] for project in self.client.get(f'/api/projects/?search={query}').json()['results']]
+
+    def test_rebuild_catches_up_with_unsignalled_writes(self):
+        # A bulk update sends no post_save, and the index can lose rows behind the signals' back
+        Project.objects.filter(title='Solar lamp 7').update(title='Windmill 7', description='Wind powered')
+        remove_project(Project.objects.get(title='Lantern').pk)
+        self.assertEqual(self.search('windmill'), [])
+        self.assertEqual(self.search('lantern'), [])
+
+        out = io.StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 601 project(s).', out.getvalue())
+        self.assertEqual(self.search('windmill'), ['Windmill 7'])
+        self.assertEqual(self.search('lantern'), ['Lantern'])
+        self.assertEqual(self.search('wind'), ['Windmill 7'])
+        self.assertEqual(self.client.get('/api/projects/?search=solar').json()['count'], 600)
+
+
+class CreatorDashboardTests(QueryBudgetTestCase):
+    """The dashboard agrees with each project's stats and releases."""
+
+    def test_matches_project_stats(self):
+        from finance.models import Pledge, Release
+
+        client = self.client_for(self.data['creator'])
+        response = client.get('/api/projects/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        creator = self.data['creator'].creator_profile
+        entries = response.data['projects']
+        self.assertEqual([entry['id'] for entry in entries], list(creator.projects.values_list('id', flat=True)))
+
+        for entry in entries[:10]:
+            stats = client.get(f"/api/projects/{entry['id']}/stats/").data
+            self.assertEqual(float(entry['total_pledged']), stats['total_pledged'])
+            self.assertEqual((entry['pledges'], entry['backers']), (stats['total_pledges'], stats['total_backers']))
+            for name, count in stats['milestones'].items():
+                self.assertEqual(entry['milestones'][name], count)
+            released = Release.objects.filter(milestone__project_id=entry['id']).aggregate(
+                total=Sum('amount_released'))['total'] or Decimal('0')
+            self.assertEqual(Decimal(entry['released']), released)
+            self.assertEqual(
+                Decimal(entry['pending_release']),
+                Milestone.objects.filter(project_id=entry['id'], status='approved').aggregate(
+                    total=Sum('target_amount'))['total'] or Decimal('0'),
+            )
+
+        totals = response.data['totals']
+        self.assertEqual(totals['projects'], len(entries))
+        self.assertEqual(sum(totals['projects_by_status'].values()), len(entries))
+        self.assertEqual(totals['milestones']['total'], Milestone.objects.filter(project__creator=creator).count())
+        self.assertEqual(
+            totals['backers'],
+            Pledge.objects.filter(project__creator=creator, status='active').values('backer').distinct().count(),
+        )
+
+    def test_only_creators_have_a_dashboard(self):
+        self.assertEqual(self.client_for(self.data['backer']).get('/api/projects/dashboard/').status_code, 403)
+        self.assertEqual(self.client_for().get('/api/projects/dashboard/').status_code, 401)
+
+
+@override_settings(AUDIT_LOG_FLUSH_INTERVAL=0)
+class TrendingProjectTests(APITestCase):
+
+    def setUp(self):
+        creator = Creator.objects.create(
+            user=User.objects.create_user('maker', email='maker@example.com', password='pw', is_creator=True),
+            display_name='Maker',
+        )
+        self.backers = [User.objects.create_user(f'fan{i}', email=f'fan{i}@example.com', password='pw') for i in range(3)]
+        now = timezone.now()
+        self.projects = [
+            Project.objects.create(
+                creator=creator, title=f'Lamp {i}', description='A lamp', goal_amount=Decimal('1000'),
+                status='active', start_date=now, end_date=now + timedelta(days=30),
+            )
+            for i in range(3)
+        ]
+
+    def tearDown(self):
+        flush_audit_log()
+
+    def pledge(self, project, backer, amount):
+        self.client.force_authenticate(backer)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/projects/{project.pk}/pledge/', {'amount': amount})
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_pledges_update_the_ranking(self):
+        quiet, busy, unfunded = self.projects
+        self.pledge(quiet, self.backers[0], '50.00')
+        for backer in self.backers:
+            self.pledge(busy, backer, '200.00')
+        self.pledge(busy, self.backers[0], '100.00')
+
+        score = TrendingScore.objects.get(project=busy)
+        self.assertAlmostEqual(score.pledge_velocity, 700, places=3)
+        self.assertAlmostEqual(score.backer_growth, 3, places=3)
+        self.assertAlmostEqual(score.funding_ratio, 0.7)
+        self.assertEqual(top_project_ids(10), [busy.pk, quiet.pk])
+
+        self.client.force_authenticate(None)
+        response = self.client.get('/api/projects/trending/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data], [busy.pk, quiet.pk])
+        self.assertEqual(response.data[0]['backer_growth'], score.backer_growth)
+        self.assertEqual(len(self.client.get('/api/projects/trending/?limit=1').data), 1)
+        self.assertEqual(self.client.get('/api/projects/trending/?limit=x').status_code, 400)
+
+    def test_cancelled_pledges_leave_the_ranking(self):
+        small, big, _ = self.projects
+        self.pledge(small, self.backers[0], '100.00')
+        self.pledge(big, self.backers[1], '900.00')
+        self.assertEqual(top_project_ids(10), [big.pk, small.pk])
+
+        self.client.force_authenticate(self.backers[1])
+        pledge = Pledge.objects.get(project=big)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(f'/api/finance/pledges/{pledge.pk}/cancel/').status_code, 200)
+        score = TrendingScore.objects.get(project=big)
+        self.assertAlmostEqual(score.pledge_velocity, 0, places=3)
+        self.assertAlmostEqual(score.backer_growth, 1, places=3)
+        self.assertEqual(score.funding_ratio, 0)
+        self.assertEqual(top_project_ids(10), [small.pk, big.pk])
+
+        # Pledging again does not count the backer as new a second time
+        self.pledge(big, self.backers[1], '100.00')
+        self.assertAlmostEqual(TrendingScore.objects.get(project=big).backer_growth, 1, places=3)
+
+    def test_pledge_updates_move_the_score_by_the_difference(self):
+        project = self.projects[0]
+        self.pledge(project, self.backers[0], '100.00')
+        pledge = Pledge.objects.get(project=project)
+
+        self.client.force_authenticate(self.backers[0])
+        for amount in ('100.00', '100.00', '100.00'):
+            response = self.client.patch(f'/api/finance/pledges/{pledge.pk}/', {'amount': amount})
+            self.assertEqual(response.status_code, 200, response.data)
+        score = TrendingScore.objects.get(project=project)
+        self.assertAlmostEqual(score.pledge_velocity, 100, places=3)
+        self.assertAlmostEqual(score.backer_growth, 1, places=3)
+
+        self.assertEqual(self.client.patch(f'/api/finance/pledges/{pledge.pk}/', {'amount': '250.00'}).status_code, 200)
+        score.refresh_from_db()
+        self.assertAlmostEqual(score.pledge_velocity, 250, places=3)
+        self.assertAlmostEqual(score.backer_growth, 1, places=3)
+        self.assertEqual(self.client.patch(f'/api/finance/pledges/{pledge.pk}/', {'amount': '50.00'}).status_code, 200)
+        score.refresh_from_db()
+        self.assertAlmostEqual(score.pledge_velocity, 50, places=3)
+        self.assertAlmostEqual(score.funding_ratio, 0.05)
+        project.refresh_from_db()
+        self.assertEqual(project.total_pledged, Decimal('50.00'))
+        self.assertEqual(project.backers_count, 1)
+
+    def test_inactive_projects_get_no_row(self):
+        project = self.projects[0]
+        Project.objects.filter(pk=project.pk).update(status='draft')
+        self.assertIsNone(record_pledge(project.pk, Decimal('100.00'), True))
+        self.assertFalse(TrendingScore.objects.exists())
+
+    @override_settings(TRENDING_HALF_LIFE_HOURS=2)
+    def test_scores_decay_with_half_life(self):
+        project = self.projects[0]
+        self.pledge(project, self.backers[0], '100.00')
+        later = TrendingScore.objects.get(project=project).decayed_at + timedelta(hours=2)
+
+        self.assertEqual(decay_scores(now=later), (1, 0))
+        score = TrendingScore.objects.get(project=project)
+        self.assertAlmostEqual(score.pledge_velocity, 50, places=3)
+        self.assertAlmostEqual(score.backer_growth, 0.5, places=3)
+        self.assertEqual(score.decayed_at, later)
+
+    def test_projects_leaving_active_drop_out(self):
+        first, second, _ = self.projects
+        self.pledge(first, self.backers[0], '100.00')
+        self.pledge(second, self.backers[0], '100.00')
+
+        first.status = 'cancelled'
+        first.save()
+        self.assertEqual(top_project_ids(10), [second.pk])
+        Project.objects.filter(pk=second.pk).update(status='funded')
+        self.assertEqual(decay_scores(), (0, 1))
+        self.assertFalse(TrendingScore.objects.exists())
+
+    def test_rebuild_matches_incremental_scores(self):
+        for project, backer, amount in ((0, 0, '10.00'), (0, 1, '30.00'), (1, 0, '500.00'), (1, 0, '20.00')):
+            self.pledge(self.projects[project], self.backers[backer], amount)
+        incremental = {row.project_id: row for row in TrendingScore.objects.all()}
+
+        self.assertEqual(rebuild_scores(), 2)
+        for row in TrendingScore.objects.all():
+            expected = incremental[row.project_id]
+            self.assertAlmostEqual(row.pledge_velocity, expected.pledge_velocity, places=2)
+            self.assertAlmostEqual(row.backer_growth, expected.backer_growth, places=3)
+            self.assertAlmostEqual(row.score, expected.score, places=3)
+
+
+@override_settings(AUDIT_LOG_FLUSH_INTERVAL=0)
+class SweeperTests(APITestCase):
+    """Expired projects leave active status whether or not they reached their goal."""
+
+    def setUp(self):
+        creator = Creator.objects.create(
+            user=User.objects.create_user('maker', email='maker@example.com', password='pw', is_creator=True),
+            display_name='Maker',
+        )
+        backer = User.objects.create_user('fan', email='fan@example.com', password='pw')
+        now = timezone.now()
+        self.missed, self.reached, self.running = [
+            Project.objects.create(
+                creator=creator, title=title, description='A lamp', goal_amount=Decimal('100'),
+                status='active', start_date=now - timedelta(days=30), end_date=end_date,
+            )
+            for title, end_date in (('Missed', now - timedelta(days=1)), ('Reached', now - timedelta(days=1)),
+                                    ('Running', now + timedelta(days=1)))
+        ]
+        for project, amount in ((self.missed, '40'), (self.reached, '150')):
+            Pledge.objects.create(project=project, backer=backer, amount=Decimal(amount))
+        Project.rebuild_funding_counters()
+
+    def tearDown(self):
+        flush_audit_log()
+
+    def test_sweep(self):
+        self.assertEqual(sweep_expired_projects(), ([self.missed.pk], [self.reached.pk]))
+        statuses = dict(Project.objects.values_list('pk', 'status'))
+        self.assertEqual(
+            [statuses[project.pk] for project in (self.missed, self.reached, self.running)],
+            ['failed', 'goal_reached', 'active'],
+        )
+        self.assertEqual(list(RefundBatch.objects.values_list('project_id', flat=True)), [self.missed.pk])
+        # Nothing is left for the next run to look at
+        self.assertFalse(expired_projects().exists())
+        self.assertEqual(sweep_expired_projects(), ([], []))
+
+    def test_goal_met_is_funded_once_milestones_are_paid(self):
+        first, second = [
+            Milestone.objects.create(
+                project=self.reached, title=title, description='', target_amount=Decimal('50'), order_index=index,
+                status=status,
+            )
+            for index, (title, status) in enumerate((('Design', 'approved'), ('Build', 'pending')))
+        ]
+        sweep_expired_projects()
+        self.reached.refresh_from_db()
+        self.assertEqual(self.reached.status, 'goal_reached')
+
+        # Closed to new pledges, but its milestones still pay out
+        self.client.force_authenticate(User.objects.get(username='fan'))
+        self.assertEqual(self.client.post(f'/api/projects/{self.reached.pk}/pledge/', {'amount': '10'}).status_code, 400)
+        admin = User.objects.create_user('admin', email='admin@example.com', password='pw', is_admin=True, is_staff=True)
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.post(f'/api/finance/releases/milestone/{first.pk}/').status_code, 201)
+        self.reached.refresh_from_db()
+        self.assertEqual(self.reached.status, 'goal_reached')
+
+        Milestone.objects.filter(pk=second.pk).update(status='approved')
+        self.assertEqual(self.client.post(f'/api/finance/releases/milestone/{second.pk}/').status_code, 201)
+        self.reached.refresh_from_db()
+        self.assertEqual(self.reached.status, 'funded')
+
+
+@override_settings(AUDIT_LOG_FLUSH_INTERVAL=0)
+class MilestonePlanTests(APITestCase):
+    """A bulk milestone plan is validated and written as a unit."""
+
+    def setUp(self):
+        self.maker = User.objects.create_user('maker', email='maker@example.com', password='pw', is_creator=True)
+        creator = Creator.objects.create(user=self.maker, display_name='Maker')
+        now = timezone.now()
+        self.project = Project.objects.create(
+            creator=creator, title='Lamp', description='A lamp', goal_amount=Decimal('1000'),
+            status='active', start_date=now, end_date=now + timedelta(days=30),
+        )
+        Milestone.objects.create(
+            project=self.project, title='Design', description='', target_amount=Decimal('200'), order_index=1,
+        )
+        self.url = f'/api/projects/{self.project.pk}/milestones/'
+        self.client.force_authenticate(self.maker)
+
+    def tearDown(self):
+        flush_audit_log()
+
+    def plan(self, *items):
+        milestones = [
+            {'title': f'Stage {order_index}', 'description': 'Deliverables', 'target_amount': amount, 'order_index': order_index}
+            for order_index, amount in items
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, {'milestones': milestones}, format='json')
+
+    def assertMilestones(self, order_indexes):
+        milestones = Milestone.objects.filter(project=self.project).order_by('order_index')
+        self.assertEqual(list(milestones.values_list('order_index', flat=True)), order_indexes)
+
+    def test_valid_plan(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.plan((2, '300.00'), (3, '500.00'))
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual([item['order_index'] for item in response.data], [2, 3])
+        self.assertMilestones([1, 2, 3])
+        # Both rows go in with one INSERT
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "projects_milestone"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_plan_is_one_transaction(self):
+        with mock.patch('projects.views.audit', side_effect=RuntimeError('audit down')):
+            with self.assertRaises(RuntimeError):
+                self.plan((2, '300.00'), (3, '500.00'))
+        self.assertMilestones([1])
+
+    def test_duplicate_order_index(self):
+        response = self.plan((2, '100.00'), (2, '100.00'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('appears more than once', str(response.data))
+        self.assertMilestones([1])
+
+    def test_existing_order_index(self):
+        response = self.plan((1, '100.00'), (2, '100.00'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('already used', str(response.data['milestones'][0]))
+        self.assertEqual(response.data['milestones'][1], {})
+        self.assertMilestones([1])
+
+    def test_total_over_goal(self):
+        # 200 already planned, so 801 more is one over the goal
+        response = self.plan((2, '400.00'), (3, '401.00'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('exceeds the project goal', str(response.data))
+        self.assertMilestones([1])
+        self.assertEqual(self.plan((2, '400.00'), (3, '400.00')).status_code, 201)
+
+    def test_empty_plan(self):
+        response = self.plan()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('milestones', response.data)
+        self.assertMilestones([1])
+
+    def test_other_users_are_forbidden(self):
+        self.client.force_authenticate(User.objects.create_user('fan', email='fan@example.com', password='pw'))
+        self.assertEqual(self.plan((2, '100.00')).status_code, 403)
+        self.assertMilestones([1])
+
+    def test_invalidates_project_caches(self):
+        version = get_project_version(self.project.pk)['version']
+        generation = get_list_generation()
+        self.client.force_authenticate(None)
+        before = self.client.get(f'/api/projects/{self.project.pk}/')
+        self.assertEqual(len(before.data['milestones']), 1)
+
+        self.client.force_authenticate(self.maker)
+        self.assertEqual(self.plan((2, '100.00')).status_code, 201)
+        self.assertNotEqual(get_project_version(self.project.pk)['version'], version)
+        self.assertNotEqual(get_list_generation(), generation)
+        self.client.force_authenticate(None)
+        after = self.client.get(f'/api/projects/{self.project.pk}/', HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(len(after.data['milestones']), 2)
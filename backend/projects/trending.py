@@ -0,0 +1,224 @@
+"""
+Trending projects: a momentum score maintained as pledges arrive.
+
+Each active project with pledges has a TrendingScore row holding
+
+- pledge_velocity: pledged amounts, each losing half its weight every
+  TRENDING_HALF_LIFE_HOURS
+- backer_growth: new backers, decayed the same way
+- funding_ratio: total pledged over the goal
+
+and a `score` combining them (see `compute_score`). `record_pledge`
+updates the project's row inside the pledge transaction, decaying it to the
+present first, so a pledge costs one row lock and one write and no
+aggregation over pledges. `record_pledge_removal` takes a cancelled,
+refunded or deleted pledge back out the same way, minus however much of it
+has decayed since it arrived, and a changed amount moves the score by the
+difference only. A backer counts towards growth once, on their first
+pledge to the project. `decay_scores`, run periodically by
+`manage.py decay_trending_scores`, decays the rows that have had no pledge
+since; between runs a quiet project's score is overstated by at most one
+interval's decay.
+
+Only active projects have a row: a project's row is dropped as soon as it
+leaves that status (and the periodic job catches any bulk update that
+sends no signal). Reads can therefore take the first k entries of the
+score index without filtering, so the top k projects cost O(k).
+`rebuild_scores` recomputes every row from pledge history.
+"""
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import bump_list_generation
+from .models import Project, TrendingScore
+
+CHUNK_SIZE = 500
+DEFAULT_WEIGHTS = {'velocity': 1.0, 'backers': 1.0, 'funding': 2.0}
+
+
+def half_life_seconds():
+    return getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24) * 3600
+
+
+def decay_factor(since, now):
+    """Share of a contribution made at `since` that is left at `now`."""
+    elapsed = max(0.0, (now - since).total_seconds())
+    return 0.5 ** (elapsed / half_life_seconds())
+
+
+def funding_ratio(total_pledged, goal_amount):
+    return float(total_pledged) / float(goal_amount) if goal_amount else 0.0
+
+
+def compute_score(pledge_velocity, backer_growth, ratio):
+    """
+    Weighted sum of the components (weights from TRENDING_WEIGHTS).
+
+    Velocity and backer growth are log-scaled so a single large pledge
+    cannot bury every other project, and the funding ratio is capped at 1
+    so projects past their goal stop gaining from it.
+    """
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'TRENDING_WEIGHTS', {})}
+    return (
+        weights['velocity'] * math.log1p(pledge_velocity)
+        + weights['backers'] * math.log1p(backer_growth)
+        + weights['funding'] * min(ratio, 1.0)
+    )
+
+
+def _decay(row, now):
+    if row.decayed_at >= now:
+        return
+    factor = decay_factor(row.decayed_at, now)
+    row.pledge_velocity *= factor
+    row.backer_growth *= factor
+    row.decayed_at = now
+
+
+def _rescore(row):
+    row.score = compute_score(row.pledge_velocity, row.backer_growth, row.funding_ratio)
+
+
+@transaction.atomic
+def record_pledge(project_id, amount, new_backer, now=None):
+    """
+    Count a new pledge, or a raise of an existing one by `amount`, in its project's trending score and return the row.
+
+    `new_backer` is set only for the backer's first pledge to the project.
+    Call it after the pledge is added to the project's funding counters,
+    in the same transaction.
+    """
+    now = now or timezone.now()
+    project = Project.objects.filter(pk=project_id).values('total_pledged', 'goal_amount', 'status').first()
+    # Only active projects are ranked
+    if project is None or project['status'] != 'active':
+        return None
+    row, _ = TrendingScore.objects.select_for_update().get_or_create(
+        project_id=project_id, defaults={'decayed_at': now}
+    )
+    _decay(row, now)
+    row.pledge_velocity += float(amount)
+    row.backer_growth += 1 if new_backer else 0
+    row.funding_ratio = funding_ratio(project['total_pledged'], project['goal_amount'])
+    _rescore(row)
+    row.save()
+    return row
+
+
+@transaction.atomic
+def record_pledge_removal(project_id, amount, pledged_at, now=None):
+    """
+    Take `amount` of a pledge made at `pledged_at` back out of its project's trending score and return the row.
+
+    Used when a pledge is cancelled, refunded or deleted, or lowered by
+    `amount`. The backer keeps counting towards growth, as the backer is
+    never counted as new again. Call it after the project's funding counters
+    change, in the same transaction. Projects without a row (not active)
+    are left alone.
+    """
+    now = now or timezone.now()
+    project = Project.objects.filter(pk=project_id).values('total_pledged', 'goal_amount').first()
+    row = TrendingScore.objects.select_for_update().filter(project_id=project_id).first()
+    if project is None or row is None:
+        return None
+    _decay(row, now)
+    # What is left of the pledge's contribution; clamped, since rounding or a
+    # rebuilt history can leave less in the row than the pledge ever added
+    factor = decay_factor(pledged_at, now) if pledged_at else 1.0
+    row.pledge_velocity = max(0.0, row.pledge_velocity - float(amount) * factor)
+    row.funding_ratio = funding_ratio(project['total_pledged'], project['goal_amount'])
+    _rescore(row)
+    row.save()
+    return row
+
+
+def decay_scores(now=None, chunk_size=CHUNK_SIZE):
+    """
+    Decay every score to `now`, refresh funding ratios and drop rows of
+    projects that are no longer active. Returns (decayed, removed).
+
+    Rows are processed in primary key chunks, each locked and written in
+    its own transaction, so pledges are only held up for one chunk.
+    """
+    now = now or timezone.now()
+    removed, _ = TrendingScore.objects.exclude(project__status='active').delete()
+    decayed = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                TrendingScore.objects.select_for_update(of=('self',))
+                .filter(project_id__gt=last_pk)
+                .annotate(total_pledged=F('project__total_pledged'), goal_amount=F('project__goal_amount'))
+                .order_by('project_id')[:chunk_size]
+            )
+            if not rows:
+                break
+            for row in rows:
+                _decay(row, now)
+                row.funding_ratio = funding_ratio(row.total_pledged, row.goal_amount)
+                _rescore(row)
+            TrendingScore.objects.bulk_update(
+                rows, ['pledge_velocity', 'backer_growth', 'funding_ratio', 'score', 'decayed_at']
+            )
+        decayed += len(rows)
+        last_pk = rows[-1].project_id
+    if decayed or removed:
+        bump_list_generation()
+    return decayed, removed
+
+
+@transaction.atomic
+def rebuild_scores(now=None):
+    """
+    Recompute every score from the pledge history of active projects.
+    Returns the number of rows written.
+
+    Every active pledge counts towards velocity as it did when it arrived,
+    and a backer's first pledge in a project, whatever its status now,
+    counts towards backer growth.
+    """
+    from finance.models import Pledge
+
+    now = now or timezone.now()
+    rows = {}
+    seen_backers = set()
+    pledges = Pledge.objects.filter(project__status='active').order_by('created_at', 'id').values_list(
+        'project_id', 'backer_id', 'amount', 'status', 'created_at'
+    )
+    for project_id, backer_id, amount, status, created_at in pledges.iterator(chunk_size=2000):
+        factor = decay_factor(created_at, now)
+        row = rows.get(project_id)
+        if row is None:
+            row = rows[project_id] = TrendingScore(project_id=project_id, decayed_at=now)
+        if status == 'active':
+            row.pledge_velocity += float(amount) * factor
+        if (project_id, backer_id) not in seen_backers:
+            seen_backers.add((project_id, backer_id))
+            row.backer_growth += factor
+
+    for project_id, total_pledged, goal_amount in Project.objects.filter(pk__in=rows).values_list(
+        'pk', 'total_pledged', 'goal_amount'
+    ):
+        row = rows[project_id]
+        row.funding_ratio = funding_ratio(total_pledged, goal_amount)
+        _rescore(row)
+
+    TrendingScore.objects.all().delete()
+    TrendingScore.objects.bulk_create(rows.values(), batch_size=500)
+    transaction.on_commit(bump_list_generation)
+    return len(rows)
+
+
+def top_project_ids(limit):
+    """Ids of the `limit` highest-scoring projects, read off the score index."""
+    return list(TrendingScore.objects.order_by('-score', 'project_id').values_list('project_id', flat=True)[:limit])
+
+
+def drop_scores(project_ids):
+    """Remove projects that are no longer active from the ranking."""
+    TrendingScore.objects.filter(project_id__in=project_ids).delete()
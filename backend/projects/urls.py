@@ -1,7 +1,8 @@
 """
 URLs for project-related endpoints.
 """
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from .views import ProjectViewSet, MilestoneViewSet, UpdateViewSet
 
@@ -14,4 +15,12 @@ urlpatterns = [
     path('', include(router.urls)),
 ]
 
+if settings.ASYNC_READ_VIEWS:
+    from .async_views import MilestoneListView, ProjectDetailView, ProjectListView
 
+    # Ahead of the router, which still serves every other route and method
+    urlpatterns = [
+        path('', ProjectListView.as_view()),
+        re_path(r'^(?P<pk>\d+)/$', ProjectDetailView.as_view()),
+        path('milestones/', MilestoneListView.as_view()),
+    ] + urlpatterns
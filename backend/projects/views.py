@@ -4,22 +4,149 @@ Views for project-related endpoints.
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
-from drf_spectacular.utils import extend_schema, extend_schema_view
-from django.db.models import Q
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly, SAFE_METHODS
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.http import Http404
+from django.utils.cache import get_conditional_response
 from .models import Project, Milestone, Update
-from .serializers import ProjectSerializer, ProjectListSerializer, MilestoneSerializer, UpdateSerializer
+from .serializers import (
+    CreatorDashboardSerializer, DynamicFieldsMixin, ProjectSerializer, ProjectListSerializer, MilestoneSerializer, MilestonePlanSerializer,
+    TrendingProjectSerializer, UpdateSerializer
+)
+from .cache import (
+    invalidate_project, get_project_stats, set_project_stats, get_project_version, get_list_generation, project_validators
+)
+from .response_cache import get_response_cache
+from .dashboard import creator_dashboard
+from .search import search_projects
+from .trending import top_project_ids
 from users.models import Creator
+from config.db_router import primary_if_changed_since
+from config.pagination import OptInCursorPagination
+from config.row_serializers import RowListMixin
+from config.throttling import PledgeRateThrottle
+from governance.audit import audit, audited
+
+
+def _split_param(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class SparseFieldsetMixin:
+    """
+    ViewSet mixin that reads `?fields=` and `?expand=` on safe requests.
+
+    The selection is passed to serializers built on DynamicFieldsMixin and,
+    for the actions in `sparse_queryset_actions`, to their `prepare_queryset`
+    so the SQL only loads what will be rendered.
+    """
+    sparse_queryset_actions = ('list', 'retrieve')
+
+    def get_sparse_fieldset(self):
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in SAFE_METHODS:
+            return None, None
+        fields = request.query_params.get('fields')
+        expand = request.query_params.get('expand')
+        return (
+            _split_param(fields) if fields is not None else None,
+            _split_param(expand) if expand is not None else None,
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.get_serializer_class(), DynamicFieldsMixin):
+            fields, expand = self.get_sparse_fieldset()
+            kwargs.setdefault('fields', fields)
+            kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def prepare_queryset(self, queryset):
+        serializer_class = self.get_serializer_class()
+        if self.action not in self.sparse_queryset_actions or not issubclass(serializer_class, DynamicFieldsMixin):
+            return queryset
+        fields, expand = self.get_sparse_fieldset()
+        return serializer_class.prepare_queryset(queryset, fields, expand)
+
+
+def conditional_project_response(request, project_id, build_response):
+    """
+    Serve a read of project data with conditional GET support.
+
+    When the client's If-None-Match / If-Modified-Since validators match the
+    project's version, answer 304 after a single version lookup. Otherwise
+    call `build_response(version)` (version None if there is no such
+    project) and attach ETag and Last-Modified.
+    """
+    try:
+        project_id = int(project_id)
+    except (TypeError, ValueError):
+        return build_response(None)
+
+    # Take the version before building so a concurrent write can only make it stale
+    version = get_project_version(project_id)
+    if version is None:
+        return build_response(None)
+    etag, last_modified = project_validators(version, request)
+    conditional = get_conditional_response(request, etag=etag, last_modified=version['modified'])
+    if conditional is not None and conditional.status_code == status.HTTP_304_NOT_MODIFIED:
+        return Response(
+            status=status.HTTP_304_NOT_MODIFIED,
+            headers={'ETag': etag, 'Last-Modified': last_modified}
+        )
+
+    with primary_if_changed_since(version['modified']):
+        response = build_response(version)
+    if response.status_code == status.HTTP_200_OK:
+        response['ETag'], response['Last-Modified'] = project_validators(version, request)
+    return response
+
+
+def cached_anonymous_response(request, generation, build_response):
+    """
+    Serve an anonymous read from the response cache, filling it on a miss.
+
+    Authenticated requests always go to `build_response`, since they may be
+    shaped by the user. `generation` is baked into the key, so moving it on
+    (see `projects.cache`) retires every entry built from older data.
+    Concurrent misses on one key are coalesced into a single build.
+    """
+    response_cache = get_response_cache()
+    if response_cache is None or request.user.is_authenticated:
+        return build_response()
+
+    built = {}
+
+    def build():
+        response = built['response'] = build_response()
+        return response.data if response.status_code == status.HTTP_200_OK else None
+
+    data, state = response_cache.fetch(response_cache.make_key(request, generation), build)
+    response = built.get('response')
+    if response is None:
+        return Response(data, headers={'X-Cache': state})
+    if response.status_code == status.HTTP_200_OK:
+        response['X-Cache'] = state
+    return response
+
+
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter('fields', str, description='Comma-separated list of fields to return.'),
+    OpenApiParameter('expand', str, description='Comma-separated list of nested relations to include.'),
+]
 
 
 @extend_schema_view(
     list=extend_schema(
         summary="List all projects",
         description="Retrieve a list of projects with optional filtering by status, creator, or search query.",
+        parameters=SPARSE_FIELDSET_PARAMETERS,
     ),
     retrieve=extend_schema(
         summary="Get project details",
         description="Retrieve detailed information about a specific project including milestones and updates.",
+        parameters=SPARSE_FIELDSET_PARAMETERS,
     ),
     create=extend_schema(
         summary="Create a new project",
@@ -34,14 +161,21 @@ from users.models import Creator
         description="Delete a project. Only the creator can delete their own projects.",
     ),
 )
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(SparseFieldsetMixin, RowListMixin, viewsets.ModelViewSet):
     """ViewSet for Project model."""
     queryset = Project.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-created_at', '-id')
+    sparse_queryset_actions = ('list', 'retrieve', 'trending')
+    trending_default_limit = 10
+    trending_max_limit = 100
 
     def get_serializer_class(self):
         if self.action == 'list':
             return ProjectListSerializer
+        if self.action == 'trending':
+            return TrendingProjectSerializer
         return ProjectSerializer
 
     def get_queryset(self):
@@ -55,17 +189,49 @@ class ProjectViewSet(viewsets.ModelViewSet):
         if creator_id:
             queryset = queryset.filter(creator_id=creator_id)
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | Q(description__icontains=search)
+            matches = search_projects(queryset, search)
+            if matches is None:
+                queryset = queryset.filter(
+                    Q(title__icontains=search) | Q(description__icontains=search)
+                )
+            else:
+                queryset = matches
+
+        return self.prepare_queryset(queryset)
+
+    def list(self, request, *args, **kwargs):
+        generation = get_list_generation()
+        with primary_if_changed_since(generation / 1e9):
+            return cached_anonymous_response(
+                request, f'list:{generation}',
+                lambda: super(ProjectViewSet, self).list(request, *args, **kwargs)
             )
 
-        return queryset
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_field]
+
+        def build_response(version):
+            uncached = lambda: super(ProjectViewSet, self).retrieve(request, *args, **kwargs)
+            if version is None:
+                return uncached()
+            return cached_anonymous_response(request, f'project:{pk}:{version["version"]}', uncached)
 
+        return conditional_project_response(request, pk, build_response)
+
+    @audited('project.created', 'title', 'goal_amount', actor_type='creator')
     def perform_create(self, serializer):
         """Create project and associate with creator."""
         creator, _ = Creator.objects.get_or_create(user=self.request.user)
         serializer.save(creator=creator)
 
+    @audited('project.updated', 'title', 'goal_amount', 'status')
+    def perform_update(self, serializer):
+        serializer.save()
+
+    @audited('project.deleted', 'title')
+    def perform_destroy(self, instance):
+        instance.delete()
+
     @extend_schema(
         summary="Activate a project",
         description="Activate a draft project, making it visible to backers. Only the creator can activate their own projects.",
@@ -87,6 +253,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             )
         project.status = 'active'
         project.save()
+        audit('project.activated', project, request.user, actor_type='creator')
         return Response({'status': 'Project activated'})
 
     @extend_schema(
@@ -110,6 +277,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             )
         project.status = 'draft'
         project.save()
+        audit('project.deactivated', project, request.user, actor_type='creator')
         return Response({'status': 'Project deactivated'})
 
     @extend_schema(
@@ -128,7 +296,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         },
         responses={201: {'description': 'Pledge created successfully'}},
     )
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated], throttle_classes=[PledgeRateThrottle])
     def pledge(self, request, pk=None):
         """Create a pledge for this project."""
         project = self.get_object()
@@ -149,10 +317,55 @@ class ProjectViewSet(viewsets.ModelViewSet):
         })
         
         if serializer.is_valid():
-            pledge = serializer.save(backer=request.user)
+            with transaction.atomic():
+                pledge = serializer.save(backer=request.user)
+                pledge.add_to_project_counters()
+                audit('pledge.created', pledge, request.user, actor_type='backer', project_id=project.pk, amount=pledge.amount)
+            pledge.project.refresh_from_db()
             return Response(PledgeSerializer(pledge).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(
+        summary="Create milestones in bulk",
+        description=(
+            "Create a project's whole milestone plan in one request. The plan is validated as a unit: "
+            "order_index values must not repeat or clash with existing milestones, and the combined "
+            "target amounts (including existing milestones) must not exceed the project goal. "
+            "Only the creator can add milestones."
+        ),
+        request=MilestonePlanSerializer,
+        responses={201: MilestoneSerializer(many=True)},
+    )
+    @action(detail=True, methods=['post'], url_path='milestones', permission_classes=[IsAuthenticated])
+    def bulk_milestones(self, request, pk=None):
+        """Create several milestones for this project at once."""
+        project = self.get_object()
+        if project.creator.user != request.user:
+            return Response(
+                {'error': 'Only the creator can add milestones to this project'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            with transaction.atomic():
+                # Lock the project so concurrent plans are validated one after the other
+                project = Project.objects.select_for_update().get(pk=project.pk)
+                serializer = MilestonePlanSerializer(data=request.data, context={'project': project})
+                serializer.is_valid(raise_exception=True)
+                milestones = serializer.save()
+                # bulk_create sends no post_save, so drop the project's caches here
+                transaction.on_commit(lambda: invalidate_project(project.pk))
+                audit(
+                    'project.milestones_created', project, request.user, actor_type='creator',
+                    milestone_ids=[milestone.pk for milestone in milestones],
+                )
+        except IntegrityError:
+            return Response(
+                {'error': 'Milestone order_index values must be unique within a project'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(MilestoneSerializer(milestones, many=True).data, status=status.HTTP_201_CREATED)
+
     @extend_schema(
         summary="Get my projects",
         description="Get all projects created by the current authenticated user.",
@@ -164,10 +377,63 @@ class ProjectViewSet(viewsets.ModelViewSet):
         if not hasattr(request.user, 'creator_profile'):
             return Response([], status=status.HTTP_200_OK)
         creator = request.user.creator_profile
-        queryset = Project.objects.filter(creator=creator)
+        queryset = ProjectSerializer.prepare_queryset(Project.objects.filter(creator=creator))
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    @extend_schema(
+        summary="Get the creator dashboard",
+        description=(
+            "Funding and milestone figures for all of the current creator's projects in one response: "
+            "pledged totals, pledge and backer counts, milestone status histograms, amounts approved and "
+            "awaiting release, released and still in escrow, plus totals across the projects."
+        ),
+        responses={200: CreatorDashboardSerializer},
+    )
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def dashboard(self, request):
+        """Summarise the current creator's projects."""
+        if not hasattr(request.user, 'creator_profile'):
+            return Response(
+                {'error': 'Only creators have a dashboard'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(CreatorDashboardSerializer(creator_dashboard(request.user.creator_profile)).data)
+
+    @extend_schema(
+        summary="Get trending projects",
+        description=(
+            "Active projects ranked by momentum: recent pledge volume and new backers, both decaying with a "
+            "half-life of TRENDING_HALF_LIFE_HOURS, plus the funding ratio. Returns the top `limit` projects "
+            "(default 10, at most 100) from a precomputed score table."
+        ),
+        parameters=[
+            OpenApiParameter('limit', int, description='Number of projects to return (1-100, default 10).'),
+        ] + SPARSE_FIELDSET_PARAMETERS,
+        responses={200: TrendingProjectSerializer(many=True)},
+    )
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Get the top trending projects."""
+        try:
+            limit = int(request.query_params.get('limit', self.trending_default_limit))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, self.trending_max_limit))
+
+        def build_response():
+            ids = top_project_ids(limit)
+            projects = {
+                project.pk: project
+                for project in self.prepare_queryset(Project.objects.filter(pk__in=ids, status='active'))
+            }
+            ranked = [projects[pk] for pk in ids if pk in projects]
+            return Response(self.get_serializer(ranked, many=True).data)
+
+        generation = get_list_generation()
+        with primary_if_changed_since(generation / 1e9):
+            return cached_anonymous_response(request, f'trending:{generation}', build_response)
+
     @extend_schema(
         summary="Get project statistics",
         description="Retrieve statistics about a project including total pledged, backers count, and milestone status.",
@@ -176,28 +442,67 @@ class ProjectViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def stats(self, request, pk=None):
         """Get project statistics."""
-        project = self.get_object()
-        from finance.models import Pledge
-        from governance.models import Vote
+        # One cache entry per project, however the id is spelled in the URL
+        try:
+            project_id = int(pk)
+        except (TypeError, ValueError):
+            raise Http404
+        version = get_project_version(project_id)
+        if version is None:
+            raise Http404
+        stats = get_project_stats(project_id, version)
+        if stats is not None:
+            return Response(stats)
+        # Stats are cached until the next write, so never rebuild them from a lagging replica
+        with primary_if_changed_since(version['modified']):
+            return self._build_stats(project_id, version)
 
+    def _build_stats(self, project_id, version):
+        """Compute a project's stats payload and cache it."""
+        milestones = {
+            name: Count('milestones', filter=Q(milestones__status=name))
+            for name in ('approved', 'rejected', 'pending', 'voting')
+        }
+        row = Project.objects.filter(pk=project_id).values(
+            'total_pledged', 'goal_amount', 'active_pledge_count', 'backers_count'
+        ).annotate(milestones_total=Count('milestones'), **milestones).order_by('pk').first()
+        if row is None:
+            raise Http404
+
+        goal_amount = float(row['goal_amount'])
+        total_pledged = float(row['total_pledged'])
         stats = {
-            'total_pledged': float(project.total_pledged),
-            'goal_amount': float(project.goal_amount),
-            'progress_percentage': project.progress_percentage,
-            'total_pledges': Pledge.objects.filter(project=project, status='active').count(),
-            'total_backers': Pledge.objects.filter(project=project, status='active').values('backer').distinct().count(),
+            'total_pledged': total_pledged,
+            'goal_amount': goal_amount,
+            'progress_percentage': min(100, (total_pledged / goal_amount) * 100) if goal_amount else 0,
+            'total_pledges': row['active_pledge_count'],
+            'total_backers': row['backers_count'],
             'milestones': {
-                'total': project.milestones.count(),
-                'approved': project.milestones.filter(status='approved').count(),
-                'rejected': project.milestones.filter(status='rejected').count(),
-                'pending': project.milestones.filter(status='pending').count(),
-                'voting': project.milestones.filter(status='voting').count(),
+                'total': row['milestones_total'],
+                'approved': row['approved'],
+                'rejected': row['rejected'],
+                'pending': row['pending'],
+                'voting': row['voting'],
             }
         }
+        set_project_stats(project_id, version, stats)
         return Response(stats)
 
+    @extend_schema(
+        summary="Get response cache statistics",
+        description="Hit and miss counters of this process's anonymous response cache. Admin only.",
+        responses={200: {'description': 'Response cache statistics'}},
+    )
+    @action(detail=False, methods=['get'], url_path='cache-stats', permission_classes=[IsAdminUser])
+    def cache_stats(self, request):
+        """Get response cache hit/miss counters."""
+        response_cache = get_response_cache()
+        if response_cache is None:
+            return Response({'enabled': False})
+        return Response({'enabled': True, **response_cache.stats()})
 
-class MilestoneViewSet(viewsets.ModelViewSet):
+
+class MilestoneViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for Milestone model."""
     queryset = Milestone.objects.all()
     serializer_class = MilestoneSerializer
@@ -213,7 +518,28 @@ class MilestoneViewSet(viewsets.ModelViewSet):
                 queryset = queryset.filter(project_id__in=ids)
             else:
                 queryset = queryset.filter(project_id=project_id)
-        return queryset
+        return self.prepare_queryset(queryset)
+
+    def list(self, request, *args, **kwargs):
+        project_id = request.query_params.get('project', '')
+        if not project_id.isdigit():
+            return super().list(request, *args, **kwargs)
+        return conditional_project_response(
+            request, project_id,
+            lambda version: super(MilestoneViewSet, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_field]
+        project_id = None
+        if pk.isdigit():
+            project_id = Milestone.objects.filter(pk=pk).values_list('project_id', flat=True).first()
+        if project_id is None:
+            return super().retrieve(request, *args, **kwargs)
+        return conditional_project_response(
+            request, project_id,
+            lambda version: super(MilestoneViewSet, self).retrieve(request, *args, **kwargs)
+        )
 
     @action(detail=True, methods=['post'])
     def activate(self, request, pk=None):
@@ -239,6 +565,7 @@ class MilestoneViewSet(viewsets.ModelViewSet):
             
         milestone.is_activated = True
         milestone.save()
+        audit('milestone.activated', milestone, request.user, actor_type='creator', project_id=milestone.project_id)
         return Response({'status': 'Milestone activated'})
 
     def destroy(self, request, *args, **kwargs):
@@ -250,7 +577,19 @@ class MilestoneViewSet(viewsets.ModelViewSet):
             )
         return super().destroy(request, *args, **kwargs)
 
-    @action(detail=True, methods=['post'])
+    @audited('milestone.created', 'project_id', 'target_amount', actor_type='creator')
+    def perform_create(self, serializer):
+        serializer.save()
+
+    @audited('milestone.updated', 'project_id', 'target_amount', 'status', actor_type='creator')
+    def perform_update(self, serializer):
+        serializer.save()
+
+    @audited('milestone.deleted', 'project_id', actor_type='creator')
+    def perform_destroy(self, instance):
+        instance.delete()
+
+    @action(detail=True, methods=['post'], throttle_classes=[PledgeRateThrottle])
     def pledge(self, request, pk=None):
         """
         Initiate a pledge for the project associated with this milestone.
@@ -301,10 +640,11 @@ class MilestoneViewSet(viewsets.ModelViewSet):
             )
         milestone.status = 'voting'
         milestone.save()
+        audit('milestone.voting_opened', milestone, request.user, actor_type='creator', project_id=milestone.project_id)
         return Response({'status': 'Voting opened'})
 
 
-class UpdateViewSet(viewsets.ModelViewSet):
+class UpdateViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet for Update model."""
     queryset = Update.objects.all()
     serializer_class = UpdateSerializer
@@ -315,8 +655,9 @@ class UpdateViewSet(viewsets.ModelViewSet):
         project_id = self.request.query_params.get('project', None)
         if project_id:
             queryset = queryset.filter(project_id=project_id)
-        return queryset
+        return self.prepare_queryset(queryset)
 
+    @audited('update.created', 'project_id', 'title', actor_type='creator')
     def perform_create(self, serializer):
         """Create update and associate with user."""
         serializer.save(created_by=self.request.user)
@@ -0,0 +1,17 @@
+"""
+Query budgets for user endpoints.
+"""
+from config.testing import QueryBudgetTestCase
+
+
+class UserQueryBudgetTests(QueryBudgetTestCase):
+    """Fixed query budgets for the users API."""
+
+    def test_me(self):
+        self.assertQueryBudget('/api/users/me/', 0, user=self.data['backer'], page_sizes=())
+
+    def test_user_list(self):
+        self.assertQueryBudget('/api/users/', 2, user=self.data['admin'], min_results=50)
+
+    def test_creator_list(self):
+        self.assertQueryBudget('/api/users/creators/', 2, user=self.data['backer'], min_results=4)
@@ -6,8 +6,9 @@ from rest_framework.routers import DefaultRouter
 from .views import UserViewSet, CreatorViewSet
 
 router = DefaultRouter()
-router.register(r'', UserViewSet, basename='user')
+# creators/ first, otherwise the user detail route captures it as a pk
 router.register(r'creators', CreatorViewSet, basename='creator')
+router.register(r'', UserViewSet, basename='user')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -69,7 +69,7 @@ class CreatorViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         if self.request.user.is_creator:
-            return Creator.objects.filter(user=self.request.user)
-        return Creator.objects.all()
+            return Creator.objects.filter(user=self.request.user).select_related('user')
+        return Creator.objects.select_related('user')
 
 
@@ -5,6 +5,7 @@ import json
 import pandas as pd
 from datetime import datetime
 import os
+import time
 
 class ModelMonitor:
     def __init__(self, log_file='ds_pipeline/monitoring/model_performance.jsonl'):
@@ -88,32 +89,44 @@ class ModelMonitor:
 
 # Rate limiting hook
 class RateLimiter:
-    def __init__(self, max_requests_per_minute=60):
+    """
+    Sliding-window counter: the previous minute's count, weighted by how much
+    of it is still inside the last 60 seconds, plus the current minute's
+    count. Constant time and memory per call, however high the limit.
+    """
+    WINDOW_SECONDS = 60
+
+    def __init__(self, max_requests_per_minute=60, clock=time.monotonic):
         self.max_requests = max_requests_per_minute
-        self.requests = []
-    
+        self.clock = clock
+        self.window = None
+        self.current = 0
+        self.previous = 0
+
+    def _estimate(self):
+        """Slide the windows to now and estimate the requests in the last minute"""
+        position = self.clock() / self.WINDOW_SECONDS
+        window = int(position)
+        if window != self.window:
+            self.previous = self.current if self.window == window - 1 else 0
+            self.current = 0
+            self.window = window
+        return self.previous * (1 - (position - window)) + self.current
+
     def allow_request(self):
         """Check if request is allowed under rate limit"""
-        now = datetime.now()
-        
-        # Remove requests older than 1 minute
-        self.requests = [req_time for req_time in self.requests 
-                        if (now - req_time).total_seconds() < 60]
-        
-        if len(self.requests) < self.max_requests:
-            self.requests.append(now)
+        if self._estimate() + 1 <= self.max_requests:
+            self.current += 1
             return True
-        else:
-            return False
-    
+        return False
+
     def get_status(self):
         """Get current rate limit status"""
-        now = datetime.now()
-        recent = [req for req in self.requests if (now - req).total_seconds() < 60]
+        recent = self._estimate()
         return {
-            'requests_in_last_minute': len(recent),
+            'requests_in_last_minute': round(recent),
             'limit': self.max_requests,
-            'available': self.max_requests - len(recent)
+            'available': max(0, int(self.max_requests - recent))
         }
 
 if __name__ == "__main__":
@@ -6,6 +6,8 @@ from drf_spectacular.utils import extend_schema, OpenApiTypes
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from backend_core.throttling import LoginRateThrottle
+
 from .serializers import RegisterSerializer, UserSerializer, WalletLinkSerializer
 from .models import WalletProfile
 
@@ -40,6 +42,9 @@ class RegisterView(APIView):
     responses=OpenApiTypes.OBJECT,
 )
 class LoginView(APIView):
+    # The default anon/user limits still apply
+    throttle_classes = [*APIView.throttle_classes, LoginRateThrottle]
+
     def post(self, request):
         username = request.data.get("username")
         password = request.data.get("password")
@@ -0,0 +1,52 @@
+"""
+Serialize list responses from `values()` rows instead of model instances.
+
+serialize_rows renders a queryset the way a ModelSerializer renders its
+instances, without building a model instance per row: each field's
+to_representation is looked up once and applied to the row's column.
+SerializerMethodFields are computed from the row through a RowValue in
+the serializer's Meta.row_fields.
+"""
+from operator import itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+class RowValue:
+    """A field computed from several values() columns as `function(*columns)`."""
+
+    def __init__(self, function, *lookups):
+        self.function = function
+        self.lookups = lookups
+
+    def __call__(self, row):
+        return self.function(*(row[lookup] for lookup in self.lookups))
+
+
+def serialize_rows(serializer, queryset):
+    """Render `queryset` as a list of dicts matching `serializer(queryset, many=True).data`."""
+    row_fields = getattr(serializer.Meta, "row_fields", {})
+    model_fields = {field.attname for field in queryset.model._meta.concrete_fields}
+    lookups = set()
+    plan = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        spec = row_fields.get(name)
+        if isinstance(spec, RowValue):
+            lookups.update(spec.lookups)
+            plan.append((name, spec, None))
+        elif field.source in model_fields:
+            lookups.add(field.source)
+            plan.append((name, itemgetter(field.source), field.to_representation))
+        else:
+            raise ImproperlyConfigured(f"{type(serializer).__name__}.{name} has no row source; add it to Meta.row_fields")
+
+    data = []
+    for row in queryset.values(*lookups):
+        item = {}
+        for name, get, convert in plan:
+            value = get(row)
+            item[name] = value if value is None or convert is None else convert(value)
+        data.append(item)
+    return data
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from indexer.models import Project, Milestone, Pledge, Release, Refund, AuditLog, Vote
+from .rows import RowValue
 
 class MilestoneSerializer(serializers.ModelSerializer):
     approve_votes_count = serializers.SerializerMethodField()
@@ -22,6 +23,11 @@ class MilestoneSerializer(serializers.ModelSerializer):
         # funded_amount removed from model, returning 0 for now
         return 0
 
+def funding_progress(total_pledged, funding_goal):
+    if funding_goal > 0:
+        return (total_pledged / funding_goal) * 100
+    return 0
+
 class ProjectSerializer(serializers.ModelSerializer):
     # milestones = MilestoneSerializer(many=True, read_only=True, source='milestone_set')
     progress_percentage = serializers.SerializerMethodField()
@@ -30,11 +36,11 @@ class ProjectSerializer(serializers.ModelSerializer):
         model = Project
         fields = "__all__"
         read_only_fields = ('on_chain_id', 'created_tx_hash', 'current_funding', 'status')
+        # Used by serialize_rows for the project list
+        row_fields = {"progress_percentage": RowValue(funding_progress, "total_pledged", "funding_goal")}
 
     def get_progress_percentage(self, obj):
-        if obj.funding_goal > 0:
-            return (obj.total_pledged / obj.funding_goal) * 100
-        return 0
+        return funding_progress(obj.total_pledged, obj.funding_goal)
 
 class PledgeSerializer(serializers.ModelSerializer):
     class Meta:
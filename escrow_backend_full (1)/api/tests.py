@@ -0,0 +1,93 @@
+"""
+Query budgets and list rendering for the indexer-backed API views.
+
+Needs the `indexer` PostgreSQL database from settings (a test database is
+created next to it).
+"""
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from indexer.models import Backer, Milestone, Pledge, Project, Refund, Release
+
+from .serializers import ProjectSerializer
+
+
+class HistoryViewQueryBudgetTests(TestCase):
+    databases = {'default', 'indexer'}
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        projects = Project.objects.using('indexer').bulk_create([
+            Project(
+                project_id=str(uuid.uuid4()), title=f'Project {i}', escrow_address=f'0x{i:040x}',
+                funding_goal=Decimal('1000'), deadline=now + timedelta(days=30), status='active',
+            )
+            for i in range(20)
+        ])
+        milestones = Milestone.objects.using('indexer').bulk_create([
+            Milestone(project=project, title='Milestone', description='', required_amount=Decimal('100'))
+            for project in projects
+        ])
+        backers = Backer.objects.using('indexer').bulk_create([
+            Backer(wallet_address=f'0x{i:040x}') for i in range(20)
+        ])
+        pledges = Pledge.objects.using('indexer').bulk_create([
+            Pledge(
+                project=projects[i % 20], backer=backers[i % 20], amount=Decimal('10'),
+                transaction_hash=f'0xpledge{i}', pledged_at=now - timedelta(minutes=i),
+            )
+            for i in range(150)
+        ])
+        Release.objects.using('indexer').bulk_create([
+            Release(
+                milestone=milestones[i % 20], amount=Decimal('100'),
+                transaction_hash=f'0xrelease{i}', released_at=now - timedelta(minutes=i),
+            )
+            for i in range(150)
+        ])
+        Refund.objects.using('indexer').bulk_create([
+            Refund(
+                pledge=pledges[i], amount=Decimal('10'),
+                transaction_hash=f'0xrefund{i}', refunded_at=now - timedelta(minutes=i),
+            )
+            for i in range(150)
+        ])
+
+    def test_history_query_budget(self):
+        with CaptureQueriesContext(connections['indexer']) as queries:
+            response = APIClient().get('/api/history/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 300)
+        # One query per event kind, however many rows come back
+        self.assertLessEqual(len(queries), 3)
+        self.assertEqual(response.data[0]['timestamp'], max(event['timestamp'] for event in response.data))
+
+
+class ProjectListRowsTests(TestCase):
+    databases = {'default', 'indexer'}
+
+    def test_matches_model_serializer(self):
+        now = timezone.now()
+        Project.objects.using('indexer').bulk_create([
+            Project(
+                project_id=str(uuid.uuid4()), title=f'Project {i}', escrow_address=f'0x{i:040x}',
+                funding_goal=Decimal(1000 * i), total_pledged=Decimal('12.345678901234567891') * i,
+                deadline=now + timedelta(days=i), status='active', on_chain_id=i if i % 2 else None,
+            )
+            for i in range(10)
+        ])
+        with CaptureQueriesContext(connections['indexer']) as queries:
+            response = APIClient().get('/api/projects/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        projects = Project.objects.using('indexer').all()
+        self.assertEqual(response.content, JSONRenderer().render(ProjectSerializer(projects, many=True).data))
@@ -16,6 +16,7 @@ from .serializers import (
     ProjectCreateSerializer, MilestoneCreateSerializer,
     PledgeCreateSerializer,
 )
+from .rows import serialize_rows
 from .web3_client import fake_tx_hash
 
 @extend_schema(summary="List projects")
@@ -43,6 +44,11 @@ class ProjectListView(generics.ListAPIView):
         
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        # values() rows instead of model instances; same output as ListAPIView.list
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(serialize_rows(self.get_serializer(), queryset))
+
 @extend_schema(summary="Get project detail")
 class ProjectDetailView(generics.RetrieveAPIView):
     queryset = Project.objects.using('indexer').all()
@@ -243,34 +249,41 @@ class HistoryView(APIView):
     def get(self, request):
         events = []
 
-        pledges = Pledge.objects.using('indexer').all()[:100]
-        for p in pledges:
+        # Latest 100 of each kind, as flat rows: three queries in total
+        pledges = Pledge.objects.using('indexer').order_by('-pledged_at').values_list(
+            'project_id', 'amount', 'transaction_hash', 'pledged_at'
+        )[:100]
+        for project_id, amount, tx_hash, timestamp in pledges:
             events.append({
                 'type': 'pledge',
-                'project_id': str(p.project.project_id),
-                'amount': str(p.amount),
-                'tx_hash': p.transaction_hash,
-                'timestamp': p.pledged_at.isoformat(),
+                'project_id': str(project_id),
+                'amount': str(amount),
+                'tx_hash': tx_hash,
+                'timestamp': timestamp.isoformat(),
             })
 
-        releases = Release.objects.using('indexer').all()[:100]
-        for r in releases:
+        releases = Release.objects.using('indexer').order_by('-released_at').values_list(
+            'milestone__project_id', 'amount', 'transaction_hash', 'released_at'
+        )[:100]
+        for project_id, amount, tx_hash, timestamp in releases:
             events.append({
                 'type': 'release',
-                'project_id': str(r.milestone.project.project_id),
-                'amount': str(r.amount),
-                'tx_hash': r.transaction_hash,
-                'timestamp': r.released_at.isoformat(),
+                'project_id': str(project_id),
+                'amount': str(amount),
+                'tx_hash': tx_hash,
+                'timestamp': timestamp.isoformat(),
             })
 
-        refunds = Refund.objects.using('indexer').all()[:100]
-        for rf in refunds:
+        refunds = Refund.objects.using('indexer').order_by('-refunded_at').values_list(
+            'pledge__project_id', 'amount', 'transaction_hash', 'refunded_at'
+        )[:100]
+        for project_id, amount, tx_hash, timestamp in refunds:
             events.append({
                 'type': 'refund',
-                'project_id': str(rf.pledge.project.project_id),
-                'amount': str(rf.amount),
-                'tx_hash': rf.transaction_hash,
-                'timestamp': rf.refunded_at.isoformat(),
+                'project_id': str(project_id),
+                'amount': str(amount),
+                'tx_hash': tx_hash,
+                'timestamp': timestamp.isoformat(),
             })
 
         events.sort(key=lambda e: e['timestamp'], reverse=True)
@@ -0,0 +1,23 @@
+"""
+System checks for settings that only work when state is shared across worker processes.
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches)
+def check_throttle_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get(settings.THROTTLE_CACHE, {}).get("BACKEND")
+    if settings.DEBUG or backend not in LOCAL_CACHE_BACKENDS:
+        return []
+    return [Warning(
+        f"THROTTLE_CACHE ('{settings.THROTTLE_CACHE}') is a per-process cache, so each worker "
+        "enforces the login rate limit on its own.",
+        hint="Point THROTTLE_CACHE at a Redis or Memcached cache shared by every worker.",
+        id="backend_core.W001",
+    )]
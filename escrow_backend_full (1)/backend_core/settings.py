@@ -30,6 +30,11 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # orjson-backed, byte-identical to JSONRenderer (api/renderers.py)
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ],
@@ -43,9 +48,26 @@ REST_FRAMEWORK = {
     "DEFAULT_THROTTLE_RATES": {
         "anon": "100/min",
         "user": "300/min",
+        # LoginView, per client IP (backend_core/throttling.py)
+        "login": os.getenv("THROTTLE_RATE_LOGIN", "10/min"),
+    },
+    # Reverse proxies in front of the app. Throttles identify anonymous clients
+    # by the address the last of them saw in X-Forwarded-For, or by REMOTE_ADDR
+    # when 0; clients choose every other X-Forwarded-For entry
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "0")),
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "escrow-backend"),
     }
 }
 
+# Cache holding the throttle counters; use a shared backend (Redis, Memcached)
+# so limits hold across worker processes
+THROTTLE_CACHE = os.getenv("THROTTLE_CACHE", "default")
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -0,0 +1,103 @@
+"""
+Rate limiting kept in a shared cache.
+
+DRF's SimpleRateThrottle stores a list of request timestamps per client,
+trims and rewrites it on every request, and two workers handling the same
+client overwrite each other's list. SlidingWindowThrottle keeps two
+counters per client instead, for the current and the previous fixed
+window, and estimates the requests in the last `duration` seconds as
+
+    previous * (1 - elapsed fraction of the current window) + current
+
+Each check is one atomic add/incr and one get. Counters live in the
+THROTTLE_CACHE cache; point it at Redis or Memcached so limits hold across
+worker processes.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """Sliding-window-counter throttle per user, or per client IP for anonymous requests."""
+
+    def __init__(self):
+        super().__init__()
+        self.cache = caches[settings.THROTTLE_CACHE]
+        self.wait_seconds = None
+
+    def get_rate(self):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(f"No default throttle rate set for '{self.scope}' scope")
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def increment(self, key):
+        """Count a request in the counter at `key` and return the new count."""
+        # A window's counter is read for two windows: as current, then as previous
+        timeout = 2 * self.duration
+        if self.cache.add(key, 1, timeout):
+            return 1
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Expired between add and incr
+            self.cache.add(key, 1, timeout)
+            return 1
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        position = self.timer() / self.duration
+        window = int(position)
+        elapsed = position - window
+        current_key = f'{self.key}:{window}'
+        # Count first, so concurrent requests never see the same count
+        current = self.increment(current_key)
+        previous = self.cache.get(f'{self.key}:{window - 1}', 0)
+        if previous * (1 - elapsed) + current <= self.num_requests:
+            return True
+        # Refused requests do not use up the limit
+        try:
+            self.cache.decr(current_key)
+        except ValueError:
+            pass
+        self.wait_seconds = self.seconds_until_allowed(previous, current - 1, elapsed)
+        return False
+
+    def seconds_until_allowed(self, previous, current, elapsed):
+        """Seconds until one more request fits, if no other arrives meanwhile."""
+        limit = self.num_requests
+        if limit < 1:
+            return None
+        if current < limit:
+            # Later in this window, once enough of the previous window has slid out
+            fraction = 1 - (limit - current - 1) / previous
+            return max(0.0, fraction - elapsed) * self.duration
+        # In the next window, where this window's requests become `previous`
+        fraction = max(0.0, 1 - (limit - 1) / current)
+        return (1 - elapsed + fraction) * self.duration
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class LoginRateThrottle(SlidingWindowThrottle):
+    """Login attempts per client IP (the client is not authenticated yet)."""
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}